@@ -1,7 +1,10 @@
 import streamlit as st
 import pandas as pd
-import addtl_info as util
+import datastore
+import ingest
 import os
+import perf
+import perf_panel
 
 # Initialize login state
 if "logged_in" not in st.session_state:
@@ -42,15 +45,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+perf_panel.start_page("Data Updates")
+
 st.markdown("### Upload Your Excel Sheet")
 
 # File uploader reacts immediately
 sheet = st.file_uploader("Upload your excel sheets here", type=["xls", "xlsx"])
-sheet_options = ['Sales Order', "Summary Collections", "Customer Masterlist", "Accounts Receivable", "Summary per Item", "Stock Level"]
+sheet_options = list(ingest.SHEET_TYPES)
 sheet_type = st.selectbox("Select data type", sheet_options)
 
-df = None
-
 # Added overwrite checkbox next to submit button
 col1, col2 = st.columns([0.15, 0.85])
 with col1:
@@ -58,132 +61,82 @@ with col1:
 with col2:
     overwrite = st.checkbox("Overwrite")
 
-#
-# SALES ORDER
-#
-if sheet and sheet_type=="Sales Order":
-    st.markdown("### Uploaded Data")
-    df = util.convert_sales_file_to_df(sheet)
-    st.dataframe(df)
-if submitted and sheet_type=="Sales Order":
-    if df is not None:
-        file_path = 'data/SALES ORDER.csv'
-
-        if os.path.isfile(file_path) and not overwrite:
-            existing_cols = pd.read_csv(file_path, nrows=0).columns.tolist()
-            df = df[existing_cols]
-            df.to_csv(file_path, mode='a', index=False, header=False)
-        else:
-            df.to_csv(file_path, mode='w', index=False, header=True)
-        st.success("Data saved successfully!")
-    else:
-        st.warning("Please upload a file before submitting.")
+# Conversion runs on a background thread, once per file and data type (ingest.py),
+# so reruns and Submit reuse the result instead of converting again
+job = ingest.convert(sheet.getvalue(), sheet_type) if sheet else None
 
 
-#
-# SUMMARY COLLECTIONS
-#
-if sheet and sheet_type=="Summary Collections":
-    st.markdown("### Uploaded Data")
-    df = util.convert_collections_to_df(sheet)
-    st.dataframe(df)
-if submitted and sheet_type=="Summary Collections":
-    if df is not None:
-        file_path = 'data/SUMMARY COLLECTIONS.csv'
-
-        if os.path.isfile(file_path) and not overwrite:
-            existing_cols = pd.read_csv(file_path, nrows=0).columns.tolist()
-            df = df[existing_cols]
-            df.to_csv(file_path, mode='a', index=False, header=False)
-        else:
-            df.to_csv(file_path, mode='w', index=False, header=True)
-        st.success("Data saved successfully!")
-    else:
-        st.warning("Please upload a file before submitting.")
+@perf.timed_cache
+def load_upload_diff(job_key: tuple, version: str, _upload: pd.DataFrame):
+    """Upload rows with new vs already stored keys; recounted when the dataset changes.
+    The upload is passed in (the job may have left ingest's cache) but not hashed:
+    job_key identifies it."""
+    return ingest.diff_with_stored(_upload, ingest.SHEET_TYPES[job_key[1]].dataset)
 
 
-#
-# RECEIVABLES
-#
-if sheet and sheet_type=="Accounts Receivable":
-    st.markdown("### Uploaded Data")
-    df = util.convert_receivables_to_df(sheet)
-    st.dataframe(df)
-if submitted and sheet_type=="Accounts Receivable":
-    if df is not None:
-        file_path = 'data/ACCOUNTS RECEIVABLE.csv'
-
-        if os.path.isfile(file_path) and not overwrite:
-            existing_cols = pd.read_csv(file_path, nrows=0).columns.tolist()
-            df = df[existing_cols]
-            df.to_csv(file_path, mode='a', index=False, header=False)
-        else:
-            df.to_csv(file_path, mode='w', index=False, header=True)
-        st.success("Data saved successfully!")
-    else:
-        st.warning("Please upload a file before submitting.")
+@st.fragment(run_every=0.5)
+def conversion_progress(job):
+    if job.done():
+        st.rerun()
+    st.progress(job.progress(), text=f"{job.stage}... ({job.elapsed():.0f}s)")
 
 
-#
-# SUMMARY PER ITEM
-#
-if sheet and sheet_type=="Summary per Item":
+if job is not None:
     st.markdown("### Uploaded Data")
-    df = util.convert_summary_to_df(sheet)
-    st.dataframe(df)
-if submitted and sheet_type=="Summary per Item":
-    if df is not None:
-        file_path = 'data/SUMMARY PER ITEM.csv'
-
-        if os.path.isfile(file_path) and not overwrite:
-            existing_cols = pd.read_csv(file_path, nrows=0).columns.tolist()
-            df = df[existing_cols]
-            df.to_csv(file_path, mode='a', index=False, header=False)
-        else:
-            df.to_csv(file_path, mode='w', index=False, header=True)
-        st.success("Data saved successfully!")
+    if not job.done():
+        conversion_progress(job)
+    elif job.failed():
+        st.error(f"Could not convert the file as {sheet_type}: {job.future.exception()}")
     else:
+        df = job.result()
+        st.caption(f"{len(df):,} rows and {len(df.columns)} columns converted in {job.elapsed():.1f}s.")
+        # Samples and summaries only: the full upload never goes to the browser
+        sample_tab, columns_tab, diff_tab = st.tabs(["Sample rows", "Columns", "Compared with stored data"])
+        with sample_tab:
+            if len(df) > 2 * ingest.SAMPLE_ROWS:
+                st.caption(f"First and last {ingest.SAMPLE_ROWS} rows.")
+            st.dataframe(ingest.sample(df))
+        with columns_tab:
+            if job.profile is None:
+                st.caption(f"Could not summarize the columns: {job.profile_error}")
+            else:
+                st.dataframe(job.profile, hide_index=True)
+        with diff_tab:
+            diff = load_upload_diff(job.key, datastore.version(ingest.SHEET_TYPES[sheet_type].dataset), df)
+            if diff is None:
+                st.caption("This upload has no columns to match rows with stored data by.")
+            else:
+                st.caption(f"Rows matched by {', '.join(diff.key_cols)}.")
+                new_col, stored_col, repeated_col, blank_col = st.columns(4)
+                new_col.metric("New", f"{diff.new:,}")
+                stored_col.metric("Already stored", f"{diff.stored:,}")
+                repeated_col.metric("Repeated in upload", f"{diff.repeated:,}")
+                blank_col.metric("No key", f"{diff.no_key:,}")
+                if diff.stored and not overwrite:
+                    st.warning(f"{diff.stored:,} rows are already stored; submitting without Overwrite adds them again.")
+
+if submitted:
+    if job is None:
         st.warning("Please upload a file before submitting.")
-
-#
-# CUSTOMER MASTERLIST
-#
-if sheet and sheet_type=="Customer Masterlist":
-    st.markdown("### Uploaded Data")
-    df = util.convert_customer_masterlist_to_df(sheet)
-    st.dataframe(df)
-if submitted and sheet_type=="Customer Masterlist":
-    if df is not None:
-        file_path = 'data/CUSTOMERS_LIST.csv'
-
-        if os.path.isfile(file_path) and not overwrite:
-            existing_cols = pd.read_csv(file_path, nrows=0).columns.tolist()
-            df = df[existing_cols]
-            df.to_csv(file_path, mode='a', index=False, header=False)
-        else:
-            df.to_csv(file_path, mode='w', index=False, header=True)
-        st.success("Data saved successfully!")
+    elif job.failed():
+        st.error("Fix the upload before submitting: it could not be converted.")
     else:
-        st.warning("Please upload a file before submitting.")
-
-
-#
-# STOCK LEVELS
-#
-if sheet and sheet_type=="Stock Level":
-    st.markdown("### Uploaded Data")
-    df = util.process_raw_materials_stock_df(sheet)
-    st.dataframe(df)
-if submitted and sheet_type=="Stock Level":
-    if df is not None:
-        file_path = 'data/STOCK LEVELS.csv'
-
-        if os.path.isfile(file_path) and not overwrite:
-            existing_cols = pd.read_csv(file_path, nrows=0).columns.tolist()
-            df = df[existing_cols]
-            df.to_csv(file_path, mode='a', index=False, header=False)
+        with st.spinner("Finishing the conversion..."):
+            df = job.result()
+        name = ingest.SHEET_TYPES[sheet_type].dataset
+
+        try:
+            with perf.span(f"save[{datastore.DATASETS[name].csv}]") as rec:
+                rec.rows_in = len(df)
+                written, rejected = datastore.save_dataset(name, df, overwrite)
+                rec.rows_out = len(written)
+        except datastore.SchemaError as e:
+            st.error(f"Not saved: {e}")
         else:
-            df.to_csv(file_path, mode='w', index=False, header=True)
-        st.success("Data saved successfully!")
-    else:
-        st.warning("Please upload a file before submitting.")
\ No newline at end of file
+            st.success(f"Data saved successfully! {len(written):,} rows stored.")
+            if not rejected.empty:
+                path = datastore.quarantine_path(datastore.DATASETS[name])
+                st.warning(f"{len(rejected):,} rows could not be stored and were set aside in {path}:")
+                st.dataframe(ingest.sample(rejected), hide_index=True)
+
+perf_panel.end_page("Data Updates")
@@ -1,33 +1,276 @@
-from pyngrok import ngrok
-import subprocess
-import time
+"""
+Starts the dashboard for several users at once.
+
+    python LAUNCHAPP.py                       # workers = cores (up to 4), app on http://localhost:8501
+    python LAUNCHAPP.py --workers 2 --port 8080 --no-browser
+    python LAUNCHAPP.py --ngrok               # also publish it through an ngrok tunnel (needs pyngrok)
+
+One Streamlit process runs every session's pandas work on one core, so the
+launcher starts `--workers` Streamlit processes on ports 8601, 8602, ... and puts
+a small reverse proxy on `--port` in front of them. A browser is sent to the
+worker with the fewest open connections and then kept there by a cookie, since
+its session (and file uploads) live in that process. All workers share data/,
+whose writes datastore.py serializes.
+
+Each worker warms up (warmup.py: imports, store sync, the first page's caches)
+before its server starts, and the app is reported ready once every worker
+answers its health check, not after a fixed wait. A worker that exits is
+restarted.
+"""
+import argparse
+import asyncio
 import os
+import re
+import secrets
+import signal
+import subprocess
 import sys
+import time
+import urllib.request
+import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 
-# Always resolve absolute path to this script’s folder
+# Always resolve absolute paths from this script's folder
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-STREAMLIT_FILE = os.path.join(SCRIPT_DIR, "Sales_Performance.py")
+STREAMLIT_FILE = "Data_Updates.py"   # the login page; the dashboards are in pages/
+LOG_DIR = os.path.join(SCRIPT_DIR, "logs")
+
 PORT = 8501
+WORKER_BASE_PORT = 8601
+MAX_DEFAULT_WORKERS = 4   # each worker keeps its own caches in memory
+HEALTH_TIMEOUT = 300      # seconds a worker may take to warm up and start
+HEALTH_INTERVAL = 5       # seconds between checks of running workers
+PERF_LOG = os.path.join("logs", "perf.jsonl")   # perf.LOG_PATH; not imported here, perf loads pandas
+COOKIE = "jchemie_worker"
+_COOKIE_RE = re.compile(rb"(?im)^cookie:.*?\b" + COOKIE.encode() + rb"=(\d+)")
+
+
+@dataclass
+class Worker:
+    index: int
+    port: int
+    process: Optional[subprocess.Popen] = None
+    healthy: bool = False
+    connections: int = 0   # open proxied connections, for picking the least busy worker
+
+
+######################
+# WORKERS
+######################
+
+def perf_log(worker: Worker) -> str:
+    """The worker's own perf log, logs/perf-<n>.jsonl: a rotating log can't be
+    shared between processes. Empty when JCHEMIE_PERF_LOG turns logging off."""
+    path = os.environ.get("JCHEMIE_PERF_LOG", PERF_LOG)
+    if not path:
+        return ""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{worker.index}{ext}"
+
+
+def start_worker(worker: Worker, script: str, cookie_secret: str):
+    """(Re)starts the Streamlit process of a worker, logging to logs/worker-<n>.log.
+    It answers health checks once warmed up."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log = open(os.path.join(LOG_DIR, f"worker-{worker.index}.log"), "ab")
+    worker.healthy = False
+    worker.process = subprocess.Popen(
+        [
+            # warmup.py imports, syncs the store and fills caches before the server starts
+            sys.executable, "warmup.py", "run", script,
+            "--server.port", str(worker.port),
+            "--server.address", "127.0.0.1",
+            "--server.headless", "true",
+        ],
+        cwd=SCRIPT_DIR, stdout=log, stderr=subprocess.STDOUT,
+        # The same secret everywhere, so cookies stay valid if a browser changes worker
+        env={**os.environ, "STREAMLIT_SERVER_COOKIE_SECRET": cookie_secret, "JCHEMIE_PERF_LOG": perf_log(worker)},
+    )
+    log.close()
+
+
+def is_healthy(worker: Worker) -> bool:
+    """Whether the worker's process runs and answers Streamlit's health endpoint."""
+    if worker.process is None or worker.process.poll() is not None:
+        return False
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{worker.port}/_stcore/health", timeout=2) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def wait_healthy(worker: Worker, timeout: float = HEALTH_TIMEOUT) -> bool:
+    """Polls the worker until it is healthy; False if it exits or times out first."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_healthy(worker):
+            worker.healthy = True
+            return True
+        if worker.process.poll() is not None:
+            return False
+        time.sleep(0.25)
+    return False
+
+
+def stop_workers(workers: list):
+    for worker in workers:
+        if worker.process is not None and worker.process.poll() is None:
+            worker.process.terminate()
+    for worker in workers:
+        if worker.process is not None:
+            try:
+                worker.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+
+async def supervise(workers: list, script: str, cookie_secret: str):
+    """Marks workers healthy or not, restarting any whose process has exited."""
+    while True:
+        await asyncio.sleep(HEALTH_INTERVAL)
+        for worker in workers:
+            if worker.process.poll() is not None:
+                print(f"Worker {worker.index} exited (code {worker.process.returncode}); restarting it")
+                start_worker(worker, script, cookie_secret)
+                asyncio.get_running_loop().run_in_executor(None, wait_healthy, worker)
+            else:
+                worker.healthy = await asyncio.to_thread(is_healthy, worker)
+
+
+######################
+# STICKY PROXY
+######################
+
+def pick_worker(workers: list, request_head: bytes):
+    """The worker named by the request's cookie if it is healthy, otherwise the least
+    busy healthy one. Returns (worker, whether the cookie must be set), or (None, False)."""
+    match = _COOKIE_RE.search(request_head)
+    if match:
+        index = int(match.group(1))
+        if index < len(workers) and workers[index].healthy:
+            return workers[index], False
+    healthy = [worker for worker in workers if worker.healthy]
+    if not healthy:
+        return None, False
+    return min(healthy, key=lambda worker: worker.connections), True
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        pass
+
+
+async def _set_cookie(upstream: asyncio.StreamReader, client: asyncio.StreamWriter, worker: Worker):
+    """Forwards the first response head with the worker's cookie added."""
+    head = await upstream.readuntil(b"\r\n\r\n")
+    cookie = f"Set-Cookie: {COOKIE}={worker.index}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+    client.write(head[:-2] + cookie + b"\r\n")
+    await client.drain()
+
+
+async def proxy_connection(workers: list, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+    """Relays one browser connection (HTTP keep-alive or a websocket) to one worker."""
+    upstream_writer = None
+    try:
+        request_head = await client_reader.readuntil(b"\r\n\r\n")
+        worker, new = pick_worker(workers, request_head)
+        if worker is None:
+            client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await client_writer.drain()
+            return
+        worker.connections += 1
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", worker.port)
+            upstream_writer.write(request_head)
+            # The request body (uploads) must flow before the response can start
+            to_worker = asyncio.create_task(_pipe(client_reader, upstream_writer))
+            if new:
+                await _set_cookie(upstream_reader, client_writer, worker)
+            await asyncio.gather(to_worker, _pipe(upstream_reader, client_writer))
+        finally:
+            worker.connections -= 1
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, OSError):
+        pass
+    finally:
+        for writer in (client_writer, upstream_writer):
+            if writer is not None:
+                writer.close()
+
+
+######################
+# LAUNCH
+######################
+
+async def serve(workers: list, port: int, script: str, cookie_secret: str, on_ready):
+    server = await asyncio.start_server(
+        lambda reader, writer: proxy_connection(workers, reader, writer), "0.0.0.0", port, limit=1 << 20
+    )
+    on_ready()
+    async with server:
+        await asyncio.gather(server.serve_forever(), supervise(workers, script, cookie_secret))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the dashboard as several Streamlit workers behind one local address.")
+    parser.add_argument("--workers", type=int, default=min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1),
+                        help="Streamlit processes to start (default: one per core, up to 4)")
+    parser.add_argument("--port", type=int, default=PORT, help="port users open (default: %(default)s)")
+    parser.add_argument("--worker-port", type=int, default=WORKER_BASE_PORT, help="port of the first worker (default: %(default)s)")
+    parser.add_argument("--script", default=STREAMLIT_FILE, help="Streamlit entry script (default: %(default)s)")
+    parser.add_argument("--no-browser", action="store_true", help="don't open the app in the browser once ready")
+    parser.add_argument("--ngrok", action="store_true", help="also publish the app through an ngrok tunnel")
+    args = parser.parse_args(argv)
+
+    os.chdir(SCRIPT_DIR)
+    # Stop the workers when the launcher is terminated, as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    workers = [Worker(i, args.worker_port + i) for i in range(max(args.workers, 1))]
+    cookie_secret = secrets.token_hex(16)
+    started = time.monotonic()
+    try:
+        for worker in workers:
+            start_worker(worker, args.script, cookie_secret)
+        print(f"Starting {len(workers)} workers...")
+        with ThreadPoolExecutor(len(workers)) as pool:
+            ready = list(pool.map(wait_healthy, workers))
+        if not any(ready):
+            print(f"No worker started; see {LOG_DIR}/worker-*.log")
+            return 1
+        if not all(ready):
+            print(f"Workers {[w.index for w, ok in zip(workers, ready) if not ok]} did not start; continuing without them")
 
-# Change working directory to the script folder
-os.chdir(SCRIPT_DIR)
+        url = f"http://localhost:{args.port}"
 
-# Start Streamlit using absolute path
-streamlit_process = subprocess.Popen(
-    [sys.executable, "-m", "streamlit", "run", STREAMLIT_FILE, "--server.port", str(PORT)],
-    cwd=SCRIPT_DIR
-)
+        def on_ready():
+            print(f"\nThe dashboard is ready at {url} ({sum(ready)} workers, {time.monotonic() - started:.1f}s)\n")
+            if args.ngrok:
+                from pyngrok import ngrok
+                print(f"Publicly available at: {ngrok.connect(args.port).public_url}\n")
+            if not args.no_browser:
+                webbrowser.open(url)
 
-# Wait a bit for Streamlit to boot
-time.sleep(5)
+        asyncio.run(serve(workers, args.port, args.script, cookie_secret, on_ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.ngrok:
+            try:
+                from pyngrok import ngrok
+                ngrok.kill()
+            except ImportError:
+                pass
+        stop_workers(workers)
+    return 0
 
-# Start ngrok tunnel
-public_url = ngrok.connect(PORT).public_url
-print(f"\nYour app is publicly available at: {public_url}\n")
 
-# Keep script running
-try:
-    streamlit_process.wait()
-except KeyboardInterrupt:
-    ngrok.kill()
-    streamlit_process.terminate()
+if __name__ == "__main__":
+    sys.exit(main())
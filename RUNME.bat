@@ -1,5 +1,5 @@
 @echo off
 cd /d "%~dp0"
-echo Starting Streamlit app...
-streamlit run Sales_Performance.py
+echo Starting the JCHEM Dashboard...
+python LAUNCHAPP.py
 pause
@@ -1,9 +1,12 @@
 import pandas as pd
+import numpy as np
 import math
 import os
-from rapidfuzz import process, fuzz
 import re
 from io import BytesIO
+from dataclasses import dataclass
+import perf
+from compute import customer_keys, suppliers
 
 def normalize(x):
     if x is None:
@@ -14,43 +17,97 @@ def normalize(x):
         return x.strip()
     return str(x).strip()
 
+@perf.timed()
+def read_raw_excel(file_path, **kwargs):
+    """Reads an export with no header so the converters can locate it themselves.
+    Frames (or dicts of frames, for multi-sheet exports) that were already
+    loaded are copied through, since the converters relabel them in place."""
+    if isinstance(file_path, pd.DataFrame):
+        return file_path.copy()
+    if isinstance(file_path, dict):
+        return {name: sheet.copy() for name, sheet in file_path.items()}
+    if hasattr(file_path, "read"):
+        file_path = BytesIO(file_path.read())
+    return pd.read_excel(file_path, header=None, engine="xlrd", **kwargs)
+
+# Header rows of the accounting system's exports. Each signature lists the cells
+# (whitespace-stripped) its header row must hold:
+#   leading   - the cells of columns A, B, C..., in order with no gaps
+#   then      - the next non-blank cells after `leading`, in order (blanks between are skipped)
+#   contains  - cells found anywhere in the row
+#   any_of    - at least one of these anywhere in the row
+@dataclass(frozen=True)
+class HeaderSignature:
+    leading: tuple = ()
+    then: tuple = ()
+    contains: tuple = ()
+    any_of: tuple = ()
+
+
+HEADER_SIGNATURES = {
+    "Sales Order": HeaderSignature(leading=("Date", "SO  #", "Customer Name"), then=("Total Amount",)),
+    "Summary Collections": HeaderSignature(contains=("Date", "Type", "OR #", "Customer Name", "PM", "Amount", "Check Amount")),
+    "Accounts Receivable": HeaderSignature(contains=("Date", "Type", "SI #", "Customer Name", "Amount Due", "Paid Amount", "Balance")),
+    "Summary per Item": HeaderSignature(contains=("Product Code",)),
+    "Customer Masterlist": HeaderSignature(contains=("Customer's Name",)),
+    "Stock Level": HeaderSignature(any_of=("Product Code", "ITEM")),
+    "PO Log": HeaderSignature(contains=("RAWMATERIALS",)),
+}
+
+HEADER_CHUNK_ROWS = 64  # rows compared per step; headers sit within the first few
+
+
+def _header_matches(cells: np.ndarray, signature: HeaderSignature) -> np.ndarray:
+    """Which rows of a 2-D array of stripped cell text match the signature."""
+    matches = np.ones(len(cells), dtype=bool)
+    for name in signature.contains:
+        matches &= (cells == name).any(axis=1)
+    if signature.any_of:
+        matches &= np.isin(cells, signature.any_of).any(axis=1)
+    n_leading = len(signature.leading)
+    if n_leading + len(signature.then) > cells.shape[1]:
+        return np.zeros(len(cells), dtype=bool)
+    for col, name in enumerate(signature.leading):
+        matches &= cells[:, col] == name
+    if signature.then:
+        rest = cells[:, n_leading:]
+        filled = rest != ""
+        rank = filled.cumsum(axis=1)  # 1 for the first non-blank cell after `leading`, 2 for the next...
+        for position, name in enumerate(signature.then, start=1):
+            matches &= ((rank == position) & filled & (rest == name)).any(axis=1)
+    return matches
+
+
+def find_header_row(raw: pd.DataFrame, signature: HeaderSignature, chunk_rows: int = HEADER_CHUNK_ROWS):
+    """Position of the first row of `raw` (read with header=None) matching `signature`,
+    or None. Compares whole blocks of leading rows at once and stops at the first
+    block with a match, so the cost does not grow with the rows below the header."""
+    for start in range(0, len(raw), chunk_rows):
+        block = raw.iloc[start:start + chunk_rows]
+        cells = block.where(block.notna(), "").astype(str).to_numpy(dtype=str)
+        cells = np.char.strip(cells)
+        hits = np.flatnonzero(_header_matches(cells, signature))
+        if hits.size:
+            return start + int(hits[0])
+        chunk_rows *= 2
+    return None
+
+
+@perf.timed()
 def convert_sales_file_to_df(path):
-    if hasattr(path, "read"):
-        data = BytesIO(path.read())
-        df = pd.read_excel(data, header=None, engine="xlrd")
-    else:
-        df = pd.read_excel(path, header=None, engine="xlrd")
-
-    raw=df
-
-    def row_matches(row):
-        cells = [normalize(v) for v in row[:20]]
-
-        if cells[0] != "Date":
-            return False
-        if cells[1] != "SO  #":
-            return False
-        if cells[2] != "Customer Name":
-            return False
-
-        i = 3
-        while i < len(cells) and cells[i] == "":
-            i += 1
+    raw = read_raw_excel(path)
 
-        if i >= len(cells):
-            return False
-
-        return cells[i] == "Total Amount"
-
-    matches = raw.index[raw.apply(row_matches, axis=1)].tolist()
-    if not matches:
+    header_row = find_header_row(raw, HEADER_SIGNATURES["Sales Order"])
+    if header_row is None:
         raise ValueError("Header row not found")
 
-    header_row = matches[0]
-
-    df = pd.read_excel(path, header=header_row)
+    # Slice the rows below the header instead of reading the workbook again
+    df = raw.iloc[header_row + 1:].copy()
+    df.columns = [normalize(c) for c in raw.iloc[header_row]]
+    df = df.loc[:, ~df.columns.duplicated()]
+    df = df.reset_index(drop=True)
 
-    df = df[[c for c in df.columns if normalize(c) != ""]]
+    df = df[[c for c in df.columns if c != ""]]
 
     df = df[["Date", "SO  #", "Customer Name", "Total Amount"]]
 
@@ -60,95 +117,59 @@ def convert_sales_file_to_df(path):
     if first_nan_idx_list.size > 0:
         first_nan_idx = first_nan_idx_list[0]
         df = df.iloc[:first_nan_idx]
+    df = df.infer_objects()
     
-    # Clean the customer names
-    df['Customer Name'] = df['Customer Name'].str.replace(
-        r'^(?:\s*(?:-+|\*|\d+\s*-\s*)*)|(?:-+\s*)$', '', regex=True
-    ).str.strip()
-
-
-    customers = pd.read_csv("data/CUSTOMERS_LIST.csv")
-    customers["Business Name"] = customers["Business Name"].str.upper()
+    # Clean the customer names. Masterlist attributes are not copied onto the
+    # rows: the store joins them from its customer dimension (datastore.py)
+    df['Customer Name'] = customer_keys.clean_customer_names(df['Customer Name'])
 
-    # Fuzzy match function
-    def fuzzy_match(name):
-        match, score, _ = process.extractOne(name, customers["Business Name"], scorer=fuzz.ratio)
-        return match if score >= 80 else None  # adjust threshold as needed
-
-    # Merge using fuzzy matching
-    df["Matched Name"] = df["Customer Name"].apply(fuzzy_match)
-    df = pd.merge(df, customers, left_on="Matched Name", right_on="Business Name", how="left") \
-        .drop(columns=["Business Name", "Matched Name"])
- 
     return df
 
 
 import pandas as pd
 
+@perf.timed()
 def convert_collections_to_df(file_path):
-    if hasattr(file_path, "read"):
-        data = BytesIO(file_path.read())
-        df = pd.read_excel(data, header=None, engine="xlrd")
-    else:
-        df = pd.read_excel(file_path, header=None, engine="xlrd")
-
-    required = {'Date', 'Type', 'OR #', 'Customer Name', 'PM', 'Amount', 'Check Amount'}
-
-    for i, row in df.iterrows():
-        clean_row = [str(x).strip() for x in row]
+    df = read_raw_excel(file_path)
 
-        if required.issubset(clean_row):
-            df.columns = clean_row
-            df = df.loc[:, ~df.columns.duplicated()]  # keep first instance only
-            df = df.iloc[i + 1:]
-            df = df.dropna(subset=['OR #', 'Amount'])
+    i = find_header_row(df, HEADER_SIGNATURES["Summary Collections"])
+    if i is None:
+        raise ValueError("Target headers not found in file")
 
-            df['Customer Name'] = df['Customer Name'].str.replace(
-                r'^(?:\s*(?:-+|\*|\d+\s*-\s*)*)|(?:-+\s*)$', '', regex=True
-            ).str.strip()
+    df.columns = [str(x).strip() for x in df.iloc[i]]
+    df = df.loc[:, ~df.columns.duplicated()]  # keep first instance only
+    df = df.iloc[i + 1:]
+    df = df.dropna(subset=['OR #', 'Amount'])
 
-            df = df[["Date", "Type", "OR #", "Customer Name", "PM", "Check Amount"]]
+    df['Customer Name'] = customer_keys.clean_customer_names(df['Customer Name'])
 
-            return df.dropna(subset=['Type', 'OR #'])
+    df = df[["Date", "Type", "OR #", "Customer Name", "PM", "Check Amount"]]
 
-    raise ValueError("Target headers not found in file")
+    return df.dropna(subset=['Type', 'OR #'])
 
 
+@perf.timed()
 def convert_receivables_to_df(file_path):
-    if hasattr(file_path, "read"):
-        data = BytesIO(file_path.read())
-        df = pd.read_excel(data, header=None, engine="xlrd")
-    else:
-        df = pd.read_excel(file_path, header=None, engine="xlrd")
-
-    required = {'Date', 'Type', 'SI #', 'Customer Name', 'Amount Due', 'Paid Amount', 'Balance'}
+    df = read_raw_excel(file_path)
 
-    for i, row in df.iterrows():
-        clean_row = [str(x).strip() for x in row]
+    i = find_header_row(df, HEADER_SIGNATURES["Accounts Receivable"])
+    if i is None:
+        raise ValueError("Target headers not found in file")
 
-        if required.issubset(clean_row):
-            df.columns = clean_row
-            df = df.loc[:, ~df.columns.duplicated()]  # keep first instance only
-            df = df.iloc[i + 1:]
+    df.columns = [str(x).strip() for x in df.iloc[i]]
+    df = df.loc[:, ~df.columns.duplicated()]  # keep first instance only
+    df = df.iloc[i + 1:]
 
+    df['Customer Name'] = customer_keys.clean_customer_names(df['Customer Name'])
 
-            df['Customer Name'] = df['Customer Name'].str.replace(
-                r'^(?:\s*(?:-+|\*|\d+\s*-\s*)*)|(?:-+\s*)$', '', regex=True
-            ).str.strip()
+    df = df[["Date", "Type", "SI #", "Customer Name", "Amount Due", "Paid Amount", "Balance"]]
 
-            df = df[["Date", "Type", "SI #", "Customer Name", "Amount Due", "Paid Amount", "Balance"]]
-            
-            return df.dropna(subset=['SI #', 'Customer Name'])
-
-    raise ValueError("Target headers not found in file")
+    return df.dropna(subset=['SI #', 'Customer Name'])
 
+@perf.timed()
 def convert_summary_to_df(file_path):
 
-    if hasattr(file_path, "read"):
-        data = BytesIO(file_path.read())
-        df = pd.read_excel(data, sheet_name=None, header=None, engine="xlrd")
-    else:
-        df = pd.read_excel(file_path, sheet_name=None, header=None, engine="xlrd")
+    df = read_raw_excel(file_path, sheet_name=None)
 
     # Read ALL sheets (sheet_name=None). 
     # Use header=None to manually find the correct header row later.
@@ -158,13 +179,7 @@ def convert_summary_to_df(file_path):
 
     for sheet_name, raw_df in all_sheets.items():
         # 1. Find the header row by looking for "Product Code" in the values
-        # We loop through rows until we find the identifier
-        header_idx = None
-        for idx, row in raw_df.iterrows():
-            # Convert row to string to search for key column name
-            if "Product Code" in row.astype(str).values:
-                header_idx = idx
-                break
+        header_idx = find_header_row(raw_df, HEADER_SIGNATURES["Summary per Item"])
         
         # If this sheet doesn't have the header, skip it
         if header_idx is None:
@@ -193,13 +208,10 @@ def convert_summary_to_df(file_path):
 
 import pandas as pd
 
+@perf.timed()
 def convert_customer_masterlist_to_df(file_path):
 
-    if hasattr(file_path, "read"):
-        data = BytesIO(file_path.read())
-        df = pd.read_excel(data, sheet_name=None, header=None, engine="xlrd")
-    else:
-        df = pd.read_excel(file_path, sheet_name=None, header=None, engine="xlrd")
+    df = read_raw_excel(file_path, sheet_name=None)
 
     # Read ALL sheets, no header initially
     all_sheets = df
@@ -216,11 +228,7 @@ def convert_customer_masterlist_to_df(file_path):
             customer_type = "Unknown"
 
         # 2. Find the header row dynamically
-        header_idx = None
-        for idx, row in raw_df.iterrows():
-            if "Customer's Name" in row.astype(str).values:
-                header_idx = idx
-                break
+        header_idx = find_header_row(raw_df, HEADER_SIGNATURES["Customer Masterlist"])
         
         if header_idx is None:
             continue
@@ -242,13 +250,10 @@ def convert_customer_masterlist_to_df(file_path):
     return pd.concat(processed_dfs, ignore_index=True)
 
 
+@perf.timed()
 def process_raw_materials_stock_df(file_path):
 
-    if hasattr(file_path, "read"):
-        data = BytesIO(file_path.read())
-        df = pd.read_excel(data, sheet_name=0, header=None, engine="xlrd")
-    else:
-        df = pd.read_excel(file_path, sheet_name=0, header=None, engine="xlrd")
+    df = read_raw_excel(file_path, sheet_name=0)
 
     # Read ONLY the first sheet
     raw_df = df
@@ -267,26 +272,16 @@ def process_raw_materials_stock_df(file_path):
         inventory_date = pd.to_datetime('today').normalize()
 
     # 2. Find the header row dynamically
-    header_idx = None
-    key_col = "Product Code" 
-    
-    for idx, row in raw_df.iterrows():
-        row_str = row.astype(str).values
-        if "Product Code" in row_str:
-            header_idx = idx
-            key_col = "Product Code"
-            break
-        elif "ITEM" in row_str:
-            header_idx = idx
-            key_col = "ITEM"
-            break
-    
+    header_idx = find_header_row(raw_df, HEADER_SIGNATURES["Stock Level"])
     if header_idx is None:
         return pd.DataFrame()
+    # Stripped as find_header_row matched it, so "Product Code " is the Product Code column
+    header = raw_df.iloc[header_idx].map(lambda c: c.strip() if isinstance(c, str) else c)
+    key_col = "Product Code" if "Product Code" in header.values else "ITEM"
 
     # 3. Slice and set header
     df = raw_df.iloc[header_idx + 1:].copy()
-    df.columns = raw_df.iloc[header_idx]
+    df.columns = header
 
     # 4. Clean Data
     df = df.dropna(subset=[key_col])
@@ -317,4 +312,30 @@ def process_raw_materials_stock_df(file_path):
     # 6. Add Inventory Date
     df['Inventory Date'] = inventory_date
     
-    return df
\ No newline at end of file
+    return df
+
+@perf.timed()
+def convert_po_log_to_df(file_path):
+    """Procurement PO log sheets (header row holding RAWMATERIALS) as the rows
+    PO LOG.csv keeps, with Lead_Time derived."""
+    all_sheets = read_raw_excel(file_path, sheet_name=None)
+
+    processed_dfs = []
+    for sheet_name, raw_df in all_sheets.items():
+        # 1. Find the header row
+        header_idx = find_header_row(raw_df, HEADER_SIGNATURES["PO Log"])
+        if header_idx is None:
+            continue
+
+        # 2. Slice, drop blank lines
+        df = raw_df.iloc[header_idx + 1:].copy()
+        df.columns = [str(col).strip() for col in raw_df.iloc[header_idx]]
+        df = df.dropna(subset=["RAWMATERIALS"])
+        processed_dfs.append(df)
+
+    if not processed_dfs:
+        return pd.DataFrame(columns=suppliers.PO_COLUMNS)
+
+    # 3. Dates, lead time and amount, keeping the columns every upload shares
+    df = suppliers.clean_po_log(pd.concat(processed_dfs, ignore_index=True))
+    return df.reindex(columns=suppliers.PO_COLUMNS)
@@ -0,0 +1,265 @@
+"""
+Month-end KPI reports for every customer and category in one command.
+
+    python batch_reports.py
+    python batch_reports.py --data-dir data --out reports --workers 4
+
+Loads the data/ store once, then renders the same tables and charts the dashboards
+show (monthly sales, active customers, churn, top/worst items, restock list) to
+CSV and HTML files, fanning the per-customer and per-category work out over cores.
+"""
+import argparse
+import datetime
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+import pandas as pd
+
+import datastore
+from compute import customers, inventory, sales
+
+# Set in each worker by _init_worker so the frames are shipped once per process
+_DATA = {}
+
+
+def load_store(data_dir="data"):
+    """Reads every dataset the reports need from the typed store (datastore.py), so
+    dates and amounts come back parsed; missing datasets come back as empty frames."""
+    def read(name, **kwargs):
+        return datastore.read_table(name, data_dir=data_dir, **kwargs)
+
+    data = {
+        "sales": read("sales", with_customer=True),
+        "collections": read("collections"),
+        "receivables": read("receivables"),
+        "stock": read("stock"),
+        "summary": read("summary"),
+    }
+    if not data["sales"].empty:
+        data["sales"] = sales.sort_by_date(sales.clean_sales(data["sales"]))
+    if not data["stock"].empty and not data["summary"].empty:
+        data["stock"], data["summary"] = inventory.prepare_inventory(data["stock"], data["summary"])
+        data["stock"] = inventory.latest_stock(data["stock"])
+    return data
+
+
+def slugify(name) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(name)).strip("_")
+    return slug or "unnamed"
+
+
+def folder_names(names, suffixes=None) -> list:
+    """A folder for each name: its slugify(), with its suffix (default a counter)
+    appended wherever names share a slug, compared case-insensitively as on Windows
+    and macOS, so no report overwrites another's ("A&B Corp." and "A-B Corp" both
+    slugify to A_B_Corp)."""
+    names = list(names)
+    suffixes = list(suffixes) if suffixes is not None else None
+    slugs = [slugify(name) for name in names]
+    shared = Counter(slug.lower() for slug in slugs)
+    seen = Counter()
+    folders = []
+    for i, slug in enumerate(slugs):
+        if shared[slug.lower()] > 1:
+            seen[slug.lower()] += 1
+            slug = f"{slug}_{slugify(suffixes[i]) if suffixes is not None else seen[slug.lower()]}"
+        folders.append(slug)
+    if len({folder.lower() for folder in folders}) < len(folders):
+        raise ValueError("report folder names still collide after adding suffixes")
+    return folders
+
+
+######################
+# CHARTS
+######################
+
+def monthly_chart(df: pd.DataFrame, value_col: str, title: str):
+    return (
+        alt.Chart(df, title=title)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("Month:T", axis=alt.Axis(format="%b %Y", labelAngle=-45)),
+            y=f"{value_col}:Q",
+            tooltip=["Month:T", f"{value_col}:Q"]
+        )
+    )
+
+
+def items_chart(df: pd.DataFrame, title: str, sort: str, color: str):
+    return (
+        alt.Chart(df, title=title)
+        .mark_bar()
+        .encode(
+            x=alt.X("Qty", title="Units Sold"),
+            y=alt.Y("Item Description", sort=sort, title=None),
+            color=alt.value(color),
+            tooltip=["Item Description", "Qty", "Amount"]
+        )
+    )
+
+
+def write_table(df: pd.DataFrame, folder: str, name: str):
+    df.to_csv(os.path.join(folder, f"{name}.csv"), index=False)
+
+
+def write_chart(chart, folder: str, name: str):
+    chart.save(os.path.join(folder, f"{name}.html"))
+
+
+######################
+# REPORTS
+######################
+
+def overview_report(data: dict, out_dir: str) -> dict:
+    """Book-wide KPIs plus item and restock tables."""
+    kpis = {}
+    sales_df = data["sales"]
+    if not sales_df.empty:
+        monthly = sales.monthly_sales(sales_df)
+        write_table(monthly, out_dir, "monthly_sales")
+        write_chart(monthly_chart(monthly, "Total Amount", "Overall Sales Volume"), out_dir, "monthly_sales")
+
+        churn = sales.churn_history(sales_df)
+        kpis.update({
+            "Total Revenue": sales_df["Total Amount"].sum(),
+            "Total Orders": len(sales_df),
+            "Active Customers": sales.count_active_customers(sales_df),
+            "Churn Rate (%)": None if churn is None else churn.last_value,
+            "Median Transaction Value": sales.median_transaction_value(sales_df),
+        })
+
+    if not data["summary"].empty:
+        performance = inventory.item_performance(data["summary"])
+        top_items, worst_items = inventory.top_and_worst_items(performance)
+        write_table(top_items, out_dir, "top_items")
+        write_table(worst_items, out_dir, "worst_items")
+        write_chart(items_chart(top_items, "Top 10 High Volume Items", "-x", "green"), out_dir, "top_items")
+        write_chart(items_chart(worst_items, "Bottom 10 Low Volume Items (Active)", "x", "grey"), out_dir, "worst_items")
+        write_table(inventory.restock_list(data["stock"]), out_dir, "restock_list")
+
+    write_table(pd.DataFrame([kpis]), out_dir, "overview_kpis")
+    return kpis
+
+
+def customer_report(customer: int, out_dir: str) -> dict:
+    """KPI row for one customer (by Customer ID), with its monthly sales table and
+    chart in its own folder."""
+    name = _DATA["customer_names"][customer]
+    folder = os.path.join(out_dir, "customers", _DATA["customer_folders"][customer])
+    os.makedirs(folder, exist_ok=True)
+
+    cust_sales = _DATA["sales_by_customer"][customer]
+    monthly = sales.monthly_sales(cust_sales)
+    write_table(monthly, folder, "monthly_sales")
+    write_chart(monthly_chart(monthly, "Total Amount", f"Sales: {name}"), folder, "monthly_sales")
+
+    row = {"Customer ID": customer, "Customer Name": name}
+    row.update(customers.order_kpis(cust_sales, customer))
+    cust_collections = _DATA["collections_by_customer"].get(customer)
+    cust_receivables = _DATA["receivables_by_customer"].get(customer)
+    if cust_collections is not None and cust_receivables is not None:
+        row.update(customers.payment_kpis(cust_collections, cust_receivables, customer))
+    write_table(pd.DataFrame([row]), folder, "kpis")
+    return row
+
+
+def category_report(category: str, out_dir: str) -> dict:
+    """Stock value, sales and replenishment table for one inventory category."""
+    folder = os.path.join(out_dir, "categories", _DATA["category_folders"][category])
+    os.makedirs(folder, exist_ok=True)
+
+    cat_stock = _DATA["stock_by_category"][category]
+    cat_summary = _DATA["summary"][_DATA["summary"]["Product Code"].isin(cat_stock["Product Code"].unique())]
+
+    write_table(inventory.replenishment_table(cat_stock), folder, "replenishment")
+    if not cat_summary.empty:
+        trend = cat_summary.groupby("Month-Year")["Amount"].sum().reset_index().rename(columns={"Month-Year": "Month"})
+        write_table(trend, folder, "monthly_sales")
+        write_chart(monthly_chart(trend, "Amount", f"Category Sales: {category}"), folder, "monthly_sales")
+
+    return {
+        "Category": category,
+        "Category Value": cat_stock["Total Stock Value"].sum(),
+        "Category Sales": cat_summary["Amount"].sum(),
+        "Low Stock Items": int((cat_stock["Qty"] <= cat_stock["Min Level"]).sum()),
+    }
+
+
+def split_by(df: pd.DataFrame, col: str) -> dict:
+    """{value: rows} in one groupby, so each report works on its own slice."""
+    if df.empty or col not in df.columns:
+        return {}
+    return {key: group for key, group in df.groupby(col, sort=False)}
+
+
+def _init_worker(data):
+    _DATA.update(data)
+
+
+def _run_many(func, names, out_dir, workers):
+    if not names:
+        return []
+    if workers == 1:
+        return [func(name, out_dir) for name in names]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_DATA,)) as pool:
+        chunksize = max(1, len(names) // (workers * 4))
+        return list(pool.map(func, names, [out_dir] * len(names), chunksize=chunksize))
+
+
+def generate_reports(data_dir="data", out_dir=None, workers=None):
+    """Writes every report under out_dir and returns its path."""
+    out_dir = out_dir or os.path.join("reports", datetime.date.today().strftime("%Y-%m-%d"))
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    _DATA.clear()
+    _DATA.update(load_store(data_dir))
+
+    kpis = overview_report(_DATA, out_dir)
+
+    # Largest customers first, like the dashboard's customer picker; keyed by
+    # Customer ID so every spelling of a name is one report
+    customer_names = customers.customer_options(_DATA["sales"]) if not _DATA["sales"].empty else {}
+
+    # Only the per-customer / per-category slices go to the workers
+    _DATA.update({
+        "customer_names": customer_names,
+        # Names sharing a folder name are told apart by Customer ID
+        "customer_folders": dict(zip(customer_names, folder_names(customer_names.values(), customer_names))),
+        "sales_by_customer": split_by(_DATA.pop("sales"), "Customer ID"),
+        "collections_by_customer": split_by(_DATA.pop("collections"), "Customer ID"),
+        "receivables_by_customer": split_by(_DATA.pop("receivables"), "Customer ID"),
+        "stock_by_category": split_by(_DATA.pop("stock"), "Category"),
+    })
+    for name, value in kpis.items():
+        print(f"{name}: {value:,.2f}" if isinstance(value, float) else f"{name}: {value}")
+
+    rows = _run_many(customer_report, list(customer_names), out_dir, workers)
+    write_table(pd.DataFrame(rows), out_dir, "customers_summary")
+    print(f"Customers: {len(rows)} reports")
+
+    categories = sorted(_DATA["stock_by_category"])
+    _DATA["category_folders"] = dict(zip(categories, folder_names(categories)))
+    rows = _run_many(category_report, categories, out_dir, workers)
+    write_table(pd.DataFrame(rows), out_dir, "categories_summary")
+    print(f"Categories: {len(rows)} reports")
+
+    return out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render month-end KPI reports for all customers and categories.")
+    parser.add_argument("--data-dir", default="data", help="folder holding the CSVs written by Data_Updates.py")
+    parser.add_argument("--out", help="output folder (default: reports/<today>)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    out_dir = generate_reports(args.data_dir, args.out, args.workers)
+    print(f"Reports written to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Times the converters, compute functions and loaders on synthetic data.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --rows 1000,100000 --customers 100,5000
+    python -m benchmarks.run_benchmarks --rows 1000000 --baseline benchmarks/results/before.json
+
+Results are written as JSON so runs before and after an optimization can be compared.
+"""
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks import synthetic_data as synth
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _parse_sizes(text):
+    sizes = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        scale = 1
+        if part.endswith("k"):
+            scale, part = 1_000, part[:-1]
+        elif part.endswith("m"):
+            scale, part = 1_000_000, part[:-1]
+        sizes.append(int(float(part) * scale))
+    return sizes
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def time_call(func, setup=None, repeat=3):
+    """Runs func(*setup()) `repeat` times; setup is excluded from the timing."""
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _named_csv(df, name):
+    buffer = BytesIO(df.to_csv(index=False).encode())
+    buffer.name = name
+    return buffer
+
+
+def build_cases(dataset, raw, data_dir):
+    """(name, func, setup) for every converter, compute function and loader."""
+    import addtl_info
+    import datastore
+    import project1_utility
+    import project2_utility
+    import queries
+    from compute import aggregation, catalog, customer_keys, customers, forecast, inventory, sales, suppliers
+    from compute.receivables import ar_aging, payment_summary, reconcile_payments  # `receivables` is the frame below
+
+    masterlist = dataset["CUSTOMERS_LIST.csv"]
+    raw_sales = dataset["SALES ORDER.csv"]
+    clean_sales = sales.sort_by_date(sales.clean_sales(raw_sales))
+    collections = dataset["SUMMARY COLLECTIONS.csv"]
+    receivables = dataset["ACCOUNTS RECEIVABLE.csv"]
+    top_customer = next(iter(customers.customer_options(clean_sales)))   # a name: the CSVs carry no Customer ID
+
+    def sales_df():
+        return (clean_sales,)
+
+    datastore.sync(data_dir)
+    top_customer_id = next(iter(queries.customer_options(data_dir=data_dir)))
+    top_category = dataset["STOCK LEVELS.csv"]["Category"].iloc[0]
+
+    cases = [
+        # Converters (addtl_info.py), fed the raw exports directly
+        ("convert_sales_file_to_df", addtl_info.convert_sales_file_to_df, lambda: (raw["Sales Order"],)),
+        ("find_header_row[sales]", lambda r: addtl_info.find_header_row(r, addtl_info.HEADER_SIGNATURES["Sales Order"]),
+         lambda: (raw["Sales Order"],)),
+        ("convert_collections_to_df", addtl_info.convert_collections_to_df,
+         lambda: (raw["Summary Collections"],)),
+        ("convert_receivables_to_df", addtl_info.convert_receivables_to_df,
+         lambda: (raw["Accounts Receivable"],)),
+        ("convert_summary_to_df", addtl_info.convert_summary_to_df,
+         lambda: (raw["Summary per Item"],)),
+        ("convert_customer_masterlist_to_df", addtl_info.convert_customer_masterlist_to_df,
+         lambda: (raw["Customer Masterlist"],)),
+        ("process_raw_materials_stock_df", addtl_info.process_raw_materials_stock_df,
+         lambda: (raw["Stock Level"],)),
+
+        ("customer_keys.customer_key", customer_keys.customer_key, lambda: (raw_sales["Customer Name"],)),
+        ("customer_keys.match_customers", lambda keys: customer_keys.match_customers(keys, masterlist["Business Name"]),
+         lambda: (customer_keys.customer_key(raw_sales["Customer Name"]),)),
+
+        # Sales performance (compute/sales.py, compute/aggregation.py)
+        ("sales.clean_sales", sales.clean_sales, lambda: (raw_sales,)),
+        ("sales.monthly_sales", sales.monthly_sales, sales_df),
+        ("sales.periodic_sales[weekly]", lambda df: sales.periodic_sales(df, "weekly"), sales_df),
+        ("sales.periodic_sales[monthly]", lambda df: sales.periodic_sales(df, "monthly"), sales_df),
+        ("sales.periodic_customers[weekly]", lambda df: sales.periodic_customers(df, "weekly"), sales_df),
+        ("sales.periodic_customers[monthly]", lambda df: sales.periodic_customers(df, "monthly"), sales_df),
+        ("sales.periodic_sales[weekly,unsorted]", lambda df: sales.periodic_sales(df, "weekly"),
+         lambda: (clean_sales.sample(frac=1, random_state=0),)),
+        ("sales.reorder_time_stats", sales.reorder_time_stats, sales_df),
+        ("sales.median_transaction_value", sales.median_transaction_value, sales_df),
+        ("sales.count_active_customers", sales.count_active_customers, sales_df),
+        ("sales.churn_history", sales.churn_history, sales_df),
+        ("aggregation.aggregate_recent_by_type[weekly]",
+         lambda df: aggregation.aggregate_recent_by_type(df, "weekly", "Sales per Customer"), sales_df),
+        ("aggregation.aggregate_recent_by_location[monthly]",
+         lambda df: aggregation.aggregate_recent_by_location(df, "monthly", "Sales per Customer"), sales_df),
+        ("aggregation.aggregate_overview", lambda df: aggregation.aggregate_overview(df, "Sales per Customer"), sales_df),
+
+        # Customer management (compute/customers.py, compute/receivables.py)
+        ("customers.order_kpis[all]", customers.order_kpis, sales_df),
+        ("customers.order_kpis[one]", lambda df: customers.order_kpis(df, top_customer), sales_df),
+        ("customers.payment_kpis[all]", customers.payment_kpis,
+         lambda: (_with_dates(collections), _with_dates(receivables))),
+
+        ("receivables.ar_aging", ar_aging, lambda: (_with_dates(receivables), _with_dates(collections))),
+        ("receivables.reconcile_payments", reconcile_payments, lambda: (_with_dates(receivables), _with_dates(collections))),
+        ("receivables.payment_summary", payment_summary,
+         lambda: (reconcile_payments(_with_dates(receivables), _with_dates(collections)),)),
+
+        # Customer insights (project1_utility.py)
+        ("p1.clean_data", project1_utility.clean_data,
+         lambda: (_named_csv(receivables, "receivables.csv"),)),
+
+        # Inventory (project2_utility.py, compute/inventory.py, compute/catalog.py, compute/forecast.py,
+        # compute/suppliers.py)
+        ("catalog.build_item_index", catalog.build_item_index, lambda: (dataset["STOCK LEVELS.csv"],)),
+        ("catalog.search_items[fuzzy]", lambda index: catalog.search_items(index, "materal 12"),
+         lambda: (catalog.build_item_index(dataset["STOCK LEVELS.csv"]),)),
+        ("inventory.prepare_inventory", inventory.prepare_inventory,
+         lambda: (dataset["STOCK LEVELS.csv"], dataset["SUMMARY PER ITEM.csv"])),
+        ("forecast.stockout_forecast", forecast.stockout_forecast,
+         lambda: (dataset["STOCK LEVELS.csv"].assign(**{"Inventory Date": pd.to_datetime(dataset["STOCK LEVELS.csv"]["Inventory Date"])}),
+                  forecast.consumption_velocity(dataset["SUMMARY PER ITEM.csv"]),
+                  forecast.lead_times(_material_lead_stats(dataset)))),
+        ("suppliers.lead_time_stats", lambda po: suppliers.lead_time_stats(suppliers.lead_time_histogram(po)),
+         lambda: (suppliers.clean_po_log(dataset["PO LOG.csv"]),)),
+        ("p2.clean_data", project2_utility.clean_data,
+         lambda: (_named_csv(_p2_stock(dataset), "stock.csv"), [_named_csv(dataset["PO LOG.csv"], "po.csv")])),
+
+        # SQLite query layer (datastore.py, rollups.py, queries.py)
+        ("datastore.rebuild", datastore.rebuild, lambda: (data_dir,)),
+        ("rollups.rebuild", _rebuild_rollups, lambda: (data_dir,)),
+        ("queries.monthly_sales", lambda d: queries.monthly_sales(data_dir=d), lambda: (data_dir,)),
+        ("queries.monthly_sales[quarter]", lambda window: queries.monthly_sales(*window, data_dir=data_dir),
+         lambda: (_last_quarter(data_dir),)),
+        ("queries.bento_rows[monthly]", lambda d: queries.bento_rows("monthly", data_dir=d), lambda: (data_dir,)),
+        ("queries.aggregate_recent_by_type[weekly]",
+         lambda d: queries.aggregate_recent_by_type("weekly", "Sales per Customer", data_dir=d), lambda: (data_dir,)),
+        ("queries.aggregate_recent_by_location[monthly]",
+         lambda d: queries.aggregate_recent_by_location("monthly", "Sales per Customer", data_dir=d), lambda: (data_dir,)),
+        ("queries.aggregate_overview", lambda d: queries.aggregate_overview("Sales per Customer", data_dir=d), lambda: (data_dir,)),
+        ("queries.customer_order_days", lambda d: queries.customer_order_days(data_dir=d), lambda: (data_dir,)),
+        ("queries.invoice_payments", lambda d: queries.invoice_payments(data_dir=d), lambda: (data_dir,)),
+        ("queries.collection_summary",
+         lambda d: queries.collection_summary(queries.date_bounds("receivables", data_dir=d)[1], data_dir=d),
+         lambda: (data_dir,)),
+        ("queries.customer_rows[one]", lambda d: queries.customer_rows("sales", top_customer_id, data_dir=d), lambda: (data_dir,)),
+        ("queries.stock_levels[category]", lambda d: queries.stock_levels(category=top_category, data_dir=d),
+         lambda: (data_dir,)),
+        ("queries.stock_snapshot", lambda d: queries.stock_snapshot(data_dir=d), lambda: (data_dir,)),
+        ("queries.stock_history[one]", lambda code: queries.stock_history(code, data_dir=data_dir),
+         lambda: (dataset["STOCK LEVELS.csv"]["Product Code"].iloc[0],)),
+        ("queries.recent_item_usage", lambda d: queries.recent_item_usage(forecast.VELOCITY_MONTHS, data_dir=d),
+         lambda: (data_dir,)),
+        ("queries.lead_time_stats[supplier,material]",
+         lambda d: queries.lead_time_stats(("SUPPLIER", "RAWMATERIALS"), data_dir=d), lambda: (data_dir,)),
+        ("queries.item_sales[category]", lambda d: queries.item_sales(category=top_category, data_dir=d),
+         lambda: (data_dir,)),
+        ("queries.item_monthly_sales", lambda d: queries.item_monthly_sales(data_dir=d), lambda: (data_dir,)),
+        ("inventory.inventory_facts",
+         lambda d: inventory.inventory_facts(queries.stock_snapshot(data_dir=d), queries.item_monthly_sales(data_dir=d)),
+         lambda: (data_dir,)),
+        # What the Inventory page's load_facts and load_forecast run
+        ("inventory.inventory_facts[quarter]",
+         lambda window: inventory.inventory_facts(queries.stock_snapshot(data_dir=data_dir),
+                                                  queries.item_monthly_sales(*window, data_dir=data_dir)),
+         lambda: (_last_quarter(data_dir),)),
+        ("forecast.stockout_forecast[store]", _store_forecast, lambda: (data_dir,)),
+    ]
+    return cases
+
+
+def _rebuild_rollups(data_dir):
+    import datastore
+    import rollups
+    with datastore.connection(data_dir) as conn:
+        with conn:
+            rollups.rebuild(conn)
+
+
+def _store_forecast(data_dir):
+    import queries
+    from compute import forecast
+    velocity = forecast.consumption_velocity(queries.recent_item_usage(forecast.VELOCITY_MONTHS, data_dir=data_dir))
+    lead_days = forecast.lead_times(queries.lead_time_stats(("RAWMATERIALS",), data_dir=data_dir))
+    return forecast.stockout_forecast(queries.stock_snapshot(data_dir=data_dir), velocity, lead_days)
+
+
+def _last_quarter(data_dir):
+    import date_range
+    import queries
+    start, end = date_range.window_bounds("Last quarter", queries.date_bounds(data_dir=data_dir)[1])
+    return start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _with_dates(df):
+    return df.assign(Date=pd.to_datetime(df["Date"]))
+
+
+def _material_lead_stats(dataset):
+    from compute import suppliers
+    po = suppliers.clean_po_log(dataset["PO LOG.csv"])
+    return suppliers.lead_time_stats(suppliers.lead_time_histogram(po, ("RAWMATERIALS",)), ("RAWMATERIALS",))
+
+
+def _p2_stock(dataset):
+    stock = dataset["STOCK LEVELS.csv"]
+    return pd.DataFrame({
+        "Product Description": stock["Product Description"],
+        "ON HAND STOCK": stock["Qty"],
+        "UNIT PRICE/Kg": 100.0,
+    })
+
+
+def run(rows_list, customers_list, n_items, repeat, pattern, seed):
+    results = []
+    for n_rows in rows_list:
+        for n_customers in customers_list:
+            print(f"\n== {n_rows:,} rows / {n_customers:,} customers ==")
+            dataset = synth.generate_dataset(n_rows, n_customers, n_items, seed)
+            raw = synth.generate_raw_exports(dataset)
+            with tempfile.TemporaryDirectory() as data_dir:
+                synth.write_dataset(dataset, data_dir)
+                for name, func, setup in build_cases(dataset, raw, data_dir):
+                    if not fnmatch.fnmatch(name, pattern):
+                        continue
+                    try:
+                        timings = time_call(func, setup, repeat)
+                    except Exception as e:
+                        print(f"{name:<52} FAILED: {e!r}")
+                        results.append({"name": name, "rows": n_rows, "customers": n_customers, "error": repr(e)})
+                        continue
+                    best = min(timings)
+                    print(f"{name:<52} {best * 1000:>10.1f} ms")
+                    results.append({
+                        "name": name,
+                        "rows": n_rows,
+                        "customers": n_customers,
+                        "items": n_items,
+                        "repeat": repeat,
+                        "seconds_min": best,
+                        "seconds_median": statistics.median(timings),
+                        "seconds_all": timings,
+                    })
+    return results
+
+
+def compare(results, baseline_path):
+    """Prints speedups against a previous results file (same name, rows and customers)."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["name"], r["rows"], r["customers"]): r for r in baseline["results"] if "seconds_min" in r}
+
+    print(f"\n== Compared with {baseline_path} ==")
+    for r in results:
+        key = (r["name"], r["rows"], r["customers"])
+        if "seconds_min" not in r or key not in before:
+            continue
+        old, new = before[key]["seconds_min"], r["seconds_min"]
+        speedup = old / new if new > 0 else float("inf")
+        print(f"{r['name']:<52} {r['rows']:>9,} {old * 1000:>10.1f} -> {new * 1000:>10.1f} ms  x{speedup:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JChemie converters and compute functions.")
+    parser.add_argument("--rows", default="1k,10k,100k", help="comma separated row counts, e.g. 1k,100k,5m")
+    parser.add_argument("--customers", default="100,1000", help="comma separated customer counts, e.g. 100,50k")
+    parser.add_argument("--items", type=int, default=500, help="number of SKUs in the item catalog")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default="*", help="glob over benchmark names, e.g. 'p3.*'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    results = run(_parse_sizes(args.rows), _parse_sizes(args.customers), args.items, args.repeat, args.only, args.seed)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": sys.version.split()[0],
+                "pandas": pd.__version__,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import os
+import numpy as np
+import pandas as pd
+
+######################
+# SYNTHETIC JCHEMIE DATA
+######################
+# Generates data shaped like the files in data/ (what Data_Updates.py writes)
+# and like the raw xlrd exports the converters in addtl_info.py parse.
+
+CUSTOMER_TYPES = ["Distributor", "Retail", "Hospital", "Laboratory", "School", "Hotel", "Government"]
+ACCOUNTS = ["Main Office", "North Branch", "South Branch", "Online"]
+CITIES = ["Quezon City, Metro Manila", "Makati, Metro Manila", "Cebu City, Cebu", "Davao City, Davao del Sur",
+          "Iloilo City, Iloilo", "Baguio, Benguet", "Bacolod, Negros Occidental", "Pasig, Metro Manila"]
+CATEGORIES = ["ACIDS", "SOLVENTS", "SALTS", "DETERGENTS", "REAGENTS", "PACKAGING", "OTHERS"]
+UNITS = ["KG", "L", "GAL", "PC", "DRUM"]
+COLLECTION_TYPES = ["Cash", "Check", "Bank Transfer"]
+RECEIVABLE_TYPES = ["Charge", "COD", "Consignment"]
+SUPPLIERS = ["Chemline Inc.", "Pacific Resins", "Asia Solvents", "Metro Packaging", "Luzon Chemicals"]
+
+
+def _rng(seed):
+    return np.random.default_rng(seed)
+
+
+def _dates(rng, n_rows, start, end):
+    """Random order dates between start and end, returned sorted (as exports are)."""
+    start = pd.Timestamp(start)
+    days = (pd.Timestamp(end) - start).days + 1
+    offsets = np.sort(rng.integers(0, days, n_rows))
+    return start + pd.to_timedelta(offsets, unit="D")
+
+
+def generate_customers(n_customers=100, seed=0):
+    """CUSTOMERS_LIST.csv as written by convert_customer_masterlist_to_df."""
+    rng = _rng(seed)
+    ids = np.arange(n_customers)
+    return pd.DataFrame({
+        "Business Name": [f"CUSTOMER {i:05d} TRADING" for i in ids],
+        "Customer's Name": [f"Contact {i:05d}" for i in ids],
+        "Location": rng.choice(CITIES, n_customers),
+        "Contact No.": [f"09{n:09d}" for n in rng.integers(0, 10**9, n_customers)],
+        "Account": rng.choice(ACCOUNTS, n_customers),
+        "Type": rng.choice(CUSTOMER_TYPES, n_customers),
+    })
+
+
+def _customer_picks(rng, n_rows, n_customers):
+    # A few customers account for most orders, like the real book
+    weights = 1.0 / np.arange(1, n_customers + 1)
+    return rng.choice(n_customers, n_rows, p=weights / weights.sum())
+
+
+def generate_sales_orders(customers, n_rows=1000, seed=0, start="2022-01-01", end="2025-09-30"):
+    """SALES ORDER.csv as written by convert_sales_file_to_df (sales merged with the masterlist)."""
+    rng = _rng(seed)
+    picks = _customer_picks(rng, n_rows, len(customers))
+    cust = customers.iloc[picks].reset_index(drop=True)
+    df = pd.DataFrame({
+        "Date": _dates(rng, n_rows, start, end),
+        "SO  #": np.arange(100000, 100000 + n_rows),
+        "Customer Name": cust["Business Name"],
+        "Total Amount": np.round(rng.lognormal(9, 1, n_rows), 2),
+    })
+    return pd.concat([df, cust.drop(columns=["Business Name"])], axis=1)
+
+
+def generate_collections(customers, n_rows=1000, seed=0, start="2022-01-01", end="2025-09-30"):
+    """SUMMARY COLLECTIONS.csv as written by convert_collections_to_df."""
+    rng = _rng(seed + 1)
+    picks = _customer_picks(rng, n_rows, len(customers))
+    return pd.DataFrame({
+        "Date": _dates(rng, n_rows, start, end),
+        "Type": rng.choice(COLLECTION_TYPES, n_rows),
+        "OR #": np.arange(500000, 500000 + n_rows),
+        "Customer Name": customers["Business Name"].to_numpy()[picks],
+        "PM": rng.choice(["CASH", "CHECK", "BDO", "BPI"], n_rows),
+        "Check Amount": np.round(rng.lognormal(9, 1, n_rows), 2),
+    })
+
+
+def generate_receivables(customers, n_rows=1000, seed=0, start="2022-01-01", end="2025-09-30"):
+    """ACCOUNTS RECEIVABLE.csv as written by convert_receivables_to_df."""
+    rng = _rng(seed + 2)
+    picks = _customer_picks(rng, n_rows, len(customers))
+    amount_due = np.round(rng.lognormal(9, 1, n_rows), 2)
+    paid = np.round(amount_due * rng.choice([0, 0.5, 1], n_rows, p=[0.5, 0.2, 0.3]), 2)
+    return pd.DataFrame({
+        "Date": _dates(rng, n_rows, start, end),
+        "Type": rng.choice(RECEIVABLE_TYPES, n_rows),
+        "SI #": np.arange(700000, 700000 + n_rows),
+        "Customer Name": customers["Business Name"].to_numpy()[picks],
+        "Amount Due": amount_due,
+        "Paid Amount": paid,
+        "Balance": np.round(amount_due - paid, 2),
+    })
+
+
+def generate_items(n_items=500, seed=0):
+    """Item catalog shared by the stock and summary-per-item generators."""
+    rng = _rng(seed + 3)
+    return pd.DataFrame({
+        "Product Code": [f"RM-{i:05d}" for i in range(n_items)],
+        "Product Description": [f"RAW MATERIAL {i:05d}" for i in range(n_items)],
+        "Unit": rng.choice(UNITS, n_items),
+        "Category": rng.choice(CATEGORIES, n_items),
+        "Unit Cost": np.round(rng.uniform(20, 2000, n_items), 2),
+    })
+
+
+def generate_summary_per_item(items, n_months=24, seed=0, end="2025-09-01"):
+    """SUMMARY PER ITEM.csv as written by convert_summary_to_df (one row per item per month)."""
+    rng = _rng(seed + 4)
+    months = pd.date_range(end=end, periods=n_months, freq="MS")
+    n_items = len(items)
+    qty = rng.poisson(rng.uniform(0, 60, n_items), (n_months, n_items)).ravel()
+    unit_cost = np.tile(items["Unit Cost"].to_numpy(), n_months)
+    cost = np.round(qty * unit_cost, 2)
+    return pd.DataFrame({
+        "Product Code": np.tile(items["Product Code"].to_numpy(), n_months),
+        "Item Description": np.tile(items["Product Description"].to_numpy(), n_months),
+        "Unit": np.tile(items["Unit"].to_numpy(), n_months),
+        "Qty": qty,
+        "Amount": np.round(cost * rng.uniform(1.1, 1.6, qty.size), 2),
+        "Cost": cost,
+        "Month-Year": np.repeat(months, n_items),
+    })
+
+
+def generate_stock_levels(items, n_snapshots=1, seed=0, end="2025-09-30"):
+    """STOCK LEVELS.csv as written by process_raw_materials_stock_df (appended snapshots)."""
+    rng = _rng(seed + 5)
+    dates = pd.date_range(end=end, periods=n_snapshots, freq="MS")
+    frames = []
+    for inventory_date in dates:
+        frames.append(pd.DataFrame({
+            "Product Code": items["Product Code"],
+            "Product Description": items["Product Description"],
+            "Unit": items["Unit"],
+            "Qty": rng.integers(0, 500, len(items)),
+            "Min Level": rng.choice([0, 10, 25, 50, 100], len(items)),
+            "Category": items["Category"],
+            "Inventory Date": inventory_date,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def generate_po_log(items, n_rows=1000, seed=0, start="2024-01-01", end="2025-09-30"):
+    """Procurement PO log in the layout project2_utility.clean_data reads."""
+    rng = _rng(seed + 6)
+    requested = _dates(rng, n_rows, start, end)
+    lead_days = rng.gamma(3, 4, n_rows).round().astype(int) + 1
+    return pd.DataFrame({
+        "DATE REQUEST": requested,
+        "DELIVERY DATE": requested + pd.to_timedelta(lead_days, unit="D"),
+        "SUPPLIER": rng.choice(SUPPLIERS, n_rows),
+        "RAWMATERIALS": items["Product Description"].to_numpy()[rng.integers(0, len(items), n_rows)],
+        "AMMOUNT": [f"₱{v:,.2f}" for v in rng.lognormal(10, 1, n_rows)],
+        "STATUS": rng.choice(["DELIVERED", "PENDING"], n_rows, p=[0.9, 0.1]),
+    })
+
+
+######################
+# RAW EXPORTS
+######################
+# header=None frames laid out like the accounting system's .xls exports:
+# title rows, a header row with blank spacer columns, the data, then totals.
+
+def _raw_export(title, columns, data, spacers=(), totals=None):
+    width = len(columns) + len(spacers)
+    header = []
+    body_cols = []
+    col_iter = iter(columns)
+    for pos in range(width):
+        if pos in spacers:
+            header.append(np.nan)
+            body_cols.append(None)
+        else:
+            name = next(col_iter)
+            header.append(name)
+            body_cols.append(name)
+
+    body = np.empty((len(data), width), dtype=object)
+    body[:] = np.nan
+    for pos, name in enumerate(body_cols):
+        if name is not None:
+            body[:, pos] = data[name].to_numpy(dtype=object)
+
+    top = np.full((4, width), np.nan, dtype=object)
+    top[0, 0] = "J. CHEMIE MARKETING"
+    top[1, 0] = title
+    rows = [top, np.array([header], dtype=object), body, np.full((1, width), np.nan, dtype=object)]
+    if totals is not None:
+        total_row = np.full((1, width), np.nan, dtype=object)
+        total_row[0, 0] = "GRAND TOTAL"
+        total_row[0, width - 1] = totals
+        rows.append(total_row)
+    return pd.DataFrame(np.vstack(rows))
+
+
+def _messy_names(rng, names):
+    # The exports prefix names with codes, bullets and dashes that the converters strip
+    prefixes = np.array(["", "", "01 - ", "* ", "-- ", "12-"])
+    return prefixes[rng.integers(0, len(prefixes), len(names))] + names
+
+
+def raw_sales_export(sales, seed=0):
+    rng = _rng(seed + 7)
+    data = sales[["Date", "SO  #", "Customer Name", "Total Amount"]].copy()
+    data["Customer Name"] = _messy_names(rng, data["Customer Name"].to_numpy(dtype=str))
+    return _raw_export("SALES ORDER REPORT", ["Date", "SO  #", "Customer Name", "Total Amount"], data,
+                       spacers=(3, 4), totals=data["Total Amount"].sum())
+
+
+def raw_collections_export(collections, seed=0):
+    rng = _rng(seed + 8)
+    data = collections.copy()
+    data["Customer Name"] = _messy_names(rng, data["Customer Name"].to_numpy(dtype=str))
+    data["Amount"] = data["Check Amount"]
+    columns = ["Date", "Type", "OR #", "Customer Name", "PM", "Amount", "Check Amount"]
+    return _raw_export("SUMMARY OF COLLECTIONS", columns, data, spacers=(4,))
+
+
+def raw_receivables_export(receivables, seed=0):
+    rng = _rng(seed + 9)
+    data = receivables.copy()
+    data["Customer Name"] = _messy_names(rng, data["Customer Name"].to_numpy(dtype=str))
+    columns = ["Date", "Type", "SI #", "Customer Name", "Amount Due", "Paid Amount", "Balance"]
+    return _raw_export("ACCOUNTS RECEIVABLE", columns, data, spacers=(4,))
+
+
+def raw_summary_export(summary):
+    """One sheet per month, named like "January 2025"."""
+    columns = ["Product Code", "Item Description", "Unit", "Qty", "Amount", "Cost"]
+    sheets = {}
+    for month, month_df in summary.groupby("Month-Year"):
+        sheets[month.strftime("%B %Y")] = _raw_export("SUMMARY PER ITEM", columns, month_df,
+                                                      totals=month_df["Amount"].sum())
+    return sheets
+
+
+def raw_masterlist_export(customers):
+    """One sheet per account, with the customer type in cell A2."""
+    columns = ["Business Name", "Customer's Name", "Location", "Contact No."]
+    sheets = {}
+    for account, account_df in customers.groupby("Account"):
+        raw = _raw_export("CUSTOMER MASTERLIST", columns, account_df)
+        raw.iloc[1, 0] = account_df["Type"].iloc[0]
+        sheets[account] = raw
+    return sheets
+
+
+def raw_stock_export(stock):
+    """Latest snapshot laid out with category header rows (Unit left blank)."""
+    latest = stock[stock["Inventory Date"] == stock["Inventory Date"].max()]
+    columns = ["Product Code", "Product Description", "Unit", "Qty", "Min Level"]
+    parts = []
+    for category, cat_df in latest.groupby("Category"):
+        parts.append(pd.DataFrame({"Product Code": [category]}))
+        parts.append(cat_df[columns])
+    data = pd.concat(parts, ignore_index=True).reindex(columns=columns)
+    raw = _raw_export("RAW MATERIALS STOCK", columns, data)
+    raw.iloc[2, 0] = f"Running Inventory as of {latest['Inventory Date'].iloc[0]:%m/%d/%Y}"
+    return raw
+
+
+######################
+# DATASET BUNDLES
+######################
+
+def generate_dataset(n_rows=1000, n_customers=100, n_items=500, seed=0):
+    """Every stored dataset at one size, keyed by its data/ file name."""
+    customers = generate_customers(n_customers, seed)
+    items = generate_items(n_items, seed)
+    n_months = max(1, min(60, n_rows // max(n_items, 1)))
+    return {
+        "CUSTOMERS_LIST.csv": customers,
+        "SALES ORDER.csv": generate_sales_orders(customers, n_rows, seed),
+        "SUMMARY COLLECTIONS.csv": generate_collections(customers, n_rows, seed),
+        "ACCOUNTS RECEIVABLE.csv": generate_receivables(customers, n_rows, seed),
+        "SUMMARY PER ITEM.csv": generate_summary_per_item(items, n_months, seed),
+        "STOCK LEVELS.csv": generate_stock_levels(items, 1, seed),
+        "PO LOG.csv": generate_po_log(items, max(100, n_rows // 10), seed),
+    }
+
+
+def generate_raw_exports(dataset):
+    """Raw xlrd-style exports matching a dataset from generate_dataset."""
+    return {
+        "Sales Order": raw_sales_export(dataset["SALES ORDER.csv"]),
+        "Summary Collections": raw_collections_export(dataset["SUMMARY COLLECTIONS.csv"]),
+        "Accounts Receivable": raw_receivables_export(dataset["ACCOUNTS RECEIVABLE.csv"]),
+        "Summary per Item": raw_summary_export(dataset["SUMMARY PER ITEM.csv"]),
+        "Customer Masterlist": raw_masterlist_export(dataset["CUSTOMERS_LIST.csv"]),
+        "Stock Level": raw_stock_export(dataset["STOCK LEVELS.csv"]),
+    }
+
+
+def write_dataset(dataset, data_dir):
+    """Writes a generated dataset as CSVs, the way Data_Updates.py stores them."""
+    os.makedirs(data_dir, exist_ok=True)
+    for file_name, df in dataset.items():
+        df.to_csv(os.path.join(data_dir, file_name), index=False)
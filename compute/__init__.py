@@ -0,0 +1,8 @@
+"""
+Streamlit-free calculations behind the dashboards.
+
+Every function takes and returns plain pandas objects (or small dataclasses of
+them), so the same KPIs can be computed in batch jobs, worker processes and
+benchmarks as well as under the pages, which only render the results.
+"""
+from compute import aggregation, catalog, customer_keys, customers, forecast, inventory, receivables, sales, suppliers
@@ -0,0 +1,82 @@
+import pandas as pd
+
+from compute.customer_keys import CUSTOMER_ID_COL, customer_ids
+
+METRICS = ("Sales (Total)", "Number of Customers", "Sales per Customer")
+
+
+def clean_location(loc) -> str:
+    """Reduces "City, Province" to the last component; blanks become "Unknown"."""
+    if pd.isna(loc) or str(loc).strip() == "":
+        return "Unknown"
+    parts = [p.strip() for p in str(loc).split(',')]
+    return parts[-1] if len(parts) > 1 else parts[0]
+
+
+def with_clean_location(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df['Clean_Location'] = df['Location'].apply(clean_location)
+    return df
+
+
+def aggregate_metric(df: pd.DataFrame, group_col: str, metric: str) -> pd.DataFrame:
+    """One row per group with the chosen metric in `Value`, largest first. Customers
+    are counted by Customer ID (compute.customer_keys)."""
+    df = df.assign(**{CUSTOMER_ID_COL: customer_ids(df)})
+    if metric == "Sales (Total)":
+        agg_df = df.groupby(group_col, as_index=False)['Total Amount'].sum().rename(columns={'Total Amount': 'Value'})
+    elif metric == "Number of Customers":
+        agg_df = df.groupby(group_col, as_index=False)[CUSTOMER_ID_COL].nunique().rename(columns={CUSTOMER_ID_COL: 'Value'})
+    elif metric == "Sales per Customer":
+        temp = df.groupby(group_col, as_index=False).agg(
+            Total_Sales=('Total Amount', 'sum'),
+            Num_Customers=(CUSTOMER_ID_COL, 'nunique')
+        )
+        temp['Value'] = temp['Total_Sales'] / temp['Num_Customers']
+        agg_df = temp[[group_col, 'Value']]
+    else:
+        raise ValueError("Invalid metric")
+
+    return agg_df.sort_values('Value', ascending=False)
+
+
+def latest_periods(df: pd.DataFrame, frequency: str, n_periods: int = 5) -> pd.DataFrame:
+    """Rows falling in the last `n_periods` weeks or months that have orders."""
+    if frequency == 'weekly':
+        period = df['Date'].dt.to_period('W').dt.start_time
+    elif frequency == 'monthly':
+        period = df['Date'].dt.to_period('M').dt.start_time
+    else:
+        raise ValueError("frequency must be 'weekly' or 'monthly'")
+
+    latest = period.drop_duplicates().nlargest(n_periods)
+    return df[period.isin(latest)]
+
+
+def aggregate_recent_by_type(df: pd.DataFrame, frequency: str, metric: str) -> pd.DataFrame:
+    df = latest_periods(df, frequency)
+    df = df.assign(Type=df['Type'].fillna("Unknown"))
+    return aggregate_metric(df, 'Type', metric)
+
+
+def aggregate_recent_by_location(df: pd.DataFrame, frequency: str, metric: str) -> pd.DataFrame:
+    df = with_clean_location(latest_periods(df, frequency))
+    return aggregate_metric(df, 'Clean_Location', metric)
+
+
+def aggregate_overview(df: pd.DataFrame, metric: str):
+    """(by customer Type, by Location) over the whole history."""
+    df = with_clean_location(df)
+    df['Type'] = df['Type'].fillna("Unknown")
+    return aggregate_metric(df, 'Type', metric), aggregate_metric(df, 'Clean_Location', metric)
+
+
+def top_with_others(agg_df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
+    """Keeps the top `n` rows and folds the rest into a trailing "Others" row."""
+    if len(agg_df) <= n:
+        return agg_df
+    top_df = agg_df.head(n).reset_index(drop=True)
+    others_sum = agg_df['Value'].iloc[n:].sum()
+    if others_sum > 0:
+        top_df.loc[len(top_df)] = ['Others', others_sum]
+    return top_df
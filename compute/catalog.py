@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+ITEM_RESULTS = 20
+
+
+@dataclass
+class ItemIndex:
+    """Search index over the stock list, keyed by Product Code. `codes`, `labels`
+    and `keys` are aligned and sorted by label; `by_category` holds the positions
+    of each category's items."""
+    codes: pd.Series         # Product Code
+    labels: dict             # Product Code -> "<description> (<code>)"
+    keys: pd.Series          # lowercased "<code> <description>", what queries match
+    by_category: dict
+
+
+def build_item_index(stock_df: pd.DataFrame) -> ItemIndex:
+    items = stock_df.drop_duplicates(subset="Product Code").copy()
+    items["label"] = items["Product Description"] + " (" + items["Product Code"] + ")"
+    items = items.sort_values("label").reset_index(drop=True)
+
+    return ItemIndex(
+        codes=items["Product Code"],
+        labels=dict(zip(items["Product Code"], items["label"])),
+        keys=(items["Product Code"] + " " + items["Product Description"]).str.lower(),
+        by_category={cat: group.index.to_numpy() for cat, group in items.groupby("Category", sort=False)},
+    )
+
+
+def search_items(index: ItemIndex, query: str, category=None, limit: int = ITEM_RESULTS) -> list:
+    """Product Codes of the best `limit` matches: codes or description words starting
+    with `query` first (alphabetically), then fuzzy matches by score. An empty query
+    lists the first items alphabetically."""
+    keys = index.keys
+    if category is not None:
+        keys = keys.iloc[index.by_category.get(category, [])]
+
+    query = (query or "").strip().lower()
+    if not query:
+        return index.codes[keys.index[:limit]].tolist()
+
+    # Any word of "<code> <description>" starting with the query
+    prefix = keys.str.startswith(query) | keys.str.contains(" " + query, regex=False)
+    hits = list(keys.index[prefix][:limit])
+
+    if len(hits) < limit:
+        rest = keys[~prefix]
+        fuzzy = process.extract(query, rest, scorer=fuzz.WRatio, limit=limit - len(hits), score_cutoff=60)
+        hits.extend(position for _, _, position in fuzzy)
+
+    return index.codes[hits].tolist()
@@ -0,0 +1,74 @@
+import re
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+CUSTOMER_ID_COL = "Customer ID"
+
+# Masterlist (CUSTOMERS_LIST.csv) columns describing a customer, kept once per
+# customer in the store's customer dimension rather than on every sales row
+BUSINESS_NAME_COL = "Business Name"
+CUSTOMER_ATTRS = ["Customer's Name", "Location", "Contact No.", "Account", "Type"]
+MATCH_SCORE = 80   # lowest fuzz.ratio a sales name needs to take a masterlist entry's attributes
+MATCH_CHUNK = 1024   # keys scored per cdist call: 1024 x 50k masterlist entries is ~200 MB
+
+# List decorations the accounting exports put around names: leading dashes,
+# asterisks and "12 - " numbering, trailing dashes
+_DECORATION = re.compile(r'^(?:\s*(?:-+|\*|\d+\s*-\s*)*)|(?:-+\s*)$')
+
+
+def on_uniques(values: pd.Series, func) -> pd.Series:
+    """func applied to the distinct values of `values` only and mapped back by their
+    codes, so cleaning costs one call per customer however many rows mention it.
+    `func` takes and returns a Series of the uniques; missing values stay missing."""
+    codes, uniques = pd.factorize(values)
+    done = func(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    # Code -1 (missing) picks the None appended at the end
+    return pd.Series(np.append(done, None)[codes], index=values.index, dtype=object)
+
+
+def clean_customer_names(names: pd.Series) -> pd.Series:
+    """Customer names without the export's list decorations, whitespace-stripped."""
+    return on_uniques(names, lambda u: u.str.replace(_DECORATION, '', regex=True).str.strip())
+
+
+def customer_key(names: pd.Series) -> pd.Series:
+    """The canonical form customers are identified by: cleaned, upper-cased, runs of
+    whitespace collapsed (the masterlist's Business Names are upper-case)."""
+    def canonical(uniques: pd.Series) -> pd.Series:
+        keys = uniques.astype(str).str.replace(_DECORATION, '', regex=True).str.upper().str.split().str.join(' ')
+        return keys.where(keys != '')
+
+    return on_uniques(names, canonical)
+
+
+def customer_ids(df: pd.DataFrame, name_col: str = "Customer Name") -> pd.Series:
+    """Integer customer of each row, for group-bys and distinct counts: the stored
+    Customer ID of rows read from the store (datastore.py), else codes of the rows'
+    customer_key. <NA> where there is no name."""
+    if CUSTOMER_ID_COL in df.columns:
+        return df[CUSTOMER_ID_COL].astype("Int64")
+    codes, _ = pd.factorize(customer_key(df[name_col]))
+    return pd.Series(codes, index=df.index, dtype="Int64").mask(codes < 0)
+
+
+def match_customers(keys: pd.Series, business_names: pd.Series) -> pd.Series:
+    """Index label in `business_names` of the masterlist entry each customer key
+    matches best (fuzz.ratio against the upper-cased Business Names, at least
+    MATCH_SCORE), None when none does. Scored over the distinct keys, MATCH_CHUNK at
+    a time so the score matrix stays small against a large masterlist."""
+    choices = business_names.dropna().astype(str).str.upper()
+    codes, uniques = pd.factorize(keys)
+    if len(uniques) == 0 or choices.empty:
+        return pd.Series(None, index=keys.index, dtype=object)
+    choice_list, choice_labels = list(choices), choices.index.to_numpy()
+    labels = np.empty(len(uniques), dtype=object)
+    for start in range(0, len(uniques), MATCH_CHUNK):
+        chunk = list(uniques[start:start + MATCH_CHUNK])
+        scores = process.cdist(chunk, choice_list, scorer=fuzz.ratio, dtype=np.float32,
+                               score_cutoff=MATCH_SCORE, workers=-1)
+        best = scores.argmax(axis=1)
+        labels[start:start + len(chunk)] = np.where(scores[np.arange(len(chunk)), best] >= MATCH_SCORE,
+                                                    choice_labels[best], None)
+    return pd.Series(np.append(labels, None)[codes], index=keys.index)
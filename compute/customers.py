@@ -0,0 +1,113 @@
+import datetime
+from typing import Optional
+
+import pandas as pd
+
+from compute.customer_keys import CUSTOMER_ID_COL, customer_ids, customer_key
+
+ALL_CUSTOMERS = "All Customers"
+
+# Customers are told apart by customer_ids(): the stored Customer ID, so that every
+# spelling of a name is one customer. A customer is picked by that ID, or by a
+# name (matched on its customer_key) in frames that carry none.
+
+
+def customer_options(sales: pd.DataFrame) -> dict:
+    """{customer: name} ordered by lifetime sales, largest first; each customer is
+    named as on its first row and is its Customer ID, or that name when `sales` has
+    no IDs."""
+    ids = customer_ids(sales)
+    totals = sales['Total Amount'].groupby(ids).sum().sort_values(ascending=False, kind='stable')
+    names = sales['Customer Name'].groupby(ids).first()
+    keyed = CUSTOMER_ID_COL in sales.columns
+    return {(int(c) if keyed else names[c]): names[c] for c in totals.index}
+
+
+def _is_all(customer) -> bool:
+    return customer is None or (isinstance(customer, str) and customer == ALL_CUSTOMERS)
+
+
+def filter_customer(df: pd.DataFrame, customer) -> pd.DataFrame:
+    if _is_all(customer):
+        return df.copy()
+    if isinstance(customer, str):
+        mask = customer_key(df['Customer Name']) == customer_key(pd.Series([customer])).iloc[0]
+    else:
+        mask = customer_ids(df) == customer
+    return df[mask.fillna(False).to_numpy(dtype=bool)].reset_index(drop=True)
+
+
+def _mean_of_last_gaps(dates: pd.Series) -> float:
+    d_dates = dates.drop_duplicates().tail(4).sort_values()
+    if len(d_dates) > 1:
+        return d_dates.diff().dt.days.dropna().mean()
+    return 0
+
+
+def order_kpis(sales: pd.DataFrame, customer=None, now: Optional[datetime.datetime] = None) -> dict:
+    """Reorder time, recency and order size for one customer, or the median customer
+    when `customer` is None / "All Customers". `sales` must have parsed dates."""
+    now = now or datetime.datetime.now()
+    filtered = filter_customer(sales, customer).sort_values('Date')
+
+    if _is_all(customer):
+        grp = sales.groupby(customer_ids(sales))
+
+        reorder_means = grp['Date'].apply(lambda x: x.sort_values().diff().dt.days.rolling(4, min_periods=1).mean().iloc[-1])
+        average_reorder_time = reorder_means.median()
+
+        last_dates = grp['Date'].max()
+        days_since_last_order = (now - last_dates).dt.days.median()
+
+        amt_means = grp['Total Amount'].apply(lambda x: x.rolling(4, min_periods=1).mean().iloc[-1])
+        average_order_amount = amt_means.median()
+    else:
+        diff_days = filtered['Date'].diff().dt.days
+        average_reorder_time = diff_days.rolling(4, min_periods=1).mean().iloc[-1]
+        days_since_last_order = (now - filtered['Date'].max()).days
+        average_order_amount = filtered['Total Amount'].rolling(4, min_periods=1).mean().iloc[-1]
+
+    return {
+        "average_reorder_time": average_reorder_time,
+        "days_since_last_order": days_since_last_order,
+        "average_order_amount": average_order_amount,
+        "total_orders": len(filtered),
+        "total_revenue": filtered['Total Amount'].sum(),
+    }
+
+
+def customer_profile(sales: pd.DataFrame, customer) -> dict:
+    """Masterlist attributes on the customer's sales rows (joined from the store's
+    customer dimension by queries.customer_rows)."""
+    row = filter_customer(sales, customer).iloc[0]
+    return {
+        "Customer Name": row['Customer Name'],
+        "Account": row.get('Account'),
+        "Location": row.get('Location'),
+        "Type": row.get('Type'),
+        "Contact Name": row.get("Customer's Name"),
+    }
+
+
+def payment_kpis(collections: pd.DataFrame, receivables: pd.DataFrame, customer=None) -> dict:
+    """Collection/receivable period and amount over each customer's last 4 records
+    (median across customers for "All Customers"). Both frames must have parsed dates."""
+    f_collections = filter_customer(collections, customer)
+    f_receivables = filter_customer(receivables, customer)
+
+    if _is_all(customer):
+        col_grp = f_collections.groupby(customer_ids(f_collections))
+        rec_grp = f_receivables.groupby(customer_ids(f_receivables))
+        return {
+            "average_collection_amount": col_grp['Check Amount'].apply(lambda x: x.tail(4).mean()).median(),
+            "average_collection_period": col_grp['Date'].apply(_mean_of_last_gaps).median(),
+            "average_receivable_amount": rec_grp['Balance'].apply(lambda x: x.tail(4).mean()).median(),
+            "average_receivable_period": rec_grp['Date'].apply(_mean_of_last_gaps).median(),
+        }
+
+    return {
+        "average_collection_amount": f_collections['Check Amount'].tail(4).mean(),
+        "average_collection_period": _mean_of_last_gaps(f_collections['Date']),
+        "average_receivable_amount": f_receivables['Balance'].tail(4).mean(),
+        "average_receivable_period": _mean_of_last_gaps(f_receivables['Date']),
+    }
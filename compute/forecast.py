@@ -0,0 +1,62 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+VELOCITY_MONTHS = 3      # months of SUMMARY PER ITEM the usage rate is averaged over
+DEFAULT_LEAD_DAYS = 14   # for items no PO log has delivered yet
+HORIZON_DAYS = 3650      # no dates are projected further out than this
+
+FORECAST_COLS = ['Daily_Usage', 'Days_of_Cover', 'Lead_Time_Days', 'Stockout_Date', 'Reorder_Date', 'Days_to_Reorder']
+
+
+def consumption_velocity(usage_df: pd.DataFrame) -> pd.Series:
+    """Units used per day by each Product Code: its Qty over the months in `usage_df`
+    (monthly SUMMARY PER ITEM rows) divided by the days those months span."""
+    if usage_df.empty:
+        return pd.Series(dtype=float, name='Daily_Usage')
+    months = pd.to_datetime(usage_df['Month-Year'], errors='coerce')
+    first, last = months.min(), months.max()
+    days = ((last + pd.offsets.MonthBegin(1)) - first).days
+    qty = usage_df['Qty'].clip(lower=0).groupby(usage_df['Product Code']).sum()
+    return (qty / days).rename('Daily_Usage')
+
+
+def lead_times(material_stats: pd.DataFrame) -> pd.Series:
+    """Mean delivery lead time in days per raw material description, from
+    compute.suppliers.lead_time_stats(..., by=('RAWMATERIALS',))."""
+    return material_stats.set_index('RAWMATERIALS')['Mean'].rename('Lead_Time_Days')
+
+
+def stockout_forecast(stock_df: pd.DataFrame, velocity: pd.Series, lead_days: Optional[pd.Series] = None,
+                      default_lead_days: float = DEFAULT_LEAD_DAYS) -> pd.DataFrame:
+    """Per stock row: Daily_Usage, Days_of_Cover (Qty / usage, inf when nothing is
+    used), Lead_Time_Days (by Product Description, else `default_lead_days`), the
+    projected Stockout_Date from the row's Inventory Date (none beyond HORIZON_DAYS),
+    the Reorder_Date one lead time earlier and Days_to_Reorder from the snapshot (negative when overdue).
+    Computed over whole columns, so the full catalog costs one pass."""
+    usage = stock_df['Product Code'].map(velocity).fillna(0.0).to_numpy(dtype=float)
+    qty = stock_df['Qty'].fillna(0).clip(lower=0).to_numpy(dtype=float)
+
+    cover = np.full(len(stock_df), np.inf)
+    np.divide(qty, usage, out=cover, where=usage > 0)
+
+    lead = np.full(len(stock_df), float(default_lead_days))
+    if lead_days is not None and not lead_days.empty:
+        lead = stock_df['Product Description'].astype(str).str.strip().map(lead_days).fillna(default_lead_days).to_numpy(dtype=float)
+
+    to_reorder = cover - lead
+    finite = cover <= HORIZON_DAYS
+    snapshot = pd.to_datetime(stock_df['Inventory Date']).to_numpy()
+    # Whole days: stock runs out during the day its cover ends
+    stockout = snapshot + pd.to_timedelta(np.where(finite, np.floor(cover), np.nan), unit='D').to_numpy()
+    reorder = snapshot + pd.to_timedelta(np.where(finite, np.floor(to_reorder), np.nan), unit='D').to_numpy()
+
+    return pd.DataFrame({
+        'Daily_Usage': usage,
+        'Days_of_Cover': cover,
+        'Lead_Time_Days': lead,
+        'Stockout_Date': stockout,
+        'Reorder_Date': reorder,
+        'Days_to_Reorder': to_reorder,
+    }, index=stock_df.index)
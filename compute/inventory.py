@@ -0,0 +1,182 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+MONTH_KEY = "Month"  # "YYYY-MM" of Month-Year, for the month filter
+
+
+def unit_costs(summary_df: pd.DataFrame) -> pd.Series:
+    """Cost / Qty per SUMMARY PER ITEM row, 0 where nothing was sold."""
+    sold = summary_df['Qty'].ne(0)
+    return (summary_df['Cost'] / summary_df['Qty'].where(sold)).where(sold, 0.0)
+
+
+def prepare_inventory(stock_df: pd.DataFrame, summary_df: pd.DataFrame):
+    """Cleans STOCK LEVELS / SUMMARY PER ITEM as read from CSV and derives unit cost,
+    stock value and each summary row's category. Returns (stock_df, summary_df)."""
+    stock_df = stock_df.copy()
+    summary_df = summary_df.copy()
+
+    # 1. CLEANING STRING COLUMNS
+    str_cols_stock = ['Product Code', 'Product Description', 'Category', 'Unit']
+    for col in str_cols_stock:
+        if col in stock_df.columns:
+            stock_df[col] = stock_df[col].astype(str).str.strip()
+
+    str_cols_summary = ['Product Code', 'Item Description', 'Unit', 'Month-Year']
+    for col in str_cols_summary:
+        if col in summary_df.columns:
+            summary_df[col] = summary_df[col].astype(str).str.strip()
+
+    # 2. DATE CONVERSION
+    stock_df['Inventory Date'] = pd.to_datetime(stock_df['Inventory Date'], errors='coerce')
+    summary_df['Month-Year'] = pd.to_datetime(summary_df['Month-Year'], errors='coerce')
+
+    # 3. CALCULATE ESTIMATED UNIT COST & SALES
+    summary_df['Calculated_Unit_Cost'] = unit_costs(summary_df)
+
+    price_list = summary_df.groupby('Product Code')['Calculated_Unit_Cost'].mean().reset_index()
+    stock_df = pd.merge(stock_df, price_list, on='Product Code', how='left')
+    stock_df['Total Stock Value'] = stock_df['Qty'] * stock_df['Calculated_Unit_Cost']
+
+    # 4. ENRICH SUMMARY WITH CATEGORY (for Aggregated View)
+    # Create a map of Product Code -> Category from stock_df
+    category_map = stock_df[['Product Code', 'Category']].drop_duplicates(subset='Product Code')
+    summary_df = pd.merge(summary_df, category_map, on='Product Code', how='left')
+    summary_df['Category'] = summary_df['Category'].fillna('Unknown')  # Handle items in summary but not in stock list
+    summary_df[MONTH_KEY] = summary_df['Month-Year'].dt.strftime('%Y-%m')
+
+    return stock_df, summary_df
+
+
+def latest_stock(stock_df: pd.DataFrame, as_of=None) -> pd.DataFrame:
+    """Each item's last snapshot (latest Inventory Date, then last written) on or
+    before `as_of`, in file order. STOCK LEVELS.csv keeps every upload's snapshot."""
+    df = stock_df.dropna(subset=['Product Code'])
+    if as_of is not None:
+        df = df[df['Inventory Date'] <= pd.Timestamp(as_of)]
+    df = df.sort_values('Inventory Date', kind='stable', na_position='first')
+    return df.drop_duplicates(subset='Product Code', keep='last').sort_index()
+
+
+@dataclass
+class InventoryFacts:
+    """Stock and monthly item sales with everything the inventory views derive
+    from them, built once per data version so switching views only looks up."""
+    stock: pd.DataFrame                     # + Calculated_Unit_Cost, Total Stock Value
+    summary: pd.DataFrame                   # + Category, Month
+    categories: list
+    months: list
+    stock_by_category: dict = field(default_factory=dict)
+    summary_by_category: dict = field(default_factory=dict)
+    stock_by_item: dict = field(default_factory=dict)
+    summary_by_item: dict = field(default_factory=dict)
+
+
+def _split_by(df: pd.DataFrame, col: str) -> dict:
+    return {key: group for key, group in df.groupby(col, sort=False)}
+
+
+def inventory_facts(stock_df: pd.DataFrame, summary_df: pd.DataFrame) -> InventoryFacts:
+    """Facts from stock rows that already carry unit cost and stock value (as
+    queries.stock_snapshot returns them) and SUMMARY PER ITEM rows with parsed dates
+    (or the per item and month sums of queries.item_monthly_sales, Month key included)."""
+    category_map = stock_df[['Product Code', 'Category']].drop_duplicates(subset='Product Code')
+    summary_df = summary_df.merge(category_map, on='Product Code', how='left')
+    summary_df['Category'] = summary_df['Category'].fillna('Unknown')
+    if MONTH_KEY not in summary_df.columns:
+        summary_df[MONTH_KEY] = summary_df['Month-Year'].dt.strftime('%Y-%m')
+
+    return InventoryFacts(
+        stock=stock_df,
+        summary=summary_df,
+        categories=sorted(stock_df['Category'].dropna().unique().tolist()),
+        months=sorted(summary_df[MONTH_KEY].dropna().unique().tolist()),
+        stock_by_category=_split_by(stock_df, 'Category'),
+        summary_by_category=_split_by(summary_df, 'Category'),
+        stock_by_item=_split_by(stock_df, 'Product Code'),
+        summary_by_item=_split_by(summary_df, 'Product Code'),
+    )
+
+
+def filter_month(summary_df: pd.DataFrame, month: Optional[str]) -> pd.DataFrame:
+    """Rows of one "YYYY-MM" month, or everything when month is None / "All Months"."""
+    if month is None or month == "All Months":
+        return summary_df
+    if MONTH_KEY in summary_df.columns:
+        return summary_df[summary_df[MONTH_KEY] == month]
+    return summary_df[summary_df['Month-Year'].dt.strftime('%Y-%m') == month]
+
+
+def sales_kpis(dashboard_df: pd.DataFrame, stock_df: pd.DataFrame) -> dict:
+    """Revenue, profit, units and zero movers for the selected period."""
+    total_revenue = dashboard_df['Amount'].sum()
+    total_cost = dashboard_df['Cost'].sum()
+    total_profit = total_revenue - total_cost
+    num_months = dashboard_df['Month-Year'].nunique()
+
+    # Zero Movers: items in stock but not sold in the period
+    all_stock_items = set(stock_df['Product Code'].unique())
+    sold_items = set(dashboard_df['Product Code'].unique())
+
+    return {
+        "total_revenue": total_revenue,
+        "total_cost": total_cost,
+        "total_profit": total_profit,
+        "total_qty_sold": dashboard_df['Qty'].sum(),
+        "profit_margin": (total_profit / total_revenue * 100) if total_revenue > 0 else 0,
+        "avg_revenue": total_revenue / num_months if num_months > 0 else 0,
+        "zero_movers_count": len(all_stock_items - sold_items),
+    }
+
+
+def monthly_trend(summary_df: pd.DataFrame) -> pd.DataFrame:
+    """Amount, Cost and Profit per month."""
+    trend = summary_df.groupby('Month-Year')[['Amount', 'Cost']].sum().reset_index()
+    trend['Profit'] = trend['Amount'] - trend['Cost']
+    return trend
+
+
+def item_performance(dashboard_df: pd.DataFrame) -> pd.DataFrame:
+    """Qty and Amount per item for the selected period."""
+    return dashboard_df.groupby(['Product Code', 'Item Description'])[['Qty', 'Amount']].sum().reset_index()
+
+
+def top_and_worst_items(performance: pd.DataFrame, n: int = 10):
+    """(highest volume, lowest volume among items that moved at all)."""
+    active_items = performance[performance['Qty'] > 0]
+    return performance.nlargest(n, 'Qty'), active_items.nsmallest(n, 'Qty')
+
+
+def replenishment_table(stock_df: pd.DataFrame, forecast: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Stock rows with `Stock Health` (Qty / Min Level) and a 0-1 `Visual_Progress`,
+    most urgent first. Given a `forecast` of the same rows (compute.forecast.stockout_forecast)
+    its columns are joined on and the soonest reorder comes first, then Stock Health."""
+    stock = stock_df.copy()
+    stock['Min Level Safe'] = stock['Min Level'].replace(0, 0.0001)  # Avoid div by zero
+    stock['Stock Health'] = stock['Qty'] / stock['Min Level Safe']
+    stock['Visual_Progress'] = stock['Stock Health'].clip(0, 1)
+    if forecast is None:
+        return stock.sort_values(by='Stock Health', ascending=True)
+    stock = stock.join(forecast)
+    return stock.sort_values(by=['Days_to_Reorder', 'Stock Health'], ascending=True, kind='stable')
+
+
+def restock_list(stock_df: pd.DataFrame) -> pd.DataFrame:
+    """Items at or below their minimum level."""
+    return replenishment_table(stock_df).query("Qty <= `Min Level`")
+
+
+def stock_status(qty: float, min_level: float) -> Optional[dict]:
+    """Single-item status relative to its minimum level; None if no minimum is set."""
+    if not min_level > 0:
+        return None
+    ratio = qty / min_level
+    if ratio < 0.5:
+        color, message = "red", "CRITICAL LOW"
+    elif ratio < 1.0:
+        color, message = "orange", "BELOW MIN LEVEL"
+    else:
+        color, message = "green", "HEALTHY"
+    return {"ratio": ratio, "clamped_ratio": min(max(ratio, 0.0), 1.0), "color": color, "message": message}
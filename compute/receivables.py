@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from compute.customer_keys import CUSTOMER_ID_COL, customer_key
+
+CUSTOMER_COL = "Customer Name"
+CUSTOMER_KEY_COL = "Customer Key"
+
+# Days since the invoice date; each bucket runs up to and including its edge
+AGING_BUCKETS = ("0-30", "31-60", "61-90", "90+")
+_BUCKET_EDGES = np.array([30, 60, 90])
+
+COLLECTION_DAYS = 30   # the "recently collected" window next to the aging
+
+
+@dataclass
+class AgingReport:
+    """Open receivables by age bucket: one row per customer (largest balance first)
+    and the same buckets summed over everyone, as of `as_of`."""
+    as_of: pd.Timestamp
+    by_customer: pd.DataFrame   # Customer ID (or Key), Customer Name, buckets, Total Balance, Open Invoices, Oldest Days, Last Collection, Collected
+    totals: pd.Series           # buckets and Total Balance
+
+
+def customer_group(df: pd.DataFrame) -> pd.Series:
+    """What customers are grouped and matched across frames on: the stored Customer
+    ID of rows read from the store, else the customer_key of the name (named
+    CUSTOMER_KEY_COL), so every spelling of a customer's name is one customer."""
+    if CUSTOMER_ID_COL in df.columns:
+        return df[CUSTOMER_ID_COL]
+    return customer_key(df[CUSTOMER_COL]).rename(CUSTOMER_KEY_COL)
+
+
+def _with_names(summary: pd.DataFrame, df: pd.DataFrame, customer: pd.Series) -> pd.DataFrame:
+    """`summary` (indexed by customer) with each customer's first name in `df`
+    ("Unknown" for none) inserted as the CUSTOMER_COL column, the index reset to a
+    column before it."""
+    summary.insert(0, CUSTOMER_COL, df[CUSTOMER_COL].groupby(customer).first().reindex(summary.index).fillna("Unknown"))
+    summary.index.name = customer.name
+    return summary.reset_index()
+
+
+def aging_bucket(age_days) -> np.ndarray:
+    """Positions in AGING_BUCKETS of ages in days (anything not yet due counts as 0-30)."""
+    return np.searchsorted(_BUCKET_EDGES, np.asarray(age_days, dtype=float), side="left")
+
+
+def collection_summary(collections: pd.DataFrame, as_of) -> pd.DataFrame:
+    """Per customer (customer_group): the Last Collection on or before `as_of` and the
+    amount Collected in the COLLECTION_DAYS up to it. `collections` must have
+    parsed dates."""
+    as_of = pd.Timestamp(as_of)
+    paid = collections[collections["Date"].notna() & (collections["Date"] <= as_of)]
+    recent = paid[paid["Date"] > as_of - pd.Timedelta(days=COLLECTION_DAYS)]
+    return pd.DataFrame({
+        "Last Collection": paid["Date"].groupby(customer_group(paid)).max(),
+        "Collected": recent["Check Amount"].groupby(customer_group(recent)).sum(),
+    })
+
+
+def ar_aging(receivables: pd.DataFrame, collections: Optional[pd.DataFrame] = None, as_of=None,
+             collected: Optional[pd.DataFrame] = None) -> AgingReport:
+    """Buckets every open invoice (Balance > 0) by days since its Date in one pass and
+    pivots the balances per customer. `as_of` defaults to the latest invoice date,
+    since the data is only as fresh as the last upload. With `collections`, or their
+    `collected` collection_summary (indexed or keyed the same way, as
+    queries.collection_summary returns it), each customer's Last Collection and
+    Collected are matched on. Both frames must have parsed dates."""
+    as_of = pd.Timestamp(as_of) if as_of is not None else receivables["Date"].max()
+
+    open_rows = receivables[(receivables["Balance"] > 0) & receivables["Date"].notna()]
+    age = (as_of - open_rows["Date"]).dt.days.to_numpy()
+    bucket = pd.Categorical.from_codes(aging_bucket(age), categories=list(AGING_BUCKETS))
+
+    customer = customer_group(open_rows).fillna(-1 if CUSTOMER_ID_COL in open_rows.columns else "Unknown")
+    balances = open_rows["Balance"].groupby([customer, bucket], observed=False).sum().unstack(fill_value=0.0)
+    balances = balances.reindex(columns=list(AGING_BUCKETS), fill_value=0.0)
+    balances.columns = list(AGING_BUCKETS)
+
+    grouped = pd.Series(age, index=open_rows.index).groupby(customer)
+    by_customer = balances.assign(**{
+        "Total Balance": balances.sum(axis=1),
+        "Open Invoices": grouped.size(),
+        "Oldest Days": grouped.max(),
+    })
+
+    if collected is None and collections is not None:
+        collected = collection_summary(collections, as_of)
+    if collected is not None:
+        if customer.name in collected.columns:
+            collected = collected.set_index(customer.name)
+        by_customer["Last Collection"] = collected["Last Collection"]
+        by_customer["Collected"] = collected["Collected"].reindex(by_customer.index).fillna(0.0)
+
+    by_customer = _with_names(by_customer, open_rows, customer)
+    by_customer = by_customer.sort_values("Total Balance", ascending=False, kind="stable").reset_index(drop=True)
+    totals = by_customer[list(AGING_BUCKETS) + ["Total Balance"]].sum()
+    return AgingReport(as_of=as_of, by_customer=by_customer, totals=totals)
+
+
+######################
+# RECONCILIATION
+######################
+
+DSO_DAYS = 90   # billing window the DSO divides the open balance by
+
+PAYMENT_COLS = [CUSTOMER_COL, "SI #", "Date", "Amount Due", "Paid Amount", "Balance", "Paid_Date", "Days_to_Pay"]
+
+
+def reconcile_payments(receivables: pd.DataFrame, collections: pd.DataFrame) -> pd.DataFrame:
+    """Each invoice with the date its paid amount was collected. Collections carry no
+    invoice number, so a customer's checks pay off their invoices oldest first: the
+    invoice is settled on the first collection whose running total reaches the
+    running total paid up to and including it (an as-of merge on those totals).
+    Customers are matched on customer_group(). Days_to_Pay counts from the invoice
+    Date, 0 for prepayments. Both frames must have parsed dates; rows come back per
+    customer in date order, led by the customer_group column."""
+    invoices = receivables.dropna(subset=["Date", CUSTOMER_COL]).copy()
+    group_col = customer_group(invoices).name
+    invoices[group_col] = customer_group(invoices)
+    invoices["_order"] = np.arange(len(invoices))
+    invoices = invoices.sort_values([group_col, "Date", "_order"], kind="stable")
+    invoices["_running"] = invoices["Paid Amount"].fillna(0).groupby(invoices[group_col]).cumsum()
+
+    paid = collections.dropna(subset=["Date", CUSTOMER_COL]).copy()
+    paid[group_col] = customer_group(paid)
+    paid["_order"] = np.arange(len(paid))
+    paid = paid.sort_values([group_col, "Date", "_order"], kind="stable")
+    paid["_running"] = paid["Check Amount"].fillna(0).groupby(paid[group_col]).cumsum()
+    paid = paid.rename(columns={"Date": "Paid_Date"})[[group_col, "Paid_Date", "_running"]]
+
+    # merge_asof wants both sides sorted on the key alone; `by` keeps customers apart
+    invoices["_key"] = invoices["_running"] - 0.005
+    matched = pd.merge_asof(
+        invoices.sort_values("_key", kind="stable"), paid.sort_values("_running", kind="stable"),
+        left_on="_key", right_on="_running", by=group_col, direction="forward", suffixes=("", "_paid"),
+    ).sort_values([group_col, "Date", "_order"], kind="stable")
+
+    matched.loc[~(matched["Paid Amount"] > 0), "Paid_Date"] = pd.NaT
+    matched["Days_to_Pay"] = ((matched["Paid_Date"] - matched["Date"]).dt.total_seconds() / 86400).clip(lower=0)
+    return matched[[group_col] + PAYMENT_COLS].reset_index(drop=True)
+
+
+def payment_summary(payments: pd.DataFrame, as_of=None, dso_days: int = DSO_DAYS) -> pd.DataFrame:
+    """Per customer (customer_group) in one group-by over reconcile_payments rows:
+    Customer Name, Invoices, Paid Invoices, Days_to_Pay (paid-amount weighted mean),
+    Open Balance and DSO (open balance over the amount billed in the `dso_days`
+    before `as_of`, in days)."""
+    as_of = pd.Timestamp(as_of) if as_of is not None else payments["Date"].max()
+    settled = payments["Paid_Date"].notna()
+    recent = payments["Date"] > as_of - pd.Timedelta(days=dso_days)
+
+    customer = customer_group(payments)
+    frame = pd.DataFrame({
+        "Invoices": 1,
+        "Paid Invoices": settled.astype(int),
+        "_weighted": (payments["Days_to_Pay"] * payments["Paid Amount"]).where(settled, 0.0),
+        "_paid": payments["Paid Amount"].where(settled, 0.0),
+        "Open Balance": payments["Balance"].clip(lower=0),
+        "_billed": payments["Amount Due"].where(recent, 0.0),
+    })
+    summary = frame.groupby(customer).sum()
+    summary["Days_to_Pay"] = summary["_weighted"] / summary["_paid"].where(summary["_paid"] > 0)
+    summary["DSO"] = summary["Open Balance"] / summary["_billed"].where(summary["_billed"] > 0) * dso_days
+    summary = summary[["Invoices", "Paid Invoices", "Days_to_Pay", "Open Balance", "DSO"]]
+    return _with_names(summary, payments, customer)
@@ -0,0 +1,336 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from compute.customer_keys import CUSTOMER_ID_COL, customer_ids
+
+DATE_COL = "Date"
+AMOUNT_COL = "Total Amount"
+CUSTOMER_COL = "Customer Name"
+
+# order_days() columns (customers keyed by CUSTOMER_ID_COL)
+ORDERS_COL = "Orders"
+PREV_DATE_COL = "Prev_Date"
+
+FREQUENCIES = ("weekly", "monthly")
+
+
+@dataclass
+class PeriodicKPI:
+    """A bento KPI: the latest period's value, its growth over the previous period,
+    the fine-grained series drawn as bars and the coarse series drawn as a line."""
+    last_value: float
+    growth_pct: float
+    detail: pd.DataFrame
+    trend: pd.DataFrame
+
+
+@dataclass
+class ChurnKPI:
+    last_value: float
+    growth_pct: float
+    daily: pd.DataFrame
+    weekly: pd.DataFrame
+
+
+######################
+# DATA CLEANING
+#######################
+
+def clean_sales(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerces Date and Total Amount and drops the rows where either is missing."""
+    df = df.copy()
+    df[DATE_COL] = pd.to_datetime(df[DATE_COL], errors='coerce')
+    df = df.dropna(subset=[DATE_COL])
+
+    df[AMOUNT_COL] = pd.to_numeric(df[AMOUNT_COL], errors='coerce')
+    df = df.dropna(subset=[AMOUNT_COL])
+
+    return df
+
+
+def _growth(values: pd.Series) -> float:
+    if len(values) < 2:
+        return 0
+    prev_val = values.iloc[-2]
+    curr_val = values.iloc[-1]
+    return 0 if prev_val == 0 else (curr_val - prev_val) / prev_val * 100
+
+
+def _check_frequency(frequency: str):
+    if frequency not in FREQUENCIES:
+        raise ValueError("frequency must be either 'weekly' or 'monthly'")
+
+
+def sort_by_date(df: pd.DataFrame) -> pd.DataFrame:
+    """Orders by Date, keeping file order within a day. The loaders call this so
+    the windowed KPIs below can binary-search instead of scanning."""
+    if df[DATE_COL].is_monotonic_increasing:
+        return df
+    return df.sort_values(DATE_COL, kind="stable")
+
+
+def bento_window_start(last_date, frequency: str) -> pd.Timestamp:
+    """Earliest order date periodic_sales / periodic_customers use when the latest
+    order is on `last_date`: their 4-period window plus the partial week before it.
+    Orders before this date do not change either KPI, except that the last order
+    day before it must be kept so empty weeks/months inside the window still get
+    their zero rows."""
+    _check_frequency(frequency)
+    last_date = pd.Timestamp(last_date).normalize()
+    if frequency == "weekly":
+        return last_date - pd.Timedelta(weeks=5)
+    return last_date.to_period("M").start_time - pd.DateOffset(months=4) - pd.Timedelta(days=7)
+
+
+def _bento_slice(df: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    """The rows from the last order before bento_window_start onwards, located with
+    searchsorted on the (sorted) Date column, so the bentos group only ~5 periods."""
+    df = df.dropna(subset=[DATE_COL]) if df[DATE_COL].hasnans else df
+    df = sort_by_date(df)
+    dates = df[DATE_COL]
+    if dates.empty:
+        return df
+    start = bento_window_start(dates.iloc[-1], frequency)
+    first = max(dates.searchsorted(start, side="left") - 1, 0)
+    return df.iloc[first:]
+
+
+######################
+# MONTHLY SALES VOLUME
+#######################
+
+def monthly_sales(df: pd.DataFrame) -> pd.DataFrame:
+    """Total Amount per calendar month, labelled by month start."""
+    month = df[DATE_COL].dt.to_period('M').dt.to_timestamp().rename('Month')
+    return df.groupby(month)[AMOUNT_COL].sum().reset_index()
+
+
+######################
+# SALES BENTO
+#######################
+
+def periodic_sales(df: pd.DataFrame, frequency: str) -> PeriodicKPI:
+    """Sales over the last 4 weeks (daily bars, weekly line) or last 4 months (weekly bars, monthly line)."""
+    _check_frequency(frequency)
+    df = _bento_slice(df, frequency).dropna(subset=[AMOUNT_COL])
+
+    if frequency == "weekly":
+        df_daily = df.groupby(df[DATE_COL].dt.date)[AMOUNT_COL].sum().reset_index()
+        df_daily[DATE_COL] = pd.to_datetime(df_daily[DATE_COL])
+        df_weekly = df_daily.groupby(pd.Grouper(key=DATE_COL, freq="W-MON"))[AMOUNT_COL].sum().reset_index().sort_values(DATE_COL)
+
+        min_date = df_weekly[DATE_COL].max() - pd.Timedelta(weeks=4)
+        detail = df_daily[df_daily[DATE_COL] >= min_date]
+        trend = df_weekly[df_weekly[DATE_COL] >= min_date]
+    else:
+        df_weekly = df.groupby(pd.Grouper(key=DATE_COL, freq="W-MON"))[AMOUNT_COL].sum().reset_index().sort_values(DATE_COL)
+        df_monthly = df.groupby(pd.Grouper(key=DATE_COL, freq="MS"))[AMOUNT_COL].sum().reset_index().sort_values(DATE_COL)
+
+        min_date = df_monthly[DATE_COL].max() - pd.DateOffset(months=4)
+        detail = df_weekly[df_weekly[DATE_COL] >= min_date]
+        trend = df_monthly[df_monthly[DATE_COL] >= min_date]
+
+    return PeriodicKPI(trend[AMOUNT_COL].iloc[-1], _growth(trend[AMOUNT_COL]), detail, trend)
+
+
+######################
+# CUSTOMERS BENTO
+#######################
+
+def periodic_customers(df: pd.DataFrame, frequency: str) -> PeriodicKPI:
+    """Distinct customers ordering, over the same windows as periodic_sales."""
+    _check_frequency(frequency)
+    df = _bento_slice(df, frequency)
+    # Distinct customers are counted on their integer IDs
+    df = df.assign(**{CUSTOMER_ID_COL: customer_ids(df, CUSTOMER_COL)}).dropna(subset=[CUSTOMER_ID_COL])
+
+    if frequency == "weekly":
+        df_daily = df.groupby(df[DATE_COL].dt.date)[CUSTOMER_ID_COL].nunique().reset_index()
+        df_daily[DATE_COL] = pd.to_datetime(df_daily[DATE_COL])
+        fine = df_daily.rename(columns={CUSTOMER_ID_COL: "CustomerCount"})
+
+        coarse = df.groupby(pd.Grouper(key=DATE_COL, freq="W-MON"))[CUSTOMER_ID_COL].nunique().reset_index().sort_values(DATE_COL)
+        coarse = coarse.rename(columns={CUSTOMER_ID_COL: "CustomerCount"})
+
+        min_date = coarse[DATE_COL].max() - pd.Timedelta(weeks=4)
+    else:
+        fine = df.groupby(pd.Grouper(key=DATE_COL, freq="W-MON"))[CUSTOMER_ID_COL].nunique().reset_index().sort_values(DATE_COL)
+        fine = fine.rename(columns={CUSTOMER_ID_COL: "CustomerCount"})
+
+        coarse = df.groupby(pd.Grouper(key=DATE_COL, freq="MS"))[CUSTOMER_ID_COL].nunique().reset_index().sort_values(DATE_COL)
+        coarse = coarse.rename(columns={CUSTOMER_ID_COL: "CustomerCount"})
+
+        min_date = coarse[DATE_COL].max() - pd.DateOffset(months=4)
+
+    detail = fine[fine[DATE_COL] >= min_date]
+    trend = coarse[coarse[DATE_COL] >= min_date]
+
+    return PeriodicKPI(trend["CustomerCount"].iloc[-1], _growth(trend["CustomerCount"]), detail, trend)
+
+
+######################
+# STATIC KPIS
+#######################
+
+def order_days(df: pd.DataFrame, customer_col: str = CUSTOMER_COL, date_col: str = DATE_COL) -> pd.DataFrame:
+    """One row per Customer ID and order date, sorted: the number of orders placed
+    that day and the customer's previous order date (NaT for the first). This is
+    the grain of the customer_order_days rollup (rollups.py), which the *_from_days
+    functions below read. Without a stored Customer ID, `customer_col` names are
+    keyed by compute.customer_keys."""
+    ids = customer_ids(df, customer_col).rename(CUSTOMER_ID_COL)
+    df = df[[date_col]].assign(**{CUSTOMER_ID_COL: ids}).dropna(subset=[date_col, CUSTOMER_ID_COL])
+    days = df.groupby([CUSTOMER_ID_COL, date_col]).size().rename(ORDERS_COL).reset_index()
+    days[PREV_DATE_COL] = days.groupby(CUSTOMER_ID_COL)[date_col].shift(1)
+    return days
+
+
+def reorder_time_stats(df: pd.DataFrame, customer_col: str = CUSTOMER_COL, date_col: str = DATE_COL) -> dict:
+    """Descriptive statistics of the days between consecutive orders of the same customer."""
+    return reorder_time_stats_from_days(order_days(df, customer_col, date_col), date_col)
+
+
+def reorder_time_stats_from_days(days: pd.DataFrame, date_col: str = DATE_COL) -> dict:
+    # Extra orders on the same day count as 0-day reorders
+    intervals = (days[date_col] - days[PREV_DATE_COL]).dt.days.dropna()
+    same_day = pd.Series(0.0, index=range(int((days[ORDERS_COL] - 1).sum())))
+    reorder_days = pd.concat([intervals, same_day], ignore_index=True)
+
+    mean_val = reorder_days.mean()
+    min_val = reorder_days.min()
+    max_val = reorder_days.max()
+
+    # IQR = Q3 - Q1
+    q1 = reorder_days.quantile(0.25)
+    q3 = reorder_days.quantile(0.75)
+
+    return {
+        "mean": mean_val,
+        "min": min_val,
+        "max": max_val,
+        "range": max_val - min_val,
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1
+    }
+
+
+def median_transaction_value(df: pd.DataFrame) -> Optional[float]:
+    """Median order amount within the latest calendar year, or None if it has no orders."""
+    df = df.dropna(subset=[DATE_COL, AMOUNT_COL])
+
+    years = df[DATE_COL].dt.year
+    df_year = df[years == years.max()]
+
+    if df_year.empty:
+        return None
+
+    return df_year[AMOUNT_COL].median()
+
+
+def _reorder_intervals(days: pd.DataFrame, customer_col: str, date_col: str) -> pd.DataFrame:
+    """One row per repeat order day of a customer with at least 3 of them, with the
+    days since that customer's previous order day in `interval`."""
+    df_unique = days[[customer_col, date_col]].assign(interval=(days[date_col] - days[PREV_DATE_COL]).dt.days)
+
+    # Remove 0-day intervals (and each customer's first order)
+    df_unique = df_unique[df_unique['interval'] > 0]
+
+    # Eligible customers = at least 3 unique order dates
+    date_counts = df_unique.groupby(customer_col)[date_col].nunique()
+    eligible_customers = date_counts[date_counts >= 3].index
+    return df_unique[df_unique[customer_col].isin(eligible_customers)]
+
+
+def count_active_customers(df: pd.DataFrame, date_col: str = DATE_COL, customer_col: str = CUSTOMER_COL) -> int:
+    """
+    Returns the number of active customers.
+    Active = customers who placed an order within 1.25x their individual Q3 reorder interval.
+    Customers with fewer than 3 unique order dates are excluded.
+    """
+    return count_active_customers_from_days(order_days(df, customer_col, date_col), date_col)
+
+
+def count_active_customers_from_days(days: pd.DataFrame, date_col: str = DATE_COL, customer_col: str = CUSTOMER_ID_COL) -> int:
+    df_filtered = _reorder_intervals(days, customer_col, date_col)
+
+    q3_intervals = df_filtered.groupby(customer_col)['interval'].quantile(0.75) * 1.25
+    last_order = df_filtered.groupby(customer_col)[date_col].max()
+    max_date = df_filtered[date_col].max()
+
+    active_mask = (max_date - last_order).dt.days <= q3_intervals
+    return int(active_mask.sum())
+
+
+######################
+# CHURN BENTO
+######################
+
+def churn_history(df: pd.DataFrame, customer_col: str = CUSTOMER_COL, date_col: str = DATE_COL) -> Optional[ChurnKPI]:
+    """
+    Compute historical churn stats.
+    Inactive = customers who have not ordered within 1.25 * Q3 of their reorder interval.
+    Returns None when no customer has enough orders to judge.
+    """
+    return churn_history_from_days(order_days(df, customer_col, date_col), date_col=date_col)
+
+
+def churn_history_from_days(days: pd.DataFrame, customer_col: str = CUSTOMER_ID_COL, date_col: str = DATE_COL) -> Optional[ChurnKPI]:
+    df_filtered = _reorder_intervals(days, customer_col, date_col)
+
+    if df_filtered.empty:
+        return None
+
+    q3_intervals = df_filtered.groupby(customer_col)["interval"].quantile(0.75) * 1.25
+
+    # Daily records from +1/-1 events instead of a pass over the orders per day.
+    # A customer counts from their first repeat order day on. After each order day
+    # t they turn inactive once floor(q3) + 1 whole days have passed, until their
+    # next order day (or the end).
+    all_dates = pd.date_range(df_filtered[date_col].min(), df_filtered[date_col].max(), freq="D")
+    n_days = len(all_dates)
+    orders = df_filtered[[customer_col, date_col]].sort_values([customer_col, date_col])
+    order_ns = orders[date_col].to_numpy("datetime64[ns]").astype(np.int64)
+    next_ns = orders.groupby(customer_col)[date_col].shift(-1).to_numpy("datetime64[ns]").astype(np.int64)
+    has_next = orders.groupby(customer_col).cumcount(ascending=False).to_numpy() > 0
+    first = ~orders[customer_col].duplicated().to_numpy()
+    grace_days = np.floor(orders[customer_col].map(q3_intervals).to_numpy(dtype=float)) + 1
+
+    day_ns = pd.Timedelta(days=1).value
+    start_ns = all_dates[0].value
+
+    def day_index(ns):
+        # First day of all_dates at or after each instant
+        return -((start_ns - ns) // day_ns)
+
+    inactive_from = day_index(order_ns + (grace_days * day_ns).astype(np.int64))
+    inactive_to = np.where(has_next, day_index(next_ns), n_days)
+    spells = inactive_from < np.minimum(inactive_to, n_days)
+
+    def running(starts, ends=None):
+        counts = np.bincount(starts, minlength=n_days + 1)
+        if ends is not None:
+            counts = counts - np.bincount(ends, minlength=n_days + 1)
+        return np.cumsum(counts)[:n_days]
+
+    tracked = running(day_index(order_ns[first]))
+    churned = running(inactive_from[spells], inactive_to[spells])
+    churn_df = pd.DataFrame({
+        "Date": all_dates,
+        "ChurnRate": np.divide(churned * 100.0, tracked, out=np.zeros(n_days), where=tracked > 0),
+        "Active": tracked - churned,
+        "Inactive": churned,
+    })
+
+    # Weekly aggregation (avg churn %)
+    churn_df_weekly = churn_df.groupby(pd.Grouper(key="Date", freq="W-MON"))["ChurnRate"].mean().reset_index()
+
+    # Restrict to last ~4 weeks
+    min_date = churn_df_weekly["Date"].max() - pd.Timedelta(weeks=4)
+    churn_df = churn_df[churn_df["Date"] >= min_date]
+    churn_df_weekly = churn_df_weekly[churn_df_weekly["Date"] >= min_date]
+
+    return ChurnKPI(churn_df_weekly["ChurnRate"].iloc[-1], _growth(churn_df_weekly["ChurnRate"]), churn_df, churn_df_weekly)
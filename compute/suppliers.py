@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+ON_TIME_DAYS = 14   # a PO delivered within this many days of the request counts as on time
+
+# What PO LOG.csv keeps of each log row
+PO_COLUMNS = ['DATE REQUEST', 'DELIVERY DATE', 'SUPPLIER', 'RAWMATERIALS', 'STATUS', 'Clean_Amount', 'Lead_Time']
+
+LEAD_STATS_COLS = ['POs', 'Mean', 'P50', 'P90', 'On_Time_Rate']
+
+
+def clean_po_log(df_po: pd.DataFrame) -> pd.DataFrame:
+    """PO log rows as read from the procurement sheets, with one-line date headers,
+    parsed dates, `Lead_Time` in days, `Clean_Amount` and a STATUS."""
+    # Clean Dates (the sheets break "DATE REQUEST" / "DELIVERY DATE" over two lines)
+    df_po = df_po.copy()
+    df_po.columns = [str(col).replace('\n', ' ').strip() for col in df_po.columns]
+
+    if 'DATE REQUEST' in df_po.columns and 'DELIVERY DATE' in df_po.columns:
+        df_po['DATE REQUEST'] = pd.to_datetime(df_po['DATE REQUEST'], errors='coerce')
+        df_po['DELIVERY DATE'] = pd.to_datetime(df_po['DELIVERY DATE'], errors='coerce')
+        df_po['Lead_Time'] = (df_po['DELIVERY DATE'] - df_po['DATE REQUEST']).dt.days
+    else:
+        df_po['Lead_Time'] = 0
+
+    # Clean Amount
+    target = 'AMMOUNT' if 'AMMOUNT' in df_po.columns else ('AMOUNT' if 'AMOUNT' in df_po.columns else None)
+    if target:
+        df_po['Clean_Amount'] = df_po[target].astype(str).str.replace(r'[^\d.]', '', regex=True)
+        df_po['Clean_Amount'] = pd.to_numeric(df_po['Clean_Amount'], errors='coerce').fillna(0)
+    else:
+        df_po['Clean_Amount'] = 0
+
+    if 'STATUS' not in df_po.columns:
+        df_po['STATUS'] = 'Unknown'
+    return df_po
+
+
+def lead_time_histogram(df_po: pd.DataFrame, by=('SUPPLIER', 'RAWMATERIALS')) -> pd.DataFrame:
+    """POs per group and whole-day Lead_Time: `by` columns, Lead_Time, POs. The same
+    counts rollups.py keeps for PO LOG.csv; histograms of separate logs merge by adding POs."""
+    by = list(by)
+    valid = df_po[df_po['Lead_Time'] > 0].copy()
+    for col in by:
+        valid[col] = valid[col].fillna('Unknown').astype(str).str.strip()
+    valid['Lead_Time'] = valid['Lead_Time'].astype(int)
+    return valid.groupby(by + ['Lead_Time']).size().rename('POs').reset_index()
+
+
+def lead_time_stats(histogram: pd.DataFrame, by=('SUPPLIER',), on_time_days: int = ON_TIME_DAYS) -> pd.DataFrame:
+    """POs, mean, median (P50) and 90th percentile lead time and the share delivered
+    within `on_time_days`, per `by` group, from a lead-time histogram (any finer
+    grouping is summed first). Percentiles are the lowest lead time reaching that
+    share of the group's POs."""
+    by = list(by)
+    if histogram.empty:
+        return pd.DataFrame(columns=by + LEAD_STATS_COLS)
+
+    hist = histogram.groupby(by + ['Lead_Time'], sort=True)['POs'].sum().reset_index()
+    group = hist.groupby(by, sort=False)
+    pos = group['POs'].transform('sum').to_numpy(dtype=float)
+    share = group['POs'].cumsum().to_numpy() / pos
+
+    lead = hist['Lead_Time'].to_numpy(dtype=float)
+    counts = hist['POs'].to_numpy(dtype=float)
+    hist = hist.assign(
+        _days=lead * counts,
+        _on_time=np.where(lead <= on_time_days, counts, 0.0),
+        # Within each group rows ascend by lead time, so the first row reaching the share is the percentile
+        _p50=np.where(share >= 0.5, lead, np.inf),
+        _p90=np.where(share >= 0.9, lead, np.inf),
+    )
+    stats = hist.groupby(by).agg(
+        POs=('POs', 'sum'), _days=('_days', 'sum'), _on_time=('_on_time', 'sum'),
+        P50=('_p50', 'min'), P90=('_p90', 'min'),
+    )
+    stats['Mean'] = stats['_days'] / stats['POs']
+    stats['On_Time_Rate'] = stats['_on_time'] / stats['POs']
+    return stats.reset_index()[by + LEAD_STATS_COLS]
@@ -0,0 +1,656 @@
+"""
+Local SQLite copy of the data/ CSVs, queried by queries.py instead of loading whole files.
+
+The CSVs written by Data_Updates.py stay the source of truth. Each one is
+mirrored into a table of data/jchemie.sqlite with dates stored as ISO text,
+amounts coerced to numbers and indexes on the columns the dashboards filter on:
+
+    datastore.save_dataset("sales", df, overwrite=False)   # CSV + table, appends incrementally
+    with datastore.connection() as conn:                   # syncs any CSV changed behind our back
+        conn.execute('SELECT COUNT(*) FROM sales_order')
+
+A table whose CSV no longer matches the size/mtime recorded at its last load is
+reloaded in full, so a missing or stale database rebuilds itself on first use.
+The derived tables of rollups.py are refreshed along with their source tables.
+To reload everything by hand:
+
+    python datastore.py --rebuild
+
+Rows naming a customer also get an integer "Customer ID", assigned on load from
+the customer_keys table (one row per canonical name, compute.customer_keys), so
+IDs stay the same across uploads and reloads and rollups group on them. The
+customer's masterlist attributes (Account, Location, Type, contact) live once per
+ID in customer_dim, matched when the customer or the masterlist is loaded, and
+are joined onto sales rows when read (read_table(..., with_customer=True)).
+
+Each Dataset also declares the schema uploads are held to. save_dataset()
+coerces an upload once (validate()): dates to ISO text, amounts to numbers, text
+stripped. Rows missing a required column, or whose value there does not parse,
+are appended to data/quarantine/<csv> with the reason instead of being stored.
+The CSV gets the coerced values, so reloads and readers take them as they are.
+
+Several sessions (and server processes) may upload and read at once. Writes to
+a data folder take write_lock(), a lock file held by one thread of one process
+at a time; an overwritten CSV is replaced by renaming a finished temporary file
+over it, so it is never seen half-written, while appends are written in place
+(and cut back if they fail); and each write bumps its dataset's version in the
+_manifest table. Readers take no lock: SQLite's WAL keeps their reads going
+during a write, and version() gives the manifest versions to key caches on. The
+CSVs themselves are only read under write_lock() (reloads, save_dataset), so an
+append in progress is never seen; the rest of the app reads through read_table().
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from compute import aggregation, customer_keys
+from compute.customer_keys import BUSINESS_NAME_COL, CUSTOMER_ATTRS, CUSTOMER_ID_COL
+
+DATA_DIR = "data"
+DB_NAME = "jchemie.sqlite"
+LOCK_NAME = ".write.lock"     # in the data folder, see write_lock()
+QUARANTINE_DIR = "quarantine"   # under DATA_DIR: rows uploads could not store, one CSV per dataset
+
+ISO_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@dataclass(frozen=True)
+class Dataset:
+    csv: str
+    table: str
+    date_cols: tuple = ()
+    numeric_cols: tuple = ()
+    text_cols: tuple = ()       # whitespace-stripped on load
+    indexes: tuple = ()         # column names, or tuples of them for composite indexes
+    customer_col: Optional[str] = None   # names given a Customer ID (see CUSTOMER KEYS)
+    dimension_cols: tuple = ()  # masterlist attributes older CSVs repeat per row; stored in customer_dim instead
+    key_cols: tuple = ()        # what identifies a row, for telling new uploaded rows from stored ones
+    required_cols: tuple = ()   # uploaded rows blank or unparsable in any of these are quarantined
+
+
+class SchemaError(ValueError):
+    """An upload whose columns do not fit its dataset."""
+
+
+DATASETS = {
+    "sales": Dataset(
+        "SALES ORDER.csv", "sales_order",
+        date_cols=("Date",), numeric_cols=("Total Amount",),
+        indexes=("Date", "Customer Name", CUSTOMER_ID_COL), customer_col="Customer Name",
+        dimension_cols=tuple(CUSTOMER_ATTRS), key_cols=("SO  #",),
+        # The rows compute.sales.clean_sales keeps
+        required_cols=("Date", "Total Amount"),
+    ),
+    "collections": Dataset(
+        "SUMMARY COLLECTIONS.csv", "collections",
+        date_cols=("Date",), numeric_cols=("Check Amount",),
+        indexes=("Date", "Customer Name", CUSTOMER_ID_COL), customer_col="Customer Name", key_cols=("OR #",),
+        required_cols=("Date",),
+    ),
+    "receivables": Dataset(
+        "ACCOUNTS RECEIVABLE.csv", "receivables",
+        date_cols=("Date",), numeric_cols=("Amount Due", "Paid Amount", "Balance"),
+        indexes=("Date", "Customer Name", CUSTOMER_ID_COL), customer_col="Customer Name", key_cols=("SI #",),
+        required_cols=("Date",),
+    ),
+    "summary": Dataset(
+        "SUMMARY PER ITEM.csv", "summary_per_item",
+        date_cols=("Month-Year",), numeric_cols=("Qty", "Amount", "Cost"),
+        text_cols=("Product Code", "Item Description", "Unit"),
+        indexes=("Product Code", "Month-Year"), key_cols=("Product Code", "Month-Year"),
+        required_cols=("Product Code", "Month-Year"),
+    ),
+    "stock": Dataset(
+        "STOCK LEVELS.csv", "stock_levels",
+        date_cols=("Inventory Date",), numeric_cols=("Qty", "Min Level"),
+        text_cols=("Product Code", "Product Description", "Category", "Unit"),
+        # One row per item per upload: the composite index serves as-of lookups (queries.stock_snapshot)
+        indexes=(("Product Code", "Inventory Date"), "Category"), key_cols=("Product Code", "Inventory Date"),
+        required_cols=("Product Code", "Inventory Date"),
+    ),
+    "po": Dataset(
+        "PO LOG.csv", "po_log",
+        date_cols=("DATE REQUEST", "DELIVERY DATE"), numeric_cols=("Clean_Amount", "Lead_Time"),
+        text_cols=("SUPPLIER", "RAWMATERIALS", "STATUS"),
+        indexes=("SUPPLIER", "RAWMATERIALS"), key_cols=("DATE REQUEST", "SUPPLIER", "RAWMATERIALS"),
+        required_cols=("RAWMATERIALS",),
+    ),
+    "customers": Dataset(
+        "CUSTOMERS_LIST.csv", "customers",
+        indexes=(BUSINESS_NAME_COL,), key_cols=(BUSINESS_NAME_COL,),
+        required_cols=(BUSINESS_NAME_COL,),
+    ),
+}
+
+# One row per Customer ID with the attributes of its masterlist entry
+CUSTOMER_DIM = "customer_dim"
+CUSTOMER_DIM_COLS = [BUSINESS_NAME_COL] + CUSTOMER_ATTRS + ["Clean_Location"]
+
+_lock = threading.RLock()
+_lock_depth = 0   # write_lock() calls entered by the thread holding _lock
+
+
+def db_path(data_dir: Optional[str] = None) -> str:
+    return os.path.join(data_dir or DATA_DIR, DB_NAME)
+
+
+def dataset_for_csv(file_path: str) -> Optional[str]:
+    """The DATASETS key of a data/ CSV path, or None."""
+    name = os.path.basename(file_path)
+    for key, ds in DATASETS.items():
+        if ds.csv == name:
+            return key
+    return None
+
+
+######################
+# CONNECTIONS
+######################
+
+def _connect(data_dir: Optional[str] = None) -> sqlite3.Connection:
+    os.makedirs(data_dir or DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(db_path(data_dir), timeout=30)
+    # WAL lets every Streamlit session read while Data_Updates.py writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS _sources ("
+        "dataset TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, rows INTEGER)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS _manifest (dataset TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS customer_keys ("
+        "customer_id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, name TEXT)"
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {CUSTOMER_DIM} ({quote(CUSTOMER_ID_COL)} INTEGER, "
+        f"{', '.join(quote(col) + ' TEXT' for col in CUSTOMER_DIM_COLS)}, "
+        f"PRIMARY KEY ({quote(CUSTOMER_ID_COL)})) WITHOUT ROWID"
+    )
+    return conn
+
+
+@contextlib.contextmanager
+def connection(data_dir: Optional[str] = None, sync_first: bool = True):
+    """Open connection to the store, closed on exit. Tables are synced with their CSVs first."""
+    conn = _connect(data_dir)
+    try:
+        if sync_first:
+            _sync(conn, data_dir)
+        yield conn
+    finally:
+        conn.close()
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+######################
+# LOCKING
+######################
+
+def _lock_file(f):
+    if os.name == "nt":
+        import msvcrt
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def write_lock(data_dir: Optional[str] = None):
+    """Held while the CSVs and tables of a data folder change: across threads and
+    processes, one writer at a time. Re-entrant within a thread."""
+    global _lock_depth
+    with _lock:
+        if _lock_depth:
+            _lock_depth += 1
+            try:
+                yield
+            finally:
+                _lock_depth -= 1
+            return
+        data_dir = data_dir or DATA_DIR
+        os.makedirs(data_dir, exist_ok=True)
+        with open(os.path.join(data_dir, LOCK_NAME), "a+b") as f:
+            _lock_file(f)
+            _lock_depth = 1
+            try:
+                yield
+            finally:
+                _lock_depth = 0
+                _unlock_file(f)
+
+
+def _retry_locked(action, attempts: int = 20):
+    """Runs action(), retrying for a few seconds while the file is in use: on Windows
+    another program (Excel, a virus scanner) holding it open makes it fail."""
+    for attempt in range(attempts):
+        try:
+            return action()
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.25)
+
+
+def _replace_file(path: str, text: str):
+    """Writes the file to a temporary file beside it and renames that over it, so
+    readers see the old or the new file, never a partial one."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        _retry_locked(lambda: os.replace(tmp, path))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _append_file(path: str, text: str):
+    """Appends to the file in place, without copying its history. Called under
+    write_lock(); a write that fails is cut back to the previous end, so the file
+    keeps only whole uploads."""
+    data = memoryview(text.encode("utf-8"))
+    # Unbuffered, so nothing left in a buffer is written after the cut
+    f = _retry_locked(lambda: open(path, "ab", buffering=0))
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        try:
+            while data:
+                data = data[f.write(data):]
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(size)
+            raise
+
+
+######################
+# LOADING
+######################
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    """Dates of any layout, ISO text (what the CSVs hold once written by save_dataset)
+    parsed without per-value format guessing; only other layouts fall back to it."""
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    other = parsed.isna() & values.notna()
+    if other.any():
+        parsed[other] = pd.to_datetime(values[other].astype(str), errors="coerce")
+    return parsed
+
+
+def coerce_frame(ds: Dataset, df: pd.DataFrame) -> pd.DataFrame:
+    """The frame with the dataset's column types: ISO dates, numeric amounts,
+    stripped text. Values that do not parse become missing."""
+    df = df.copy()
+    for col in ds.date_cols:
+        if col in df.columns:
+            df[col] = _to_datetime(df[col]).dt.strftime(ISO_FORMAT)
+    for col in ds.numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in ds.text_cols:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str).str.strip())
+    return df
+
+
+def prepare_frame(ds: Dataset, df: pd.DataFrame) -> pd.DataFrame:
+    """The frame as stored: coerce_frame without the per-row masterlist attributes."""
+    return coerce_frame(ds, df.drop(columns=[col for col in ds.dimension_cols if col in df.columns]))
+
+
+def validate(ds: Dataset, df: pd.DataFrame):
+    """Coerces an upload once and splits off the rows it cannot store. Returns
+    (typed, rejected): the coerced rows to store, and the rejected rows as uploaded
+    with a "Reason" column. Raises SchemaError if a required column is missing."""
+    missing = [col for col in ds.required_cols if col not in df.columns]
+    if missing:
+        raise SchemaError(f"{ds.csv} needs the column(s) {', '.join(missing)}")
+
+    typed = coerce_frame(ds, df)
+    reasons = pd.Series("", index=df.index)
+    for col in ds.required_cols:
+        blank = df[col].isna() | df[col].astype(str).str.strip().eq("")
+        unparsed = typed[col].isna() & ~blank
+        kind = "a date" if col in ds.date_cols else "a number"
+        reasons = reasons.mask(blank, reasons + f"{col} is blank; ").mask(unparsed, reasons + f"{col} is not {kind}; ")
+    bad = reasons.ne("")
+    rejected = df[bad].assign(Reason=reasons[bad].str.rstrip("; "))
+    return typed[~bad], rejected
+
+
+def quarantine_path(ds: Dataset, data_dir: Optional[str] = None) -> str:
+    return os.path.join(data_dir or DATA_DIR, QUARANTINE_DIR, ds.csv)
+
+
+def quarantine(ds: Dataset, rejected: pd.DataFrame, data_dir: Optional[str] = None) -> str:
+    """Appends rejected rows, stamped with the time, to the dataset's quarantine CSV.
+    Returns its path."""
+    path = quarantine_path(ds, data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rejected = rejected.assign(**{"Rejected At": pd.Timestamp.now().strftime(ISO_FORMAT)})
+    if os.path.isfile(path):
+        existing_cols = pd.read_csv(path, nrows=0).columns
+        if set(existing_cols) == set(rejected.columns):
+            rejected[existing_cols].to_csv(path, mode="a", header=False, index=False)
+            return path
+        # Uploads with other columns than before: rewrite with the union of both
+        rejected = pd.concat([pd.read_csv(path), rejected], ignore_index=True)
+    rejected.to_csv(path, index=False)
+    return path
+
+
+def _table_columns(conn, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({quote(table)})")]
+
+
+def table_exists(conn, table: str) -> bool:
+    return bool(_table_columns(conn, table))
+
+
+def missing_datasets(*names: str, data_dir: Optional[str] = None) -> list:
+    """The CSV names of those datasets the store has no table for (never uploaded)."""
+    with connection(data_dir) as conn:
+        return [DATASETS[name].csv for name in names if not table_exists(conn, DATASETS[name].table)]
+
+
+######################
+# CUSTOMER KEYS
+######################
+
+def customer_ids(conn, names: pd.Series) -> pd.Series:
+    """Customer ID of each name (<NA> for none), registering keys not seen before.
+    Only the distinct keys of the batch go to SQLite; rows map back through them."""
+    keys = customer_keys.customer_key(names)
+    first = pd.DataFrame({"key": keys, "name": names}).dropna(subset=["key"]).drop_duplicates("key")
+    if first.empty:
+        return pd.Series(pd.NA, index=names.index, dtype="Int64")
+    conn.executemany(
+        "INSERT OR IGNORE INTO customer_keys (key, name) VALUES (?, ?)",
+        first.astype(object).where(first.notna(), None).itertuples(index=False, name=None),
+    )
+    # The registry holds one row per customer, small enough to read whole
+    ids = dict(conn.execute("SELECT key, customer_id FROM customer_keys").fetchall())
+    return keys.map(ids).astype("Int64")
+
+
+def refresh_customer_dim(conn, full: bool = False):
+    """Gives customers registered since the last refresh (every customer if `full`,
+    after a masterlist change) the attributes of the masterlist entry their key
+    matches (compute.customer_keys.match_customers). Pages join customer_dim on
+    Customer ID, so masterlist edits apply without reloading any sales."""
+    new = "" if full else f" WHERE customer_id NOT IN (SELECT {quote(CUSTOMER_ID_COL)} FROM {CUSTOMER_DIM})"
+    registry = pd.read_sql_query(f"SELECT customer_id, key FROM customer_keys{new}", conn)
+    if full:
+        conn.execute(f"DELETE FROM {CUSTOMER_DIM}")
+    if registry.empty:
+        return
+
+    masterlist_table = DATASETS["customers"].table
+    masterlist = pd.DataFrame(columns=[BUSINESS_NAME_COL])
+    if table_exists(conn, masterlist_table):
+        masterlist = pd.read_sql_query(f"SELECT * FROM {quote(masterlist_table)}", conn)
+    match = customer_keys.match_customers(registry["key"], masterlist[BUSINESS_NAME_COL])
+
+    # Unmatched customers get a row of NULLs (reindexing on a NaN label)
+    dim = masterlist.reindex(columns=CUSTOMER_DIM_COLS).reindex(pd.Index(match.astype(float)))
+    # Derived once here so location charts group on a column instead of parsing every row per query
+    dim["Clean_Location"] = customer_keys.on_uniques(dim["Location"], lambda u: u.map(aggregation.clean_location)).fillna("Unknown")
+    dim.insert(0, CUSTOMER_ID_COL, registry["customer_id"].to_numpy())
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {CUSTOMER_DIM} VALUES ({', '.join('?' * len(dim.columns))})",
+        dim.astype(object).where(dim.notna(), None).itertuples(index=False, name=None),
+    )
+
+
+def _write_table(conn, ds: Dataset, df: pd.DataFrame, replace: bool):
+    df = prepare_frame(ds, df)
+    if ds.customer_col is not None and ds.customer_col in df.columns:
+        df[CUSTOMER_ID_COL] = customer_ids(conn, df[ds.customer_col])
+    if not replace:
+        existing = _table_columns(conn, ds.table)
+        if existing and set(df.columns) - set(existing):
+            # A file with new columns can't be appended; rebuild from the CSV instead
+            raise ValueError(f"{ds.csv} has columns the {ds.table} table does not")
+    df.to_sql(ds.table, conn, if_exists="replace" if replace else "append", index=False, chunksize=50_000)
+    if ds.customer_col is not None or ds == DATASETS["customers"]:
+        refresh_customer_dim(conn, full=ds == DATASETS["customers"])
+    for cols in ds.indexes:
+        cols = cols if isinstance(cols, tuple) else (cols,)
+        if set(cols) <= set(df.columns):
+            index_name = quote(f"idx_{ds.table}_{'_'.join(cols)}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {quote(ds.table)} ({', '.join(map(quote, cols))})")
+
+
+def _csv_stat(path: str):
+    info = os.stat(path)
+    return info.st_size, info.st_mtime_ns
+
+
+def _record_source(conn, name: str, path: str, rows: int):
+    """Records the CSV a table now mirrors and bumps the dataset's manifest version."""
+    size, mtime_ns = _csv_stat(path)
+    conn.execute(
+        "INSERT OR REPLACE INTO _sources (dataset, size, mtime_ns, rows) VALUES (?, ?, ?, ?)",
+        (name, size, mtime_ns, rows),
+    )
+    conn.execute(
+        "INSERT INTO _manifest (dataset, version) VALUES (?, 1) "
+        "ON CONFLICT (dataset) DO UPDATE SET version = version + 1",
+        (name,),
+    )
+
+
+def _source_rows(conn, name: str) -> Optional[int]:
+    row = conn.execute("SELECT rows FROM _sources WHERE dataset = ?", (name,)).fetchone()
+    return None if row is None else row[0]
+
+
+def _is_current(conn, name: str, path: str) -> bool:
+    row = conn.execute("SELECT size, mtime_ns FROM _sources WHERE dataset = ?", (name,)).fetchone()
+    return row is not None and tuple(row) == _csv_stat(path)
+
+
+def _reload(conn, names: list, data_dir: Optional[str] = None):
+    """Reloads the tables of `names` from their CSVs in one transaction. Their rollups
+    are rebuilt after all of them, as a rollup may read several of the tables."""
+    import rollups  # builds on this module
+
+    with conn:
+        for name in names:
+            path = os.path.join(data_dir or DATA_DIR, DATASETS[name].csv)
+            df = pd.read_csv(path)
+            _write_table(conn, DATASETS[name], df, replace=True)
+            _record_source(conn, name, path, len(df))
+        for name in names:
+            rollups.rebuild(conn, name)
+
+
+def _stale(conn, data_dir: str) -> list:
+    """Datasets whose CSV changed since their table was loaded from it."""
+    stale = []
+    for name, ds in DATASETS.items():
+        path = os.path.join(data_dir, ds.csv)
+        if not os.path.isfile(path):
+            continue
+        # Tables loaded before Customer IDs and customer_dim existed are reloaded once
+        columns = _table_columns(conn, ds.table)
+        outdated = (ds.customer_col in columns and CUSTOMER_ID_COL not in columns) or set(ds.dimension_cols) & set(columns)
+        if outdated or not _is_current(conn, name, path):
+            stale.append(name)
+    return stale
+
+
+def _sync(conn, data_dir: Optional[str] = None) -> list:
+    """Reloads every table whose CSV changed since it was last loaded. Returns their names."""
+    import rollups
+
+    data_dir = data_dir or DATA_DIR
+    reloaded = _stale(conn, data_dir)
+    if reloaded or rollups.missing(conn):
+        with write_lock(data_dir):
+            # Another session or process may have reloaded them while we waited
+            reloaded = _stale(conn, data_dir)
+            if reloaded:
+                _reload(conn, reloaded, data_dir)
+            rollups.ensure(conn)
+    return reloaded
+
+
+def sync(data_dir: Optional[str] = None) -> list:
+    with connection(data_dir, sync_first=False) as conn:
+        return _sync(conn, data_dir)
+
+
+def rebuild(data_dir: Optional[str] = None):
+    """Drops and reloads every table from its CSV."""
+    with write_lock(data_dir), connection(data_dir, sync_first=False) as conn:
+        with conn:
+            conn.execute("DELETE FROM _sources")
+        return _sync(conn, data_dir)
+
+
+def version(*datasets: str, data_dir: Optional[str] = None) -> str:
+    """Fingerprint of the manifest versions of `datasets` (all by default), after
+    syncing; use it in cache keys of query results. It changes exactly when one of
+    them is written or reloaded."""
+    names = sorted(datasets or DATASETS)
+    with connection(data_dir) as conn:
+        rows = conn.execute(
+            f"SELECT dataset, version FROM _manifest WHERE dataset IN ({', '.join('?' * len(names))}) ORDER BY dataset",
+            names,
+        ).fetchall()
+    return hashlib.sha1(repr(rows).encode()).hexdigest()[:12]
+
+
+######################
+# WRITING
+######################
+
+def save_dataset(name: str, df: pd.DataFrame, overwrite: bool = False, data_dir: Optional[str] = None):
+    """Validates an upload, writes its typed rows to the CSV (appending unless
+    overwrite) and applies the same change to the table, inserting only the new rows
+    and folding them into the rollups. Rejected rows go to the quarantine CSV.
+    Returns (written, rejected) frames."""
+    import rollups
+
+    ds = DATASETS[name]
+    data_dir = data_dir or DATA_DIR
+    path = os.path.join(data_dir, ds.csv)
+
+    with write_lock(data_dir), connection(data_dir) as conn:
+        append = os.path.isfile(path) and not overwrite
+        if append:
+            existing_cols = pd.read_csv(path, nrows=0).columns.tolist()
+            # CSVs from before customer_dim repeat masterlist attributes that uploads no longer carry
+            df = df.assign(**{col: None for col in ds.dimension_cols if col in existing_cols and col not in df.columns})
+            missing = [col for col in existing_cols if col not in df.columns]
+            if missing:
+                raise SchemaError(f"{ds.csv} has column(s) the upload lacks: {', '.join(missing)}; "
+                                  "upload it with Overwrite to replace the file")
+            df = df[existing_cols]
+
+        df, rejected = validate(ds, df)
+        if not rejected.empty:
+            quarantine(ds, rejected, data_dir)
+        # Never replace the stored rows with none (e.g. an export whose dates no longer parse)
+        if df.empty:
+            if rejected.empty:
+                raise SchemaError("the upload has no rows")
+            raise SchemaError(f"all {len(rejected):,} rows were rejected and set aside in "
+                              f"{quarantine_path(ds, data_dir)}; {ds.csv} was left as it was")
+
+        # Parse the rows back from the exact text appended, so the table holds
+        # the same values a full reload of the CSV would give
+        text = df.to_csv(index=False, header=not append)
+        if append:
+            _append_file(path, text)
+        else:
+            _replace_file(path, text)
+        written = pd.read_csv(io.StringIO(text), header=None, names=df.columns) if append else pd.read_csv(io.StringIO(text))
+
+        try:
+            with conn:
+                last_rowid = 0
+                if append and table_exists(conn, ds.table):
+                    last_rowid = conn.execute(f"SELECT MAX(rowid) FROM {quote(ds.table)}").fetchone()[0] or 0
+                _write_table(conn, ds, written, replace=not append)
+                if append:
+                    rollups.apply_delta(conn, name, last_rowid)
+                else:
+                    rollups.rebuild(conn, name)
+                rows = (_source_rows(conn, name) or 0) + len(written) if append else len(written)
+                _record_source(conn, name, path, rows)
+        except ValueError:
+            _reload(conn, [name], data_dir)
+
+    return df, rejected
+
+
+def read_table(name: str, where: str = "", params=(), columns=None, order_by: str = "rowid",
+               data_dir: Optional[str] = None, with_customer: bool = False) -> pd.DataFrame:
+    """Rows of one dataset (in file order unless `order_by`) with its date columns parsed.
+    `with_customer` joins each row's customer_dim attributes on its Customer ID."""
+    ds = DATASETS[name]
+    cols = "*" if columns is None else ", ".join(quote(c) for c in columns)
+    sql = f"SELECT {cols} FROM {quote(ds.table)}"
+    if with_customer:
+        sql += f" LEFT JOIN {CUSTOMER_DIM} USING ({quote(CUSTOMER_ID_COL)})"
+    if where:
+        sql += f" WHERE {where}"
+    sql += f" ORDER BY {order_by}"
+    with connection(data_dir) as conn:
+        if not table_exists(conn, ds.table):
+            return pd.DataFrame()
+        df = pd.read_sql_query(sql, conn, params=params)
+    return parse_dates(df, ds.date_cols)
+
+
+def parse_dates(df: pd.DataFrame, cols) -> pd.DataFrame:
+    for col in cols:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=ISO_FORMAT)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync the SQLite copy of the data/ CSVs.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="folder holding the CSVs written by Data_Updates.py")
+    parser.add_argument("--rebuild", action="store_true", help="reload every table, not only those whose CSV changed")
+    args = parser.parse_args(argv)
+
+    reloaded = rebuild(args.data_dir) if args.rebuild else sync(args.data_dir)
+    print(f"Reloaded: {', '.join(reloaded) if reloaded else 'nothing (all tables current)'}")
+    print(f"Store: {db_path(args.data_dir)} (version {version(data_dir=args.data_dir)})")
+
+
+if __name__ == "__main__":
+    main()
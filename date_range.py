@@ -0,0 +1,93 @@
+"""
+Sidebar date-range control shared by the dashboards.
+
+    start, end = date_range.sidebar_date_range(version)
+
+The choice is kept in st.session_state, so it follows the user from page to
+page. Presets are anchored at the latest sales order rather than today, since
+the data is only as fresh as the last upload. Bounds come back as ISO text for
+queries.py: `start` inclusive, `end` exclusive, None when open-ended.
+"""
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+import datastore
+import perf
+import queries
+
+ALL_TIME = "All time"
+YEAR_TO_DATE = "Year to date"
+CUSTOM = "Custom range"
+
+PRESETS = {
+    ALL_TIME: None,
+    "Last month": pd.DateOffset(months=1),
+    "Last quarter": pd.DateOffset(months=3),
+    "Last 6 months": pd.DateOffset(months=6),
+    "Last 12 months": pd.DateOffset(years=1),
+    YEAR_TO_DATE: None,
+    CUSTOM: None,
+}
+
+
+def window_bounds(preset: str, latest, custom=None):
+    """(start, end) Timestamps of a preset ending on the `latest` order date; end is
+    exclusive. `custom` is the (first, last) day pair of a custom range."""
+    if latest is None or preset == ALL_TIME:
+        return None, None
+    if preset == CUSTOM:
+        first, last = custom
+        return pd.Timestamp(first), pd.Timestamp(last) + pd.Timedelta(days=1)
+
+    latest = pd.Timestamp(latest).normalize()
+    end = latest + pd.Timedelta(days=1)
+    if preset == YEAR_TO_DATE:
+        return latest.replace(month=1, day=1), end
+    return end - PRESETS[preset], end
+
+
+def _iso(ts) -> str:
+    return None if ts is None else ts.strftime(datastore.ISO_FORMAT)
+
+
+@perf.timed_cache
+def _sales_bounds(version):
+    return queries.date_bounds("sales")
+
+
+def _keep(widget_key, state_key):
+    # Widget state is dropped when another page is shown; the copy survives
+    st.session_state[state_key] = st.session_state[widget_key]
+
+
+def sidebar_date_range(version: str):
+    """Draws the date-range picker in the sidebar and returns (start, end) as ISO text."""
+    first, latest = _sales_bounds(version)
+    options = list(PRESETS)
+    preset = st.session_state.setdefault("date_range_preset", ALL_TIME)
+
+    st.sidebar.selectbox(
+        "📅 Date range", options,
+        index=options.index(preset), key="_date_range_preset",
+        on_change=_keep, args=("_date_range_preset", "date_range_preset"),
+    )
+    preset = st.session_state.date_range_preset
+
+    custom = None
+    if preset == CUSTOM and latest is not None:
+        default = st.session_state.get("date_range_custom") or ((latest - pd.DateOffset(months=3)).date(), latest.date())
+        picked = st.sidebar.date_input(
+            "From / to", value=default,
+            min_value=first.date(), max_value=max(latest.date(), datetime.date.today()),
+            key="_date_range_custom",
+        )
+        # The widget returns a single date while the second one is being picked
+        custom = tuple(picked) if isinstance(picked, (tuple, list)) and len(picked) == 2 else tuple(default)
+        st.session_state.date_range_custom = custom
+
+    start, end = window_bounds(preset, latest, custom)
+    if start is not None:
+        st.sidebar.caption(f"{start:%b %d, %Y} – {end - pd.Timedelta(days=1):%b %d, %Y}")
+    return _iso(start), _iso(end)
@@ -0,0 +1,226 @@
+"""
+Background conversion of the workbooks uploaded in Data_Updates.py.
+
+Reading an export with xlrd and running its addtl_info converter takes seconds
+for large files, and Streamlit reruns the whole page on every widget change.
+So each upload is converted once, on a worker thread, and the job is kept by
+the SHA-1 of the file's bytes and its sheet type:
+
+    job = ingest.convert(uploaded.getvalue(), "Sales Order")   # starts the job, or finds it
+    job.done(), job.stage, job.elapsed()                       # poll it from the page
+    df = job.result()                                          # waits if it is still running
+
+Submit saves the frame the job produced instead of converting the file again.
+Results are shared between sessions and must not be modified in place.
+
+The page previews a job without sending every row to the browser: sample()
+gives the first and last rows, job.profile summarizes each column (worked out
+on the worker thread along with the conversion) and diff_with_stored() counts
+the rows whose keys (Dataset.key_cols) are new or already in the store.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+import addtl_info
+import datastore
+import perf
+
+MAX_JOBS = 4      # finished conversions kept for re-previews and Submit
+MAX_WORKERS = 2   # uploads converted at the same time
+SAMPLE_ROWS = 20  # rows previewed from each end of an upload
+
+
+@dataclass(frozen=True)
+class SheetType:
+    dataset: str          # datastore.DATASETS key the rows are saved to
+    convert: Callable     # addtl_info converter, fed the workbook as read_raw_excel returns it
+    sheet_name: object = 0  # 0 for the first sheet, None for every sheet
+
+
+# In the order Data_Updates.py lists them
+SHEET_TYPES = {
+    "Sales Order": SheetType("sales", addtl_info.convert_sales_file_to_df),
+    "Summary Collections": SheetType("collections", addtl_info.convert_collections_to_df),
+    "Customer Masterlist": SheetType("customers", addtl_info.convert_customer_masterlist_to_df, None),
+    "Accounts Receivable": SheetType("receivables", addtl_info.convert_receivables_to_df),
+    "Summary per Item": SheetType("summary", addtl_info.convert_summary_to_df, None),
+    "Stock Level": SheetType("stock", addtl_info.process_raw_materials_stock_df),
+    "PO Log": SheetType("po", addtl_info.convert_po_log_to_df, None),
+}
+
+STAGES = ("Queued", "Reading workbook", "Converting", "Profiling", "Done")
+
+
+class ConversionJob:
+    """One upload being converted. `stage` is one of STAGES."""
+
+    def __init__(self, key: tuple, sheet_type: str):
+        self.key = key
+        self.sheet_type = sheet_type
+        self.stage = STAGES[0]
+        self.started = time.time()
+        self.finished = None
+        self.future = None
+        self.profile = None   # profile() of the result, once converted
+        self.profile_error = None   # what profile() raised: the preview is lost, the upload is not
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def failed(self) -> bool:
+        return self.done() and self.future.exception() is not None
+
+    def result(self, timeout=None) -> pd.DataFrame:
+        """The converted frame; raises what the converter raised."""
+        return self.future.result(timeout)
+
+    def progress(self) -> float:
+        return STAGES.index(self.stage) / (len(STAGES) - 1)
+
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+def _run(job: ConversionJob, data: bytes) -> pd.DataFrame:
+    spec = SHEET_TYPES[job.sheet_type]
+    try:
+        job.stage = "Reading workbook"
+        with perf.span(f"read_raw_excel[{job.sheet_type}]"):
+            raw = addtl_info.read_raw_excel(BytesIO(data), sheet_name=spec.sheet_name)
+        job.stage = "Converting"
+        df = spec.convert(raw)
+        job.stage = "Profiling"
+        try:
+            job.profile = profile(df, spec.dataset)
+        except Exception as e:
+            job.profile_error = e
+        return df
+    finally:
+        job.stage = "Done"
+        job.finished = time.time()
+
+
+def convert(data: bytes, sheet_type: str) -> ConversionJob:
+    """The conversion job of an upload, started in the background the first time
+    these bytes are seen as `sheet_type`."""
+    key = (hashlib.sha1(data).hexdigest(), sheet_type)
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None:
+            _jobs.move_to_end(key)
+            return job
+        job = ConversionJob(key, sheet_type)
+        job.future = _executor.submit(_run, job, data)
+        _jobs[key] = job
+        # Forget the oldest finished jobs; running ones stay until they finish
+        for old_key in [k for k, j in _jobs.items() if j.done()][:max(len(_jobs) - MAX_JOBS, 0)]:
+            del _jobs[old_key]
+    return job
+
+
+######################
+# PREVIEW
+######################
+
+def sample(df: pd.DataFrame, n: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """The first and last `n` rows (every row of a short frame), with their row numbers."""
+    return df if len(df) <= 2 * n else pd.concat([df.head(n), df.tail(n)])
+
+
+def profile(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    """One row per column of an upload, on the values as they would be stored
+    (datastore.prepare_frame): Filled and Missing counts, Distinct values, Min and
+    Max of dates and numbers, Total of amounts, and Unparsed, the filled cells of a
+    date or number column that do not parse as one."""
+    ds = datastore.DATASETS[dataset]
+    stored = datastore.prepare_frame(ds, df)
+    stored = stored[[col for col in stored.columns if col in df.columns]]
+    dates = [col for col in stored.columns if col in ds.date_cols]
+    numbers = [col for col in stored.columns
+               if col not in dates and (col in ds.numeric_cols or pd.api.types.is_numeric_dtype(stored[col]))]
+    typed = numbers + dates
+
+    report = pd.DataFrame({
+        "Column": stored.columns,
+        "Kind": ["date" if c in dates else "number" if c in numbers else "text" for c in stored.columns],
+        "Filled": stored.notna().sum().to_numpy(),
+        "Missing": stored.isna().sum().to_numpy(),
+        "Distinct": stored.nunique().to_numpy(),
+        "Unparsed": (df[typed].notna() & stored[typed].isna()).sum().reindex(stored.columns, fill_value=0).to_numpy(dtype=int),
+    }).set_index("Column")
+    # Shown as text: one column mixes dates and numbers
+    for how in ("min", "max"):
+        report[how.title()] = pd.concat([
+            stored[numbers].agg(how).dropna().map("{:,.2f}".format),
+            stored[dates].agg(how).dropna().astype(str).str[:10],
+        ])
+    amounts = [col for col in numbers if col in ds.numeric_cols]   # not IDs such as SO #
+    report["Total"] = stored[amounts].sum()
+    return report.reset_index()
+
+
+@dataclass
+class UploadDiff:
+    """How an upload's rows compare with the stored ones, by `key_cols`."""
+    key_cols: tuple
+    rows: int
+    new: int          # key not stored yet
+    stored: int       # key already stored (appending repeats the row)
+    repeated: int     # key also on an earlier row of the upload
+    no_key: int       # some key column blank
+
+
+def _key_text(frame: pd.DataFrame) -> pd.Series:
+    """One string per row joining its key columns, numbers written the same way
+    however they were typed (SO # 100000 read as int, float or text)."""
+    key = pd.Series("", index=frame.index)
+    for col in frame.columns:
+        number = pd.to_numeric(frame[col], errors="coerce").astype(float)
+        text = np.where(number.notna(), number.astype(str), frame[col].astype(str).str.strip())
+        key = key + "\x1f" + text
+    return key
+
+
+def diff_with_stored(df: pd.DataFrame, dataset: str, data_dir: Optional[str] = None) -> Optional[UploadDiff]:
+    """Counts the upload's rows whose key is new or already in the dataset's table,
+    comparing the stored form of both; None when the dataset declares no key or the
+    upload lacks one of its columns."""
+    ds = datastore.DATASETS[dataset]
+    keys = list(ds.key_cols)
+    if not keys or not set(keys) <= set(df.columns):
+        return None
+
+    upload = datastore.prepare_frame(ds, df[keys])
+    complete = upload.notna().all(axis=1).to_numpy()
+    upload_keys = _key_text(upload)
+
+    stored_keys = pd.Index([])
+    with datastore.connection(data_dir) as conn:
+        if set(keys) <= set(datastore._table_columns(conn, ds.table)):
+            cols = ", ".join(map(datastore.quote, keys))
+            stored = pd.read_sql_query(f"SELECT DISTINCT {cols} FROM {datastore.quote(ds.table)}", conn)
+            stored_keys = pd.Index(_key_text(stored.dropna()))
+
+    is_stored = upload_keys.isin(stored_keys).to_numpy() & complete
+    return UploadDiff(
+        key_cols=tuple(keys),
+        rows=len(df),
+        new=int((complete & ~is_stored).sum()),
+        stored=int(is_stored.sum()),
+        repeated=int((upload_keys.duplicated().to_numpy() & complete).sum()),
+        no_key=int((~complete).sum()),
+    )
@@ -2,6 +2,12 @@ import streamlit as st
 import pandas as pd
 import datetime
 import altair as alt
+from compute import customers, receivables
+import datastore
+import date_range
+import perf
+import perf_panel
+import queries
 
 st.set_page_config(page_title="Customer Overview", page_icon="🏠", layout="wide")
 
@@ -29,25 +35,57 @@ if not st.session_state.logged_in:
         st.stop()
 
 
+perf_panel.start_page("Customer Management")
+
+# Customer filters run in SQLite (queries.py); results are cached per data version
+@perf.timed_cache
+def load_customer_options(version):
+    return queries.customer_options()
+
+@perf.timed_cache
+def load_customer_rows(name, customer, version, window):
+    return queries.customer_rows(name, customer, *window)
+
+# Aging of every customer's open invoices at once, as of the latest receivable
+# (not the date range: an open invoice stays open whatever the window)
+@perf.timed_cache
+def load_ar_aging(version):
+    open_rows = queries.open_receivables()
+    if open_rows.empty:
+        return None
+    _, as_of = queries.date_bounds("receivables")
+    # Collections come grouped per customer from SQLite, not as rows
+    return receivables.ar_aging(open_rows, as_of=as_of, collected=queries.collection_summary(as_of))
+
+# Days-to-pay and DSO of every customer in one pass over the invoices as matched
+# to collections by rollups.py
+@perf.timed_cache
+def load_payment_summary(version):
+    payments = queries.invoice_payments()
+    _, as_of = queries.date_bounds("receivables")
+    return receivables.payment_summary(payments, as_of)
+
+version = datastore.version()
+window = date_range.sidebar_date_range(version)
+
 title_col, customer_selection = st.columns([1, 2])
 with title_col:
     st.title("Customer Management")
 
 with customer_selection:
-    df = st.cache_data(pd.read_csv)("data/SALES ORDER.csv")
-    df['Date'] = pd.to_datetime(df['Date'])
-    cust_options = df.groupby('Customer Name')['Total Amount'].sum().sort_values(ascending=False).index.tolist()
-    options = ["All Customers"] + cust_options
-    selection = st.selectbox("Choose Customer:", options)
-
-st.markdown(f"## Sales Overview: {selection}")
+    # Customers are picked by Customer ID, so every spelling of a name is one customer
+    cust_names = load_customer_options(version)
+    options = [customers.ALL_CUSTOMERS] + list(cust_names)
+    selection = st.selectbox("Choose Customer:", options, format_func=lambda c: cust_names.get(c, c))
 
-if selection == "All Customers":
-    filtered_df = df.copy()
-else:
-    filtered_df = df[df['Customer Name'] == selection].reset_index(drop=True)
+st.markdown(f"## Sales Overview: {cust_names.get(selection, selection)}")
 
-filtered_df = filtered_df.sort_values('Date')
+df = load_customer_rows("sales", selection, version, window)
+if df.empty:
+    st.info("No orders in the selected date range.")
+    perf_panel.end_page("Customer Management")
+    st.stop()
+filtered_df = df.sort_values('Date')
 
 bar = alt.Chart(filtered_df).mark_bar().encode(
     x='Date:T',
@@ -57,60 +95,33 @@ line_current = alt.Chart(pd.DataFrame({'Date': [datetime.datetime.now()]})).mark
     color='red', strokeDash=[5,5]
 ).encode(x='Date:T')
 
-st.altair_chart(bar + line_current, use_container_width=True)
-
-if selection == "All Customers":
-    grp = df.groupby('Customer Name')
-    
-    reorder_means = grp['Date'].apply(lambda x: x.sort_values().diff().dt.days.rolling(4, min_periods=1).mean().iloc[-1])
-    average_reorder_time = reorder_means.median()
-    
-    last_dates = grp['Date'].max()
-    days_since_last_order = (datetime.datetime.now() - last_dates).dt.days.median()
-    
-    amt_means = grp['Total Amount'].apply(lambda x: x.rolling(4, min_periods=1).mean().iloc[-1])
-    average_order_amount = amt_means.median()
-else:
-    diff_days = filtered_df['Date'].diff().dt.days
-    average_reorder_time = diff_days.rolling(4, min_periods=1).mean().iloc[-1]
-    last_order_date = filtered_df['Date'].max()
-    days_since_last_order = (datetime.datetime.now() - last_order_date).days
-    average_order_amount = filtered_df['Total Amount'].rolling(4, min_periods=1).mean().iloc[-1]
+perf_panel.altair_chart(bar + line_current, "sales_overview", use_container_width=True)
+
+order_kpis = perf.timed()(customers.order_kpis)(df, selection)
 
 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
-kpi1.metric("Median Reorder Time (days)", f"{average_reorder_time:.1f}")
-kpi2.metric("Median Days Since Last Order", f"{days_since_last_order:.1f}")
-kpi3.metric("Median Order Amount (past 4 orders)", f"₱{average_order_amount:,.2f}")
-kpi4.metric("Total Orders", len(filtered_df))
-kpi5.metric("Total Revenue", f"₱{filtered_df['Total Amount'].sum():,.2f}")
+kpi1.metric("Median Reorder Time (days)", f"{order_kpis['average_reorder_time']:.1f}")
+kpi2.metric("Median Days Since Last Order", f"{order_kpis['days_since_last_order']:.1f}")
+kpi3.metric("Median Order Amount (past 4 orders)", f"₱{order_kpis['average_order_amount']:,.2f}")
+kpi4.metric("Total Orders", order_kpis['total_orders'])
+kpi5.metric("Total Revenue", f"₱{order_kpis['total_revenue']:,.2f}")
 
 st.markdown("---")
 
 if selection != "All Customers":
     st.subheader("Customer Overview")
     overview_col1, overview_col2 = st.columns(2)
-    contact_column = "Customer's Name"
-    contact_name = filtered_df.at[0, contact_column]
-
-    overview_col1.write(f"**Customer Name:** {filtered_df.at[0, 'Customer Name']}")
-    overview_col1.write(f"**Account:** {filtered_df.at[0, 'Account']}")
-    overview_col2.write(f"**Location:** {filtered_df.at[0, 'Location']}")
-    overview_col2.write(f"**Type:** {filtered_df.at[0, 'Type']}")
-    overview_col2.write(f"**Contact Name:** {contact_name}")
-    st.markdown("---")
+    profile = customers.customer_profile(df, selection)
 
-collections_df = st.cache_data(pd.read_csv)("data/SUMMARY COLLECTIONS.csv")
-receivables_df = st.cache_data(pd.read_csv)("data/ACCOUNTS RECEIVABLE.csv")
-
-collections_df['Date'] = pd.to_datetime(collections_df['Date'])
-receivables_df['Date'] = pd.to_datetime(receivables_df['Date'])
+    overview_col1.write(f"**Customer Name:** {profile['Customer Name']}")
+    overview_col1.write(f"**Account:** {profile['Account']}")
+    overview_col2.write(f"**Location:** {profile['Location']}")
+    overview_col2.write(f"**Type:** {profile['Type']}")
+    overview_col2.write(f"**Contact Name:** {profile['Contact Name']}")
+    st.markdown("---")
 
-if selection == "All Customers":
-    f_collections_df = collections_df.copy()
-    f_receivables_df = receivables_df.copy()
-else:
-    f_collections_df = collections_df[collections_df['Customer Name'] == selection].reset_index(drop=True)
-    f_receivables_df = receivables_df[receivables_df['Customer Name'] == selection].reset_index(drop=True)
+f_collections_df = load_customer_rows("collections", selection, version, window)
+f_receivables_df = load_customer_rows("receivables", selection, version, window)
 
 st.markdown("### Collections and Receivables")
 
@@ -162,43 +173,74 @@ final_chart = (
     .resolve_legend(color='independent')
 )
 
-final_chart
+perf_panel.altair_chart(final_chart, "collections_receivables")
 
 ckpi1, ckpi2, ckpi3, ckpi4 = st.columns(4)
 
-if selection == "All Customers":
-    col_grp = f_collections_df.groupby('Customer Name')
-    average_collection_amount = col_grp['Check Amount'].apply(lambda x: x.tail(4).mean()).median()
-    
-    def get_period(dates):
-        d_dates = dates.drop_duplicates().tail(4).sort_values()
-        if len(d_dates) > 1:
-            return d_dates.diff().dt.days.dropna().mean()
-        return 0
-    
-    average_collection_period = col_grp['Date'].apply(get_period).median()
-
-    rec_grp = f_receivables_df.groupby('Customer Name')
-    average_receivable_amount = rec_grp['Balance'].apply(lambda x: x.tail(4).mean()).median()
-    average_receivable_period = rec_grp['Date'].apply(get_period).median()
-
-else:
-    average_collection_amount = f_collections_df['Check Amount'].tail(4).mean()
-    average_receivable_amount = f_receivables_df['Balance'].tail(4).mean()
-
-    distinct_collection_dates = f_collections_df['Date'].drop_duplicates().tail(4).sort_values()
-    if len(distinct_collection_dates) > 1:
-        average_collection_period = distinct_collection_dates.diff().dt.days.dropna().mean()
-    else:
-        average_collection_period = 0
+payment_kpis = perf.timed()(customers.payment_kpis)(f_collections_df, f_receivables_df, selection)
+
+ckpi1.metric("Median Collection Period (days)", f"{payment_kpis['average_collection_period']:.1f}")
+ckpi2.metric("Median Receivable Period (days)", f"{payment_kpis['average_receivable_period']:.1f}")
+ckpi3.metric("Median Collection Amount", f"₱{payment_kpis['average_collection_amount']:,.2f}")
+ckpi4.metric("Median Receivable Amount", f"₱{payment_kpis['average_receivable_amount']:,.2f}")
 
-    distinct_receivable_dates = f_receivables_df['Date'].drop_duplicates().tail(4).sort_values()
-    if len(distinct_receivable_dates) > 1:
-        average_receivable_period = distinct_receivable_dates.diff().dt.days.dropna().mean()
+aging = load_ar_aging(version)
+if aging is not None:
+    st.markdown("---")
+    st.markdown(f"### Receivables Aging (as of {aging.as_of:%b %d, %Y})")
+
+    if selection == customers.ALL_CUSTOMERS:
+        buckets = aging.totals
+        aging_df = aging.by_customer
     else:
-        average_receivable_period = 0
+        aging_df = aging.by_customer[aging.by_customer['Customer ID'] == selection]
+        buckets = aging_df[list(receivables.AGING_BUCKETS) + ['Total Balance']].sum()
 
-ckpi1.metric("Median Collection Period (days)", f"{average_collection_period:.1f}")
-ckpi2.metric("Median Receivable Period (days)", f"{average_receivable_period:.1f}")
-ckpi3.metric("Median Collection Amount", f"₱{average_collection_amount:,.2f}")
-ckpi4.metric("Median Receivable Amount", f"₱{average_receivable_amount:,.2f}")
\ No newline at end of file
+    aging_cols = st.columns(len(receivables.AGING_BUCKETS) + 1)
+    for col, bucket in zip(aging_cols, receivables.AGING_BUCKETS):
+        col.metric(f"{bucket} days", f"₱{buckets[bucket]:,.2f}")
+    aging_cols[-1].metric("Total Open Balance", f"₱{buckets['Total Balance']:,.2f}")
+
+    payment_summary = load_payment_summary(version)
+    if selection == customers.ALL_CUSTOMERS:
+        days_to_pay, dso, label = payment_summary['Days_to_Pay'].median(), payment_summary['DSO'].median(), "Median "
+    else:
+        row = payment_summary[payment_summary['Customer ID'] == selection]
+        days_to_pay, dso, label = row['Days_to_Pay'].mean(), row['DSO'].mean(), ""
+    pay1, pay2 = st.columns(2)
+    pay1.metric(f"{label}Days to Pay", "–" if pd.isna(days_to_pay) else f"{days_to_pay:.1f}",
+                help="Days from invoice to the collection that paid it off, oldest invoices paid first")
+    pay2.metric(f"{label}DSO (days)", "–" if pd.isna(dso) else f"{dso:.1f}",
+                help=f"Open balance over the amount billed in the last {receivables.DSO_DAYS} days, in days")
+
+    if selection == customers.ALL_CUSTOMERS and not aging_df.empty:
+        # Largest balances, stacked oldest bucket last
+        top_aging = aging_df.head(15).melt(
+            id_vars='Customer Name', value_vars=list(receivables.AGING_BUCKETS), var_name='Age', value_name='Balance'
+        )
+        aging_chart = alt.Chart(top_aging).mark_bar().encode(
+            x=alt.X('Balance:Q', title='Open Balance'),
+            y=alt.Y('Customer Name:N', sort=aging_df['Customer Name'].head(15).tolist(), title=None),
+            color=alt.Color('Age:N', sort=list(receivables.AGING_BUCKETS), scale=alt.Scale(scheme='orangered'),
+                            legend=alt.Legend(title="Days Outstanding")),
+            order=alt.Order('Age:N'),
+            tooltip=['Customer Name:N', 'Age:N', alt.Tooltip('Balance:Q', format=',.2f')]
+        )
+        perf_panel.altair_chart(aging_chart, "ar_aging", use_container_width=True)
+
+        st.dataframe(
+            aging_df.merge(payment_summary[['Customer ID', 'Days_to_Pay', 'DSO']], on='Customer ID', how='left')
+            .drop(columns='Customer ID'),
+            column_config={
+                "Days_to_Pay": st.column_config.NumberColumn("Days to Pay", format="%.1f"),
+                "DSO": st.column_config.NumberColumn("DSO", format="%.0f"),
+                "Last Collection": st.column_config.DateColumn("Last Collection"),
+                "Collected": st.column_config.NumberColumn(f"Collected (last {receivables.COLLECTION_DAYS} days)", format="%.2f"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+    elif aging_df.empty:
+        st.info("No open invoices for this customer.")
+
+perf_panel.end_page("Customer Management")
@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
+from compute import catalog, forecast, inventory, suppliers
+import datastore
+import date_range
+import perf
+import perf_panel
+import queries
 
 # Set page config
 st.set_page_config(page_title="Inventory Dashboard", layout="wide")
@@ -28,117 +35,126 @@ if not st.session_state.logged_in:
     if not st.session_state.logged_in:
         st.stop()
 
-def load_data():
-    # Load data from the 'data' folder
-    try:
-        stock_df = pd.read_csv('data/STOCK LEVELS.csv')
-        summary_df = pd.read_csv('data/SUMMARY PER ITEM.csv')
-    except FileNotFoundError:
-        st.error("Data files not found in 'data/' directory. Please ensure 'data/STOCK LEVELS.csv' and 'data/SUMMARY PER ITEM.csv' exist.")
-        return pd.DataFrame(), pd.DataFrame()
-    
-    # 1. CLEANING STRING COLUMNS
-    str_cols_stock = ['Product Code', 'Product Description', 'Category', 'Unit']
-    for col in str_cols_stock:
-        if col in stock_df.columns:
-            stock_df[col] = stock_df[col].astype(str).str.strip()
-
-    str_cols_summary = ['Product Code', 'Item Description', 'Unit', 'Month-Year']
-    for col in str_cols_summary:
-        if col in summary_df.columns:
-            summary_df[col] = summary_df[col].astype(str).str.strip()
-
-    # 2. DATE CONVERSION
-    stock_df['Inventory Date'] = pd.to_datetime(stock_df['Inventory Date'], errors='coerce')
-    summary_df['Month-Year'] = pd.to_datetime(summary_df['Month-Year'], errors='coerce')
-
-    # 3. CALCULATE ESTIMATED UNIT COST & SALES
-    summary_df['Calculated_Unit_Cost'] = summary_df.apply(
-        lambda row: row['Cost'] / row['Qty'] if row['Qty'] != 0 else 0, axis=1
-    )
-    
-    price_list = summary_df.groupby('Product Code')['Calculated_Unit_Cost'].mean().reset_index()
-    stock_df = pd.merge(stock_df, price_list, on='Product Code', how='left')
-    stock_df['Total Stock Value'] = stock_df['Qty'] * stock_df['Calculated_Unit_Cost']
-    
-    # 4. ENRICH SUMMARY WITH CATEGORY (for Aggregated View)
-    # Create a map of Product Code -> Category from stock_df
-    category_map = stock_df[['Product Code', 'Category']].drop_duplicates(subset='Product Code')
-    summary_df = pd.merge(summary_df, category_map, on='Product Code', how='left')
-    summary_df['Category'] = summary_df['Category'].fillna('Unknown') # Handle items in summary but not in stock list
+perf_panel.start_page("Inventory")
+
+# The latest stock snapshot (with unit cost and value from SQLite, queries.py) and
+# the per item and month sales sums of the item_monthly rollup are turned into
+# facts once per data version and date range; the views only slice them
+@perf.timed_cache
+def load_facts(version, window):
+    return inventory.inventory_facts(queries.stock_snapshot(), queries.item_monthly_sales(*window))
+
+# Lead-time statistics of the uploaded PO logs (per supplier, or per raw material
+# across suppliers), read from the histogram kept by rollups.py
+@perf.timed_cache
+def load_lead_stats(version, by):
+    return queries.lead_time_stats(by)
+
+# Days of cover and reorder dates for every stocked item, from the usage rate of
+# the latest months of item sales (not the date range: the stock is the latest too)
+@perf.timed_cache
+def load_forecast(version):
+    velocity = forecast.consumption_velocity(queries.recent_item_usage(forecast.VELOCITY_MONTHS))
+    lead_days = forecast.lead_times(load_lead_stats(version, ("RAWMATERIALS",)))
+    return forecast.stockout_forecast(queries.stock_snapshot(), velocity, lead_days)
 
-    return stock_df, summary_df
+@perf.timed_cache
+def load_stock_history(version, product_code):
+    return queries.stock_history(product_code)
+
+def month_window(window):
+    # SUMMARY PER ITEM is monthly (dated the 1st): keep every month the range touches
+    start, end = window
+    if start is not None:
+        start = pd.Timestamp(start).to_period('M').start_time.strftime(datastore.ISO_FORMAT)
+    return start, end
+
+@perf.timed_cache
+def load_item_index(version):
+    return catalog.build_item_index(queries.stock_snapshot())
+
+ITEM_VIEW = "🔎 Find an item..."
+ALL_CATEGORIES = "All categories"
+
+def reset_item_choice():
+    # A new search shows its best match rather than keeping the previous pick
+    st.session_state.pop("item_code", None)
+
+def load_data(version, window):
+    # Both datasets must have been uploaded into the store
+    missing = datastore.missing_datasets("stock", "summary")
+    if missing:
+        st.error(f"No data uploaded yet for {' and '.join(missing)}. Please upload it in Data Updates.")
+        return None
+    return load_facts(version, window)
 
 try:
-    stock_df, summary_df = load_data()
+    version = datastore.version()
+    window = month_window(date_range.sidebar_date_range(version))
+    facts = load_data(version, window)
+    stock_df = pd.DataFrame() if facts is None else facts.stock
     
     if not stock_df.empty:
         # --- SIDEBAR ---
         st.sidebar.title("Configuration")
         
         options = ["Aggregated Sales Dashboard"]
-        categories = sorted(stock_df['Category'].dropna().unique().tolist())
+        categories = facts.categories
         options.extend(categories)
         
-        # Helper for item selection
-        stock_df['Display_Name'] = "Item: " + stock_df['Product Description'] + " (" + stock_df['Product Code'] + ")"
-        item_options = sorted(stock_df['Display_Name'].unique().tolist())
-        options.extend(item_options)
+        # Items are searched instead of listed, so the selector stays small for any catalog size
+        options.append(ITEM_VIEW)
         
         selected_option = st.selectbox("Select View:", options)
 
+        if selected_option == ITEM_VIEW:
+            item_index = load_item_index(version)
+            col_query, col_cat = st.columns([3, 1])
+            with col_query:
+                query = st.text_input("Search by code or description:", key="item_query", on_change=reset_item_choice)
+            with col_cat:
+                search_category = st.selectbox("In category:", [ALL_CATEGORIES] + categories, key="item_category", on_change=reset_item_choice)
+            matches = catalog.search_items(item_index, query, None if search_category == ALL_CATEGORIES else search_category)
+            code_extracted = st.selectbox(
+                f"Item (top {catalog.ITEM_RESULTS} matches):", matches,
+                format_func=item_index.labels.get, key="item_code",
+            )
+
         # --- MAIN LOGIC ---
 
         # 1. AGGREGATED VIEW (SALES FOCUSED)
         if selected_option == "Aggregated Sales Dashboard":
             st.title("📈 Executive Sales Dashboard")
             
+            summary_df = facts.summary
+
             # --- DATE FILTER ---
-            # Extract unique months formatted as YYYY-MM
-            month_list = sorted(summary_df['Month-Year'].dt.strftime('%Y-%m').unique().tolist())
-            month_options = ["All Months"] + month_list
+            # Unique months formatted as YYYY-MM
+            month_options = ["All Months"] + facts.months
             
             col_filter, col_empty = st.columns([1, 3])
             with col_filter:
                 selected_month_str = st.selectbox("Focus on Month:", month_options)
             
             # Filter Data based on selection
-            if selected_month_str != "All Months":
-                dashboard_df = summary_df[summary_df['Month-Year'].dt.strftime('%Y-%m') == selected_month_str]
-                period_label = f"({selected_month_str})"
-            else:
-                dashboard_df = summary_df
-                period_label = "(All Time)"
+            dashboard_df = inventory.filter_month(summary_df, selected_month_str)
+            period_label = f"({selected_month_str})" if selected_month_str != "All Months" else ("(All Time)" if window[0] is None else "(Date Range)")
 
             # --- KPIs ---
-            total_revenue = dashboard_df['Amount'].sum()
-            total_cost = dashboard_df['Cost'].sum()
-            total_profit = total_revenue - total_cost
-            total_qty_sold = dashboard_df['Qty'].sum()
-            profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-            
-            # KPI Calculations for averages (adjust based on selection)
-            num_months = dashboard_df['Month-Year'].nunique()
-            avg_revenue = total_revenue / num_months if num_months > 0 else 0
-            
-            # Find Zero Movers (Items in Stock but NOT in Dashboard DF Sales)
-            all_stock_items = set(stock_df['Product Code'].unique())
-            sold_items = set(dashboard_df['Product Code'].unique())
-            zero_movers_count = len(all_stock_items - sold_items)
+            kpis = inventory.sales_kpis(dashboard_df, stock_df)
 
             kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-            kpi1.metric(f"Total Revenue {period_label}", f"${total_revenue:,.2f}")
-            kpi2.metric("Gross Profit", f"${total_profit:,.2f}", f"{profit_margin:.1f}% Margin")
-            kpi3.metric("Total Units Sold", f"{total_qty_sold:,.0f}")
-            kpi4.metric("Zero Mover Items", f"{zero_movers_count}", help="Items in stock that had 0 sales in this period.")
+            kpi1.metric(f"Total Revenue {period_label}", f"${kpis['total_revenue']:,.2f}")
+            kpi2.metric("Gross Profit", f"${kpis['total_profit']:,.2f}", f"{kpis['profit_margin']:.1f}% Margin")
+            kpi3.metric("Total Units Sold", f"{kpis['total_qty_sold']:,.0f}")
+            kpi4.metric("Zero Mover Items", f"{kpis['zero_movers_count']}", help="Items in stock that had 0 sales in this period.")
 
             st.divider()
 
-            # --- MONTHLY TREND (Always show full history for context) ---
+            # --- MONTHLY TREND (Whole date range, regardless of the month focus) ---
             st.subheader("Monthly Sales Trend (Historical Context)")
             
-            monthly_trend = summary_df.groupby('Month-Year')[['Amount', 'Cost']].sum().reset_index()
-            monthly_trend['Profit'] = monthly_trend['Amount'] - monthly_trend['Cost']
+            monthly_trend = inventory.monthly_trend(summary_df)
             
             trend_melted = monthly_trend.melt('Month-Year', value_vars=['Amount', 'Profit'], var_name='Metric', value_name='Value')
             
@@ -149,7 +165,7 @@ try:
                 tooltip=['Month-Year', 'Metric', 'Value']
             ).interactive()
             
-            st.altair_chart(chart_trend, use_container_width=True)
+            perf_panel.altair_chart(chart_trend, "monthly_trend", use_container_width=True)
 
             # --- NEW: ITEM BREAKDOWN FOR SELECTED MONTH ---
             st.subheader(f"📊 Top Sales Contributors (Item Breakdown) {period_label}")
@@ -168,7 +184,7 @@ try:
                     color=alt.value('#4c78a8')
                 ).interactive()
                 
-                st.altair_chart(chart_breakdown, use_container_width=True)
+                perf_panel.altair_chart(chart_breakdown, "item_breakdown", use_container_width=True)
             else:
                 st.info("No data available for breakdown.")
 
@@ -180,48 +196,78 @@ try:
             col_top, col_worst = st.columns(2)
 
             # Aggregate by Item using filtered data
-            item_performance = dashboard_df.groupby(['Product Code', 'Item Description'])[['Qty', 'Amount']].sum().reset_index()
+            item_performance = inventory.item_performance(dashboard_df)
+            top_qty, slow_movers = inventory.top_and_worst_items(item_performance)
             
             with col_top:
                 st.markdown("##### 🚀 Top 10 High Volume Items")
                 if not item_performance.empty:
-                    top_qty = item_performance.nlargest(10, 'Qty')
                     chart_top_qty = alt.Chart(top_qty).mark_bar().encode(
                         x=alt.X('Qty', title='Units Sold'),
                         y=alt.Y('Item Description', sort='-x', title=None),
                         color=alt.value('green'), 
                         tooltip=['Item Description', 'Qty', 'Amount']
                     ).interactive()
-                    st.altair_chart(chart_top_qty, use_container_width=True)
+                    perf_panel.altair_chart(chart_top_qty, "top_items", use_container_width=True)
                 else:
                     st.info("No sales data.")
 
             with col_worst:
                 st.markdown("##### 🐢 Bottom 10 Low Volume Items (Active)")
                 if not item_performance.empty:
-                    # Filter for items that had at least some movement (>0) to avoid cluttering with returns or 0s
-                    active_items = item_performance[item_performance['Qty'] > 0]
-                    slow_movers = active_items.nsmallest(10, 'Qty')
-                    
+                    # Only items that had at least some movement (>0), to avoid cluttering with returns or 0s
                     chart_slow = alt.Chart(slow_movers).mark_bar().encode(
                         x=alt.X('Qty', title='Units Sold'),
                         y=alt.Y('Item Description', sort='x', title=None), # sort ascending
                         color=alt.value('grey'), 
                         tooltip=['Item Description', 'Qty', 'Amount']
                     ).interactive()
-                    st.altair_chart(chart_slow, use_container_width=True)
+                    perf_panel.altair_chart(chart_slow, "worst_items", use_container_width=True)
                 else:
                     st.info("No sales data.")
 
+            # --- SUPPLIER LEAD TIMES (All uploaded PO logs) ---
+            supplier_stats = load_lead_stats(version, ("SUPPLIER",))
+            if not supplier_stats.empty:
+                st.divider()
+                st.subheader("🚚 Supplier Lead Times")
+
+                col_chart, col_table = st.columns([3, 2])
+                with col_chart:
+                    # Median bar with the 90th percentile as a tick: the spread is what reorder timing has to absorb
+                    base = alt.Chart(supplier_stats).encode(y=alt.Y('SUPPLIER', sort='x', title=None))
+                    bars = base.mark_bar(color='#4c78a8').encode(
+                        x=alt.X('P50', title='Lead Time (Days)'),
+                        tooltip=['SUPPLIER', 'POs', alt.Tooltip('Mean', format='.1f'), 'P50', 'P90',
+                                 alt.Tooltip('On_Time_Rate', format='.0%', title='On Time')]
+                    )
+                    ticks = base.mark_tick(color='orange', thickness=2).encode(x='P90')
+                    perf_panel.altair_chart(bars + ticks, "supplier_lead_times", use_container_width=True)
+                with col_table:
+                    st.dataframe(
+                        supplier_stats.sort_values('P90'),
+                        column_config={
+                            "SUPPLIER": st.column_config.TextColumn("Supplier"),
+                            "Mean": st.column_config.NumberColumn("Mean", format="%.1f"),
+                            "P50": st.column_config.NumberColumn("Median"),
+                            "P90": st.column_config.NumberColumn("90th pct"),
+                            "On_Time_Rate": st.column_config.ProgressColumn(
+                                "On Time", help=f"Delivered within {suppliers.ON_TIME_DAYS} days of the request",
+                                format="%.0f%%", min_value=0, max_value=1,
+                            ),
+                        },
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+
         # 2. CATEGORY VIEW
         elif selected_option in categories:
             category = selected_option
             st.title(f"📂 Category: {category}")
             
             # Filter Data
-            cat_stock = stock_df[stock_df['Category'] == category].copy()
-            cat_codes = cat_stock['Product Code'].unique()
-            cat_summary = summary_df[summary_df['Product Code'].isin(cat_codes)]
+            cat_stock = facts.stock_by_category.get(category, stock_df.iloc[:0])
+            cat_summary = facts.summary_by_category.get(category, facts.summary.iloc[:0])
             
             # Metrics
             col1, col2, col3 = st.columns(3)
@@ -232,18 +278,12 @@ try:
             # --- REPLENISHMENT STATUS (DATA EDITOR WITH PROGRESS BARS) ---
             st.subheader("⚠️ Replenishment Urgency (Sorted by Criticality)")
             
-            # Calculate Percentage (Ratio)
-            cat_stock['Min Level Safe'] = cat_stock['Min Level'].replace(0, 0.0001) # Avoid div by zero
-            cat_stock['Stock Health'] = cat_stock['Qty'] / cat_stock['Min Level Safe']
+            # Qty / Min Level, capped at 100% for the progress bar; soonest reorder date at top
+            cat_stock_sorted = inventory.replenishment_table(cat_stock, load_forecast(version))
             
-            # Cap the visual ratio at 1.0 (100%) for the progress bar
-            cat_stock['Visual_Progress'] = cat_stock['Stock Health'].clip(0, 1)
-            
-            # Sort: Items with lowest Health (most urgent) at top
-            cat_stock_sorted = cat_stock.sort_values(by='Stock Health', ascending=True)
-            
-            # Select columns for display
-            display_df = cat_stock_sorted[['Product Description', 'Qty', 'Min Level', 'Visual_Progress', 'Unit']]
+            # Select columns for display (no cover figure for items nothing is drawn from)
+            display_df = cat_stock_sorted[['Product Description', 'Qty', 'Min Level', 'Visual_Progress', 'Days_of_Cover', 'Reorder_Date', 'Unit']]
+            display_df = display_df.assign(Days_of_Cover=display_df['Days_of_Cover'].replace(np.inf, np.nan))
             
             st.data_editor(
                 display_df,
@@ -258,6 +298,12 @@ try:
                     "Product Description": st.column_config.TextColumn("Item Name", width="large"),
                     "Qty": st.column_config.NumberColumn("Current Qty"),
                     "Min Level": st.column_config.NumberColumn("Min Required"),
+                    "Days_of_Cover": st.column_config.NumberColumn(
+                        "Days of Cover", help=f"Current Qty at the average daily usage of the last {forecast.VELOCITY_MONTHS} months", format="%.0f"
+                    ),
+                    "Reorder_Date": st.column_config.DateColumn(
+                        "Reorder By", help="Projected stock-out date minus the mean PO lead time of the item", format="YYYY-MM-DD"
+                    ),
                 },
                 hide_index=True,
                 use_container_width=True,
@@ -273,15 +319,16 @@ try:
                     y='Amount',
                     tooltip=['Month-Year', 'Amount']
                 ).interactive()
-                st.altair_chart(chart_cat_trend, use_container_width=True)
+                perf_panel.altair_chart(chart_cat_trend, "category_trend", use_container_width=True)
 
         # 3. ITEM VIEW
+        elif code_extracted is None:
+            st.info("No items match the search.")
         else:
-            code_extracted = selected_option.split('(')[-1].strip(')')
             st.title(f"📦 Item: {code_extracted}")
             
-            item_stock = stock_df[stock_df['Product Code'] == code_extracted]
-            item_summary = summary_df[summary_df['Product Code'] == code_extracted]
+            item_stock = facts.stock_by_item.get(code_extracted, stock_df.iloc[:0])
+            item_summary = facts.summary_by_item.get(code_extracted, facts.summary.iloc[:0])
             
             if not item_stock.empty:
                 item_data = item_stock.iloc[0]
@@ -299,26 +346,26 @@ try:
                 # Stock Status Progress Bar (Single Item)
                 st.subheader("Stock Status")
                 
-                if min_lvl > 0:
-                    ratio = qty / min_lvl
-                    clamped_ratio = min(max(ratio, 0.0), 1.0)
-                    percent_text = f"{ratio:.1%}"
-                    
-                    # Color logic for label
-                    if ratio < 0.5:
-                        color = "red"
-                        status_msg = "CRITICAL LOW"
-                    elif ratio < 1.0:
-                        color = "orange"
-                        status_msg = "BELOW MIN LEVEL"
-                    else:
-                        color = "green"
-                        status_msg = "HEALTHY"
-                        
-                    st.markdown(f"**Status:** :{color}[{status_msg}] ({percent_text} of Min Level)")
-                    st.progress(clamped_ratio)
+                status = inventory.stock_status(qty, min_lvl)
+                if status is not None:
+                    st.markdown(f"**Status:** :{status['color']}[{status['message']}] ({status['ratio']:.1%} of Min Level)")
+                    st.progress(status['clamped_ratio'])
                 else:
                     st.info("No Minimum Level set for this item.")
+
+                # Stock over the uploaded snapshots
+                history = load_stock_history(version, code_extracted)
+                if len(history) > 1:
+                    st.subheader("Stock History")
+                    chart_stock = alt.Chart(history).mark_line(point=True).encode(
+                        x=alt.X('Inventory Date:T', title=None),
+                        y=alt.Y('Qty', title=f"Qty ({item_data['Unit']})"),
+                        tooltip=['Inventory Date:T', 'Qty', 'Min Level']
+                    )
+                    min_rule = alt.Chart(history).mark_line(strokeDash=[4, 4], color='orange').encode(
+                        x='Inventory Date:T', y='Min Level'
+                    )
+                    perf_panel.altair_chart((chart_stock + min_rule).interactive(), "item_stock_history", use_container_width=True)
                 
                 # Historical Sales
                 if not item_summary.empty:
@@ -330,9 +377,11 @@ try:
                         tooltip=['Month-Year', 'Qty', 'Amount']
                     ).interactive()
                     
-                    st.altair_chart(chart_hist, use_container_width=True)
+                    perf_panel.altair_chart(chart_hist, "item_history", use_container_width=True)
                 else:
                     st.warning("No sales history.")
 
 except Exception as e:
-    st.error(f"An error occurred: {e}")
\ No newline at end of file
+    st.error(f"An error occurred: {e}")
+
+perf_panel.end_page("Inventory")
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import os
 import project3_utility as util
+import datastore
+import date_range
+import perf_panel
 
 
 st.set_page_config(page_title="Sales Overview", page_icon="📈")
@@ -31,6 +34,8 @@ if not st.session_state.logged_in:
     if not st.session_state.logged_in:
         st.stop()
 
+perf_panel.start_page("Sales Performance")
+
 # TITLE + Frequency dropdown
 title_col, freq_col = st.columns([3, 1])
 
@@ -38,9 +43,14 @@ with title_col:
     st.title("Sales Performance Dashboard")
 
 
-# Load data
-df = pd.read_csv("data/SALES ORDER.csv").dropna(axis=1, how='all')
-df = util.clean_data(df)
+# Every chart queries the store for the sidebar's date range itself
+version = datastore.version()
+window = date_range.sidebar_date_range(version)
+
+if not util.has_sales(version, window):
+    st.info("No sales orders in the selected date range.")
+    perf_panel.end_page("Sales Performance")
+    st.stop()
 
 
 r1c1, gap, r1c2 = st.columns([2, 0.1, 2])
@@ -50,19 +60,19 @@ with r1c1:
     volume, breakdown = st.tabs(["Yearly Volume", "Yearly Customer Breakdown"])
     with volume:
         st.subheader("Overall Sales Volume")
-        monthly_sales = util.compute_monthly_sales(df)
+        monthly_sales = util.compute_monthly_sales(version, window)
         monthly_sales_linechart = util.show_monthly_sales_volume(monthly_sales)
-        st.altair_chart(monthly_sales_linechart, use_container_width=True)
+        perf_panel.altair_chart(monthly_sales_linechart, "monthly_sales", use_container_width=True)
     
     with breakdown:
-        util.display_overview_charts(df)
+        util.display_overview_charts(version, window)
     
     st.subheader("Customer Loyalty KPIs")
     # Create 3 KPI columns
     kpi1, kpi2, kpi3 = st.columns([1,1,3])
 
     with kpi1:
-        active_count = util.count_active_customers(df)
+        active_count = util.count_active_customers(version, window)
         st.markdown(f"""
         <b>Active Customers</b> 
         <h2 style='margin:0; line-height:0.1'>{active_count}</h2>
@@ -72,7 +82,7 @@ with r1c1:
 
 
     with kpi2:
-        mean_reorder_time = util.reorder_time_stats(df)
+        mean_reorder_time = util.reorder_time_stats(version, window)
         q1 = mean_reorder_time['q1']
         q3 = mean_reorder_time['q3']
         st.markdown(f"""
@@ -83,39 +93,42 @@ with r1c1:
         """, unsafe_allow_html=True)
 
     with kpi3:
-        avg_value_transaction = util.show_median_transaction_value(df)
-        st.markdown(f"""
-        <b>Median Transaction Value</b>  
-        <h2 style='margin:0; line-height:0.1''>₱ {avg_value_transaction:,.2f}</h2>
-        <p style='margin:0; color:gray; line-height:1'>Pesos</p>
-        <br/>
-        """, unsafe_allow_html=True)
+        avg_value_transaction = util.show_median_transaction_value(version, window)
+        if avg_value_transaction is not None:
+            st.markdown(f"""
+            <b>Median Transaction Value</b>  
+            <h2 style='margin:0; line-height:0.1''>₱ {avg_value_transaction:,.2f}</h2>
+            <p style='margin:0; color:gray; line-height:1'>Pesos</p>
+            <br/>
+            """, unsafe_allow_html=True)
 
-    util.show_churn_bento(df)
+    util.show_churn_bento(version, window)
 
 with r1c2:
     weekly, monthly = st.tabs(["Weekly Sales", "Monthly Sales"])
 
     with weekly:
         st.subheader("Weekly Overview")
-        util.show_sales_bento(df, frequency="weekly")
-        util.show_customers_bento(df, frequency="weekly")
+        util.show_sales_bento(version, frequency="weekly", window=window)
+        util.show_customers_bento(version, frequency="weekly", window=window)
         customer, region = st.tabs(["By Customer", "By Region"])
     
         with customer:
-            util.display_comparative_chart(df, frequency="weekly")
+            util.display_comparative_chart(version, frequency="weekly", window=window)
         with region:
-            util.display_comparative_chart_location(df, frequency="weekly")
+            util.display_comparative_chart_location(version, frequency="weekly", window=window)
             
 
     with monthly:
         st.subheader("Monthly Overview")
-        util.show_sales_bento(df, frequency="monthly")
-        util.show_customers_bento(df, frequency="monthly")
+        util.show_sales_bento(version, frequency="monthly", window=window)
+        util.show_customers_bento(version, frequency="monthly", window=window)
 
         customer, region, custom = st.tabs(["By Customer", "By Region", "Year Overview"])
     
         with customer:
-            util.display_comparative_chart(df, frequency="monthly")
+            util.display_comparative_chart(version, frequency="monthly", window=window)
         with region:
-            util.display_comparative_chart_location(df, frequency="monthly")
+            util.display_comparative_chart_location(version, frequency="monthly", window=window)
+
+perf_panel.end_page("Sales Performance")
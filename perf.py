@@ -0,0 +1,352 @@
+"""
+Lightweight timing instrumentation for loaders, converters and compute functions.
+
+    @perf.timed()
+    def convert_sales_file_to_df(path): ...
+
+    with perf.span("read SALES ORDER.csv") as rec:
+        df = pd.read_csv(...)
+        rec.rows_out = len(df)
+
+Every timed call records wall time, rows in/out (when the arguments/result are
+DataFrames), cache hit/miss (for timed_cache) and, when enabled, peak traced
+memory. Records are collected per page run and the last MAX_RUNS runs of each
+page are kept in memory for the profiler panel (perf_panel.py), and every
+finished run is appended to a rotating JSON-lines log (logs/perf.jsonl) that
+perf_report.py summarizes.
+
+This module does not import Streamlit at import time, so the same decorators
+work in batch jobs and benchmarks.
+"""
+import cProfile
+import datetime
+import functools
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import sqlite3
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+import pandas as pd
+
+MAX_RUNS = 20
+
+_local = threading.local()
+_runs_lock = threading.Lock()
+_RUNS = defaultdict(lambda: deque(maxlen=MAX_RUNS))
+_track_memory = False
+_seq = itertools.count()
+
+# JSON-lines log of every page run; JCHEMIE_PERF_LOG="" turns it off
+LOG_PATH = os.environ.get("JCHEMIE_PERF_LOG", os.path.join("logs", "perf.jsonl"))
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+DATA_DIR = "data"
+
+
+@dataclass
+class Timing:
+    name: str
+    depth: int
+    seq: int = 0
+    seconds: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    cache: Optional[str] = None
+    peak_kb: Optional[float] = None
+    error: Optional[str] = None
+    _start_mem: int = 0
+    _peak: int = 0
+
+
+@dataclass
+class PageRun:
+    page: str
+    started: float
+    run_id: str = ""
+    seconds: float = 0.0
+    timings: list = field(default_factory=list)
+    profile: Optional[str] = None
+    _start: float = 0.0
+    _profiler: object = None
+
+
+######################
+# MEMORY TRACKING
+######################
+
+def set_memory_tracking(enabled: bool):
+    """Turns peak-memory recording on or off. tracemalloc slows every allocation
+    down noticeably, so it is off unless someone is actively profiling."""
+    global _track_memory
+    _track_memory = enabled
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def memory_tracking() -> bool:
+    return _track_memory
+
+
+def _flush_peak(stack):
+    # tracemalloc keeps a single process-wide peak, so hand it to every open
+    # span before resetting it; each span ends up with the peak of its own extent
+    _, peak = tracemalloc.get_traced_memory()
+    for rec in stack:
+        rec._peak = max(rec._peak, peak)
+    tracemalloc.reset_peak()
+
+
+######################
+# SPANS
+######################
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _rows(obj) -> Optional[int]:
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        counts = [_rows(o) for o in obj]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    if isinstance(obj, dict):
+        return _rows(list(obj.values()))
+    return None
+
+
+class span:
+    """Context manager timing one step. Set `rows_in`/`rows_out` on the yielded record."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rec = None
+
+    def __enter__(self) -> Timing:
+        stack = _stack()
+        self.rec = Timing(self.name, depth=len(stack), seq=next(_seq))
+        if _track_memory and tracemalloc.is_tracing():
+            _flush_peak(stack)
+            self.rec._start_mem = tracemalloc.get_traced_memory()[0]
+        stack.append(self.rec)
+        self._start = time.perf_counter()
+        return self.rec
+
+    def __exit__(self, exc_type, exc, tb):
+        rec = self.rec
+        rec.seconds = time.perf_counter() - self._start
+        if exc_type is not None:
+            rec.error = exc_type.__name__
+        stack = _stack()
+        if _track_memory and tracemalloc.is_tracing():
+            _flush_peak(stack)
+            rec.peak_kb = max(rec._peak - rec._start_mem, 0) / 1024
+        stack.pop()
+        _record(rec)
+        return False
+
+
+def timed(name: Optional[str] = None):
+    """Decorator recording each call as a span named after the function."""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label) as rec:
+                rec.rows_in = _rows(list(args) + list(kwargs.values()))
+                result = func(*args, **kwargs)
+                rec.rows_out = _rows(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def timed_cache(func=None, *, name: Optional[str] = None, **cache_kwargs):
+    """st.cache_data plus timing. A call whose body does not run is a cache hit."""
+    def decorate(func):
+        import streamlit as st
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            marks = getattr(_local, "cache_marks", None)
+            if marks:
+                marks[-1] = "miss"
+            return func(*args, **kwargs)
+
+        cached = st.cache_data(**cache_kwargs)(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not hasattr(_local, "cache_marks"):
+                _local.cache_marks = []
+            with span(label) as rec:
+                rec.rows_in = _rows(list(args) + list(kwargs.values()))
+                _local.cache_marks.append("hit")
+                try:
+                    result = cached(*args, **kwargs)
+                finally:
+                    rec.cache = _local.cache_marks.pop()
+                rec.rows_out = _rows(result)
+                return result
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
+######################
+# PAGE RUNS
+######################
+
+def _record(rec: Timing):
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.timings.append(rec)
+
+
+def start_page_run(page: str, profile: bool = False) -> PageRun:
+    """Begins collecting spans for one script run of `page` on this thread.
+    With profile=True the run is also captured with pyinstrument (if installed)
+    or cProfile."""
+    run = PageRun(page, started=time.time(), run_id=f"{os.getpid()}-{next(_seq)}", _start=time.perf_counter())
+    if profile:
+        try:
+            from pyinstrument import Profiler
+            run._profiler = Profiler()
+            run._profiler.start()
+        except ImportError:
+            run._profiler = cProfile.Profile()
+            run._profiler.enable()
+    _local.run = run
+    _local.stack = []
+    return run
+
+
+def finish_page_run() -> Optional[PageRun]:
+    """Ends the current run, stores it in the per-page history and returns it."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    run.seconds = time.perf_counter() - run._start
+
+    profiler = run._profiler
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        run.profile = out.getvalue()
+    elif profiler is not None:
+        profiler.stop()
+        run.profile = profiler.output_text(unicode=True, color=False)
+    run._profiler = None
+
+    with _runs_lock:
+        _RUNS[run.page].append(run)
+    _log_run(run)
+    return run
+
+
+def recent_runs(page: str) -> list:
+    """The page's last MAX_RUNS runs, newest first."""
+    with _runs_lock:
+        return list(reversed(_RUNS[page]))
+
+
+def run_table(run: PageRun) -> pd.DataFrame:
+    """One row per span, in call order, indented by nesting depth."""
+    rows = []
+    for t in sorted(run.timings, key=lambda t: t.seq):
+        rows.append({
+            "Step": "  " * t.depth + t.name,
+            "ms": round(t.seconds * 1000, 1),
+            "Rows In": t.rows_in,
+            "Rows Out": t.rows_out,
+            "Cache": t.cache,
+            "Peak KB": None if t.peak_kb is None else round(t.peak_kb, 1),
+            "Error": t.error,
+        })
+    return pd.DataFrame(rows)
+
+
+######################
+# JSON-LINES LOG
+######################
+
+def dataset_version(data_dir: Optional[str] = None) -> str:
+    """datastore.version() of the data in data/: the same fingerprint the pages key
+    their caches on, so log events group by the data they ran against. "" when the
+    store cannot be read."""
+    import datastore
+
+    try:
+        return datastore.version(data_dir=data_dir or DATA_DIR)
+    except (OSError, sqlite3.Error):
+        return ""
+
+
+def _logger() -> Optional[logging.Logger]:
+    if not LOG_PATH:
+        return None
+    logger = logging.getLogger("jchemie.perf")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+        handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def run_events(run: PageRun, data_version: str = "") -> list:
+    """One "page" event for the whole run followed by one "step" event per span."""
+    ts = datetime.datetime.fromtimestamp(run.started).isoformat(timespec="milliseconds")
+    base = {"ts": ts, "run_id": run.run_id, "page": run.page, "data_version": data_version}
+    events = [dict(base, event="page", function=run.page, duration_ms=round(run.seconds * 1000, 2))]
+    for t in sorted(run.timings, key=lambda t: t.seq):
+        events.append(dict(
+            base,
+            event="step",
+            function=t.name,
+            depth=t.depth,
+            duration_ms=round(t.seconds * 1000, 2),
+            rows_in=t.rows_in,
+            rows_out=t.rows_out,
+            cache=t.cache,
+            peak_kb=None if t.peak_kb is None else round(t.peak_kb, 1),
+            error=t.error,
+        ))
+    return events
+
+
+def _log_run(run: PageRun):
+    try:
+        logger = _logger()
+        if logger is None:
+            return
+        for event in run_events(run, dataset_version()):
+            logger.info(json.dumps(event))
+    except OSError:
+        # A read-only or full disk must never break the dashboard
+        pass
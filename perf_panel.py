@@ -0,0 +1,63 @@
+import datetime
+
+import streamlit as st
+
+import perf
+
+# Admin-only sidebar panel showing the last perf.MAX_RUNS runs of each page.
+# Admin access needs an ADMIN_PASSWORD entry in .streamlit/secrets.toml; without
+# one the panel never appears.
+
+def is_admin() -> bool:
+    return st.session_state.get("is_admin", False)
+
+
+def _check_admin_password():
+    st.session_state.is_admin = st.session_state.admin_pw_input == st.secrets.get("ADMIN_PASSWORD")
+
+
+def start_page(page: str):
+    """Call at the top of a page, after login. Profiles this rerun if an admin asked for it."""
+    profile = is_admin() and st.session_state.pop("perf_profile_next", False)
+    perf.start_page_run(page, profile=profile)
+
+
+def altair_chart(chart, name: str, **kwargs):
+    """st.altair_chart, timed (spec serialization and data marshalling happen in there)."""
+    with perf.span(f"altair_chart[{name}]"):
+        st.altair_chart(chart, **kwargs)
+
+
+def end_page(page: str):
+    """Call at the bottom of a page: closes the run and draws the panel for admins."""
+    perf.finish_page_run()
+
+    if "ADMIN_PASSWORD" not in st.secrets:
+        return
+
+    with st.sidebar.expander("🔧 Performance (admin)", expanded=False):
+        if not is_admin():
+            st.text_input("Admin password:", type="password", key="admin_pw_input", on_change=_check_admin_password)
+            return
+
+        track_memory = st.checkbox("Track peak memory (slower)", value=perf.memory_tracking())
+        if track_memory != perf.memory_tracking():
+            perf.set_memory_tracking(track_memory)
+        if st.button("Profile next rerun"):
+            st.session_state.perf_profile_next = True
+
+        runs = perf.recent_runs(page)
+        if not runs:
+            st.caption("No runs recorded yet.")
+            return
+
+        labels = [
+            f"{datetime.datetime.fromtimestamp(run.started):%H:%M:%S} — {run.seconds * 1000:,.0f} ms"
+            for run in runs
+        ]
+        choice = st.selectbox("Run", range(len(runs)), format_func=lambda i: labels[i], key=f"perf_run_{page}")
+        run = runs[choice]
+
+        st.dataframe(perf.run_table(run), hide_index=True, use_container_width=True)
+        if run.profile:
+            st.code(run.profile, language=None)
@@ -0,0 +1,132 @@
+"""
+Latency summary of the JSON-lines performance log written by perf.py.
+
+    python perf_report.py
+    python perf_report.py --page "Sales Performance" --since 30 --budget-ms 500
+    python perf_report.py --by-version --function compute_churn_bento
+
+Prints p50/p95 per page and per function. --by-version splits the numbers by
+dataset version (one version per state of data/), oldest first, so the point
+where a growing SALES ORDER.csv pushes a step over budget is easy to spot.
+"""
+import argparse
+import glob
+import json
+import os
+
+import pandas as pd
+
+import perf
+
+
+def log_files(path: str) -> list:
+    """A log and its rotated backups, oldest first."""
+    # RotatingFileHandler backups: perf.jsonl.1 is the newest, higher numbers are older
+    files = [f for f in glob.glob(f"{glob.escape(path)}.*") if f.rsplit(".", 1)[1].isdigit()]
+    files.sort(key=lambda f: int(f.rsplit(".", 1)[1]), reverse=True)
+    if os.path.isfile(path):
+        files.append(path)
+    return files
+
+
+def read_log(path=None) -> pd.DataFrame:
+    """Every event in the log and its rotated backups, oldest first. By default also
+    the logs of LAUNCHAPP.py's workers (perf-<n>.jsonl beside perf.jsonl)."""
+    if path or not perf.LOG_PATH:
+        paths = [path] if path else []
+    else:
+        root, ext = os.path.splitext(perf.LOG_PATH)
+        paths = [perf.LOG_PATH] + sorted(glob.glob(f"{glob.escape(root)}-*{glob.escape(ext)}"))
+
+    events = []
+    for file in [f for p in paths for f in log_files(p)]:
+        with open(file, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a crash or rotation
+
+    df = pd.DataFrame(events)
+    if not df.empty:
+        df["ts"] = pd.to_datetime(df["ts"], errors="coerce")
+        df = df.sort_values("ts", kind="stable", ignore_index=True)
+    return df
+
+
+def summarize(events: pd.DataFrame, by_version: bool = False) -> pd.DataFrame:
+    """Count, p50, p95 and max duration per (page, function), plus cache hit rate
+    and the largest input seen."""
+    keys = ["page", "function"]
+    if by_version:
+        keys = ["data_version"] + keys
+
+    events = events.assign(
+        hit=events["cache"].eq("hit") if "cache" in events else False,
+        cached=events["cache"].notna() if "cache" in events else False,
+    )
+    grouped = events.groupby(keys, sort=False)
+    summary = grouped["duration_ms"].agg(
+        runs="count",
+        p50_ms=lambda s: s.quantile(0.5),
+        p95_ms=lambda s: s.quantile(0.95),
+        max_ms="max",
+    )
+    summary["max_rows_in"] = grouped["rows_in"].max() if "rows_in" in events else None
+    cached = grouped["cached"].sum()
+    summary["hit_rate"] = (grouped["hit"].sum() / cached.where(cached > 0)).round(2)
+    summary["first_seen"] = grouped["ts"].min()
+    summary = summary.reset_index()
+
+    if by_version:
+        # Versions in the order the data reached them, slowest steps first within each
+        order = summary.groupby("data_version")["first_seen"].transform("min")
+        summary = summary.assign(_order=order).sort_values(["_order", "p95_ms"], ascending=[True, False]).drop(columns="_order")
+    else:
+        summary = summary.sort_values("p95_ms", ascending=False)
+    return summary.round({"p50_ms": 1, "p95_ms": 1, "max_ms": 1})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize page and function latencies from the perf log.")
+    parser.add_argument("--log", help=f"log file (default: {perf.LOG_PATH} and the workers' logs beside it)")
+    parser.add_argument("--page", help="only this page (e.g. 'Sales Performance', 'Data Updates')")
+    parser.add_argument("--function", help="only functions whose name contains this text")
+    parser.add_argument("--since", type=float, help="only the last N days")
+    parser.add_argument("--pages-only", action="store_true", help="whole page runs only, no individual steps")
+    parser.add_argument("--by-version", action="store_true", help="split by dataset version, oldest first")
+    parser.add_argument("--budget-ms", type=float, help="flag rows whose p95 exceeds this many milliseconds")
+    args = parser.parse_args(argv)
+
+    events = read_log(args.log)
+    if events.empty:
+        print(f"No events in {args.log or perf.LOG_PATH}")
+        return
+
+    if args.page:
+        events = events[events["page"] == args.page]
+    if args.function:
+        events = events[events["function"].str.contains(args.function, regex=False)]
+    if args.since:
+        events = events[events["ts"] >= pd.Timestamp.now() - pd.Timedelta(days=args.since)]
+    if args.pages_only:
+        events = events[events["event"] == "page"]
+    if events.empty:
+        print("No events match the filters.")
+        return
+
+    summary = summarize(events, by_version=args.by_version)
+    summary["first_seen"] = summary["first_seen"].dt.strftime("%Y-%m-%d %H:%M")
+    if args.budget_ms:
+        summary["over_budget"] = summary["p95_ms"].gt(args.budget_ms).map({True: "!!", False: ""})
+
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.max_colwidth", 48):
+        print(summary.to_string(index=False))
+
+    if args.budget_ms:
+        over = summary[summary["over_budget"] != ""]
+        print(f"\n{len(over)} of {len(summary)} rows over the {args.budget_ms:,.0f} ms budget (p95)")
+
+
+if __name__ == "__main__":
+    main()
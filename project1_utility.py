@@ -1,7 +1,8 @@
 import pandas as pd
-import plotly.express as px
 import datetime
+import perf
 
+@perf.timed()
 def clean_data(file):
     """Loads and processes Customer/Sales data."""
     file.seek(0)
@@ -66,6 +67,7 @@ def clean_data(file):
 
     return df
 
+@perf.timed()
 def get_churn_chart(df):
     if df.empty or 'Risk_Status' not in df.columns: return None
     
@@ -74,6 +76,7 @@ def get_churn_chart(df):
     
     if risk_counts.empty: return None
 
+    import plotly.express as px  # imported on first chart: no page loads plotly up front
     fig = px.pie(
         risk_counts, 
         names='Risk_Status', 
@@ -85,6 +88,7 @@ def get_churn_chart(df):
     )
     return fig
 
+@perf.timed()
 def get_collection_table(df):
     if df.empty or 'STATUS' not in df.columns: return None
     
@@ -1,7 +1,9 @@
 import pandas as pd
-import plotly.express as px
+import perf
+from compute import suppliers
 
 # --- 1. ROBUST DATA LOADING ---
+@perf.timed()
 def find_header_and_read(file, keyword):
     """Scans file for a keyword to find the correct header row."""
     file.seek(0)
@@ -28,6 +30,7 @@ def find_header_and_read(file, keyword):
         pass
     return pd.DataFrame() 
 
+@perf.timed()
 def clean_data(stock_file, po_files):
     # A. LOAD STOCK
     df_stock = find_header_and_read(stock_file, "ON HAND STOCK")
@@ -52,28 +55,7 @@ def clean_data(stock_file, po_files):
         if not df.empty: po_frames.append(df)
     
     if po_frames:
-        df_po = pd.concat(po_frames, ignore_index=True)
-        # Clean Dates
-        for col in ['DATE REQUEST', 'DELIVERY DATE']:
-            if col in df_po.columns: 
-                df_po.rename(columns={col: col.replace('\n', ' ')}, inplace=True)
-        
-        if 'DATE REQUEST' in df_po.columns and 'DELIVERY DATE' in df_po.columns:
-            df_po['DATE REQUEST'] = pd.to_datetime(df_po['DATE REQUEST'], errors='coerce')
-            df_po['DELIVERY DATE'] = pd.to_datetime(df_po['DELIVERY DATE'], errors='coerce')
-            df_po['Lead_Time'] = (df_po['DELIVERY DATE'] - df_po['DATE REQUEST']).dt.days
-        else:
-            df_po['Lead_Time'] = 0
-
-        # Clean Amount
-        target = 'AMMOUNT' if 'AMMOUNT' in df_po.columns else ('AMOUNT' if 'AMOUNT' in df_po.columns else None)
-        if target:
-             df_po['Clean_Amount'] = df_po[target].astype(str).str.replace(r'[^\d.]', '', regex=True)
-             df_po['Clean_Amount'] = pd.to_numeric(df_po['Clean_Amount'], errors='coerce').fillna(0)
-        else:
-             df_po['Clean_Amount'] = 0
-             
-        if 'STATUS' not in df_po.columns: df_po['STATUS'] = 'Unknown'
+        df_po = suppliers.clean_po_log(pd.concat(po_frames, ignore_index=True))
     else:
         df_po = pd.DataFrame(columns=['Clean_Amount', 'STATUS', 'Lead_Time', 'SUPPLIER', 'RAWMATERIALS'])
 
@@ -103,9 +85,11 @@ def clean_data(stock_file, po_files):
     return df_stock, df_po
 
 # --- 2. CHART FUNCTIONS ---
+@perf.timed()
 def get_stock_bar(df):
     if df.empty or 'Total_Value' not in df.columns: return None
     df_top = df.sort_values('Total_Value', ascending=False).head(10)
+    import plotly.express as px  # imported on first chart: no page loads plotly up front
     fig = px.bar(
         df_top, 
         x='Total_Value', 
@@ -118,11 +102,13 @@ def get_stock_bar(df):
     fig.update_layout(yaxis_title="", xaxis_title="PHP")
     return fig
 
+@perf.timed()
 def get_lead_bar(df_po):
     if df_po.empty or 'SUPPLIER' not in df_po.columns or 'Lead_Time' not in df_po.columns: return None
-    valid = df_po[df_po['Lead_Time'] > 0]
-    if valid.empty: return None
-    avg = valid.groupby('SUPPLIER')['Lead_Time'].mean().sort_values().head(10)
+    stats = suppliers.lead_time_stats(suppliers.lead_time_histogram(df_po, ('SUPPLIER',)))
+    if stats.empty: return None
+    avg = stats.set_index('SUPPLIER')['Mean'].sort_values().head(10)
+    import plotly.express as px
     fig = px.bar(
         avg, 
         orientation='h', 
@@ -130,4 +116,4 @@ def get_lead_bar(df_po):
         text_auto='.0f'
     )
     fig.update_layout(yaxis_title="", xaxis_title="Days")
-    return fig
\ No newline at end of file
+    return fig
@@ -0,0 +1,474 @@
+"""
+Dashboard queries answered by the SQLite store (datastore.py).
+
+Filters and group-bys run inside SQLite against indexed tables, so only the
+rows of the answer come back as a DataFrame. Each function returns the same
+shape as its pandas counterpart in compute/, which stays the reference
+implementation (and what batch jobs use on in-memory frames).
+
+Date-bounded functions take `start` (inclusive) and `end` (exclusive) as ISO
+text, either None for an open bound; they become range scans on the Date
+index (see date_range.py for the sidebar control producing them). Windows made
+of whole months are answered from the monthly rollups (rollups.py) instead.
+"""
+from typing import Optional
+
+import pandas as pd
+
+import datastore
+import rollups
+from compute import customers, receivables, sales, suppliers
+
+SALES = datastore.DATASETS["sales"].table
+COLLECTIONS = datastore.DATASETS["collections"].table
+RECEIVABLES = datastore.DATASETS["receivables"].table
+STOCK = datastore.DATASETS["stock"].table
+SUMMARY = datastore.DATASETS["summary"].table
+
+# Rows compute.sales.clean_sales keeps (dates and amounts are coerced on load)
+CLEAN_SALES = '"Date" IS NOT NULL AND "Total Amount" IS NOT NULL'
+
+_METRIC_SQL = {
+    "Sales (Total)": 'SUM("Total Amount")',
+    "Number of Customers": 'COUNT(DISTINCT "Customer ID")',
+    "Sales per Customer": 'SUM("Total Amount") * 1.0 / COUNT(DISTINCT "Customer ID")',
+}
+
+
+def _query(sql: str, params=(), data_dir: Optional[str] = None) -> pd.DataFrame:
+    with datastore.connection(data_dir) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def _between(col: str, start: Optional[str], end: Optional[str]):
+    """(SQL condition, params) keeping start <= col < end; ("", ()) when unbounded."""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"{datastore.quote(col)} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{datastore.quote(col)} < ?")
+        params.append(end)
+    return " AND ".join(clauses), tuple(params)
+
+
+def _and(*conditions) -> str:
+    return " AND ".join(c for c in conditions if c)
+
+
+def date_bounds(name: str = "sales", data_dir: Optional[str] = None):
+    """(first, last) date of a dataset as Timestamps, or (None, None) when it is empty."""
+    ds = datastore.DATASETS[name]
+    col = datastore.quote(ds.date_cols[0])
+    with datastore.connection(data_dir) as conn:
+        if not datastore.table_exists(conn, ds.table):
+            return None, None
+        # Two queries: SQLite only answers a lone MIN() or MAX() from the index
+        first = conn.execute(f"SELECT MIN({col}) FROM {ds.table}").fetchone()[0]
+        last = conn.execute(f"SELECT MAX({col}) FROM {ds.table}").fetchone()[0]
+    if last is None:
+        return None, None
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+
+def _month_bounds(conn, start: Optional[str], end: Optional[str]):
+    """[start, end) as (first, end) Month keys of the monthly rollups, or None when
+    a bound is not a month start and cuts off some orders."""
+    def inside(bound, func):
+        if bound is None or bound.endswith("-01 00:00:00"):
+            return False
+        edge = conn.execute(f'SELECT {func}("Date") FROM {SALES} WHERE {CLEAN_SALES}').fetchone()[0]
+        return edge is not None and (bound <= edge if func == "MAX" else bound > edge)
+
+    if inside(start, "MIN") or inside(end, "MAX"):
+        return None
+    # A bound before the first order or after the last one cuts nothing off
+    if start is not None and not start.endswith("-01 00:00:00"):
+        start = None
+    if end is not None and not end.endswith("-01 00:00:00"):
+        end = None
+    return start and start[:10], end and end[:10]
+
+
+######################
+# SALES PERFORMANCE
+######################
+
+def sales_rows(start: Optional[str] = None, end: Optional[str] = None, data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.sales.clean_sales of the orders in [start, end), in date order, with
+    their customers' masterlist attributes."""
+    where, params = _between("Date", start, end)
+    df = datastore.read_table("sales", _and(CLEAN_SALES, where), params, order_by='"Date", rowid', data_dir=data_dir,
+                              with_customer=True)
+    return df.drop(columns="Clean_Location", errors="ignore")
+
+
+def has_sales(start: Optional[str] = None, end: Optional[str] = None, data_dir: Optional[str] = None) -> bool:
+    """Whether any clean order falls in [start, end): one index seek, no rows read."""
+    where, params = _between("Date", start, end)
+    with datastore.connection(data_dir) as conn:
+        if not datastore.table_exists(conn, SALES):
+            return False
+        sql = f"SELECT EXISTS(SELECT 1 FROM {SALES} WHERE {_and(CLEAN_SALES, where)} LIMIT 1)"
+        return bool(conn.execute(sql, params).fetchone()[0])
+
+
+def latest_year_sales(start: Optional[str] = None, end: Optional[str] = None,
+                      data_dir: Optional[str] = None) -> pd.DataFrame:
+    """Date and Total Amount of the orders in [start, end) that fall in the calendar
+    year of the last of them: all compute.sales.median_transaction_value looks at."""
+    where, params = _between("Date", start, end)
+    with datastore.connection(data_dir) as conn:
+        last = conn.execute(f'SELECT MAX("Date") FROM {SALES} WHERE {_and(CLEAN_SALES, where)}', params).fetchone()[0]
+    if last is None:
+        return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Total Amount": pd.Series(dtype=float)})
+    where, params = _between("Date", max(f"{last[:4]}-01-01 00:00:00", start or ""), end)
+    return datastore.read_table("sales", _and(CLEAN_SALES, where), params, columns=["Date", "Total Amount"],
+                                data_dir=data_dir)
+
+
+def bento_rows(frequency: str, end: Optional[str] = None, data_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Only the orders periodic_sales / periodic_customers look at for the
+    4 periods ending at the last order before `end`; None if there is none."""
+    with datastore.connection(data_dir) as conn:
+        last = conn.execute(
+            f'SELECT MAX("Date") FROM {SALES} WHERE "Date" < ? AND {CLEAN_SALES}', (end or "9999-12-31",)
+        ).fetchone()[0]
+        if last is None:
+            return None
+        window_start = sales.bento_window_start(last, frequency).strftime(datastore.ISO_FORMAT)
+        # Start at the last order day before the window so weeks/months without
+        # orders at the start of the window still get their zero bars
+        before = conn.execute(
+            f'SELECT MAX("Date") FROM {SALES} WHERE "Date" < ? AND {CLEAN_SALES}', (window_start,)
+        ).fetchone()[0]
+    return sales_rows(before or window_start, end, data_dir)
+
+
+def monthly_sales(start: Optional[str] = None, end: Optional[str] = None, data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.sales.monthly_sales over the orders in [start, end)."""
+    with datastore.connection(data_dir) as conn:
+        months = _month_bounds(conn, start, end)
+        if months is not None:
+            where, params = _between("Month", *months)
+            sql = (
+                f'SELECT Month, SUM("Total Amount") AS "Total Amount" FROM {rollups.SALES_MONTHLY} '
+                f'{"WHERE " + where if where else ""} GROUP BY 1 ORDER BY 1'
+            )
+        else:
+            where, params = _between("Date", start, end)
+            sql = (
+                f'SELECT substr("Date", 1, 7) || \'-01\' AS Month, SUM("Total Amount") AS "Total Amount" '
+                f'FROM {SALES} WHERE {_and(CLEAN_SALES, where)} GROUP BY 1 ORDER BY 1'
+            )
+        df = pd.read_sql_query(sql, conn, params=params)
+    df["Month"] = pd.to_datetime(df["Month"])
+    return df
+
+
+def _period_start(date, frequency: str) -> pd.Timestamp:
+    freq = {"weekly": "W", "monthly": "M"}[frequency]
+    return pd.Timestamp(date).to_period(freq).start_time
+
+
+def latest_periods_start(frequency: str, n_periods: int = 5, end: Optional[str] = None,
+                         data_dir: Optional[str] = None) -> Optional[str]:
+    """Start of the oldest of the last `n_periods` weeks/months before `end` that
+    have orders, as ISO text. Walks back one period at a time with MAX() seeks on
+    the Date index."""
+    if frequency not in ("weekly", "monthly"):
+        raise ValueError("frequency must be 'weekly' or 'monthly'")
+
+    start = None
+    with datastore.connection(data_dir) as conn:
+        bound = end or "9999-12-31"
+        for _ in range(n_periods):
+            latest = conn.execute(
+                f'SELECT MAX("Date") FROM {SALES} WHERE "Date" < ? AND {CLEAN_SALES}', (bound,)
+            ).fetchone()[0]
+            if latest is None:
+                break
+            start = _period_start(latest, frequency).strftime(datastore.ISO_FORMAT)
+            bound = start
+    return start
+
+
+def _aggregate(group_expr: str, group_col: str, metric: str, start: Optional[str], end: Optional[str],
+               data_dir: Optional[str] = None) -> pd.DataFrame:
+    if metric not in _METRIC_SQL:
+        raise ValueError("Invalid metric")
+    with datastore.connection(data_dir) as conn:
+        months = _month_bounds(conn, start, end)
+        if months is not None:
+            # Type and Clean_Location are stored already defaulted to 'Unknown'
+            where, params = _between("Month", *months)
+            source = f"{rollups.SALES_MONTHLY}{' WHERE ' + where if where else ''}"
+            group_expr = datastore.quote(group_col)
+        else:
+            where, params = _between("Date", start, end)
+            source = f"{SALES} LEFT JOIN {datastore.CUSTOMER_DIM} USING (\"Customer ID\") WHERE {_and(CLEAN_SALES, where)}"
+        sql = (
+            f"SELECT {group_expr} AS {datastore.quote(group_col)}, {_METRIC_SQL[metric]} AS Value "
+            f"FROM {source} GROUP BY 1 ORDER BY Value DESC, 1"
+        )
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+TYPE_EXPR = "COALESCE(\"Type\", 'Unknown')"
+LOCATION_EXPR = "COALESCE(\"Clean_Location\", 'Unknown')"
+
+
+def _aggregate_recent(group_expr: str, group_col: str, frequency: str, metric: str,
+                      start: Optional[str], end: Optional[str], data_dir: Optional[str]) -> pd.DataFrame:
+    period_start = latest_periods_start(frequency, end=end, data_dir=data_dir)
+    if period_start is None:
+        return pd.DataFrame(columns=[group_col, "Value"])
+    return _aggregate(group_expr, group_col, metric, max(period_start, start or period_start), end, data_dir)
+
+
+def aggregate_recent_by_type(frequency: str, metric: str, start: Optional[str] = None, end: Optional[str] = None,
+                             data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.aggregation.aggregate_recent_by_type on the orders in [start, end)."""
+    return _aggregate_recent(TYPE_EXPR, "Type", frequency, metric, start, end, data_dir)
+
+
+def aggregate_recent_by_location(frequency: str, metric: str, start: Optional[str] = None, end: Optional[str] = None,
+                                 data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.aggregation.aggregate_recent_by_location on the orders in [start, end)."""
+    return _aggregate_recent(LOCATION_EXPR, "Clean_Location", frequency, metric, start, end, data_dir)
+
+
+def aggregate_overview(metric: str, start: Optional[str] = None, end: Optional[str] = None,
+                       data_dir: Optional[str] = None):
+    """compute.aggregation.aggregate_overview: (by Type, by Location) over [start, end)."""
+    return (
+        _aggregate(TYPE_EXPR, "Type", metric, start, end, data_dir),
+        _aggregate(LOCATION_EXPR, "Clean_Location", metric, start, end, data_dir),
+    )
+
+
+def customer_order_days(start: Optional[str] = None, end: Optional[str] = None,
+                        data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.sales.order_days of the orders in [start, end), read from the
+    customer_order_days rollup; a previous order date before `start` is dropped."""
+    where, params = _between("Date", start, end)
+    prev = "Prev_Date" if start is None else "CASE WHEN Prev_Date >= ? THEN Prev_Date END"
+    df = _query(
+        f'SELECT "Customer ID", "Date", Orders, {prev} AS Prev_Date FROM {rollups.CUSTOMER_DAYS} '
+        f'{"WHERE " + where if where else ""} ORDER BY 1, 2',
+        ((start,) if start is not None else ()) + params, data_dir,
+    )
+    return datastore.parse_dates(df, ("Date", "Prev_Date"))
+
+
+######################
+# CUSTOMER MANAGEMENT
+######################
+
+def customer_options(data_dir: Optional[str] = None) -> dict:
+    """compute.customers.customer_options: {Customer ID: name} by lifetime sales,
+    largest first, each customer named as first registered (datastore.customer_ids)."""
+    df = _query(
+        f'SELECT s."Customer ID", k.name FROM {SALES} s JOIN customer_keys k ON k.customer_id = s."Customer ID" '
+        f'GROUP BY 1 ORDER BY SUM(s."Total Amount") DESC, 1',
+        data_dir=data_dir,
+    )
+    return dict(zip(df["Customer ID"].tolist(), df["name"]))
+
+
+def _customer_filter(customer: Optional[int], where: str = "", params=()):
+    if customer is None or customer == customers.ALL_CUSTOMERS:
+        return where, params
+    return _and('"Customer ID" = ?', where), (int(customer),) + params
+
+
+def customer_rows(name: str, customer: Optional[int], start: Optional[str] = None, end: Optional[str] = None,
+                  data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.customers.filter_customer on a dataset ("sales", "collections",
+    "receivables") by Customer ID, restricted to [start, end), served from the
+    Customer ID or Date index."""
+    where, params = _customer_filter(customer, *_between("Date", start, end))
+    return datastore.read_table(name, where, params, data_dir=data_dir, with_customer=name == "sales")
+
+
+def open_receivables(data_dir: Optional[str] = None) -> pd.DataFrame:
+    """Receivables still carrying a Balance, what compute.receivables.ar_aging buckets."""
+    return datastore.read_table("receivables", '"Balance" > 0', data_dir=data_dir)
+
+
+def collection_summary(as_of, data_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """compute.receivables.collection_summary of the customers with open receivables,
+    by Customer ID: grouped in SQLite, so one row per such customer is read. None
+    when no collections are loaded."""
+    as_of = pd.Timestamp(as_of)
+    params = ((as_of - pd.Timedelta(days=receivables.COLLECTION_DAYS)).strftime(datastore.ISO_FORMAT),
+              as_of.strftime(datastore.ISO_FORMAT))
+    with datastore.connection(data_dir) as conn:
+        if not datastore.table_exists(conn, COLLECTIONS):
+            return None
+        df = pd.read_sql_query(
+            f'SELECT "Customer ID", MAX("Date") AS "Last Collection", '
+            f'SUM(CASE WHEN "Date" > ? THEN "Check Amount" END) AS Collected '
+            f'FROM {COLLECTIONS} WHERE "Date" <= ? '
+            f'AND "Customer ID" IN (SELECT "Customer ID" FROM {RECEIVABLES} WHERE "Balance" > 0) GROUP BY 1',
+            conn, params=params,
+        )
+    return datastore.parse_dates(df, ("Last Collection",))
+
+
+def invoice_payments(customer: Optional[int] = None, data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.receivables.reconcile_payments, read from the invoice_payments rollup:
+    every customer's invoices (or one customer's, by Customer ID) with Paid_Date and
+    Days_to_Pay."""
+    where, params = _customer_filter(customer)
+    df = _query(f'SELECT * FROM {rollups.INVOICE_PAYMENTS} {"WHERE " + where if where else ""} '
+                f'ORDER BY "Customer ID", "Date", rowid', params, data_dir)
+    return datastore.parse_dates(df, ("Date", "Paid_Date"))
+
+
+######################
+# INVENTORY
+######################
+
+# compute.inventory.prepare_inventory's unit cost: mean of Cost / Qty (0 where Qty is 0),
+# from the per-month sums kept in the item_monthly rollup
+_UNIT_COST = (
+    f'SELECT "Product Code", SUM(Unit_Cost_Sum) / SUM(Unit_Cost_Rows) AS unit_cost '
+    f'FROM {rollups.ITEM_MONTHLY} WHERE "Product Code" IN (SELECT "Product Code" FROM {STOCK} s WHERE {{where}}) '
+    f'GROUP BY 1'
+)
+
+
+def _item_filter(category: Optional[str], product_code: Optional[str]):
+    if product_code is not None:
+        return 's."Product Code" = ?', (product_code,)
+    if category is not None:
+        return 's."Category" = ?', (category,)
+    return "1", ()
+
+
+def stock_levels(category: Optional[str] = None, product_code: Optional[str] = None,
+                 data_dir: Optional[str] = None) -> pd.DataFrame:
+    """Stock rows of every snapshot (all, one category or one item) with Calculated_Unit_Cost
+    and Total Stock Value, as compute.inventory.prepare_inventory derives them."""
+    where, params = _item_filter(category, product_code)
+
+    sql = (
+        f'SELECT s.*, p.unit_cost AS Calculated_Unit_Cost, s.Qty * p.unit_cost AS "Total Stock Value" '
+        f"FROM {STOCK} s LEFT JOIN ({_UNIT_COST.format(where=where)}) p USING (\"Product Code\") "
+        f"WHERE {where} ORDER BY s.rowid"
+    )
+    df = _query(sql, params * 2, data_dir)
+    return datastore.parse_dates(df, datastore.DATASETS["stock"].date_cols)
+
+
+def item_sales(category: Optional[str] = None, product_code: Optional[str] = None,
+               start: Optional[str] = None, end: Optional[str] = None, data_dir: Optional[str] = None) -> pd.DataFrame:
+    """SUMMARY PER ITEM rows in [start, end): all of them, one item's, or those of
+    every item stocked under a category."""
+    if product_code is not None:
+        where, params = '"Product Code" = ?', (product_code,)
+    elif category is not None:
+        where, params = f'"Product Code" IN (SELECT "Product Code" FROM {STOCK} WHERE "Category" = ?)', (category,)
+    else:
+        where, params = "", ()
+    month_where, month_params = _between("Month-Year", start, end)
+    return datastore.read_table("summary", _and(where, month_where), params + month_params, data_dir=data_dir)
+
+
+def item_monthly_sales(start: Optional[str] = None, end: Optional[str] = None,
+                       data_dir: Optional[str] = None) -> pd.DataFrame:
+    """Qty, Amount and Cost per item and month in [start, end), read from the
+    item_monthly rollup, with the item's Item Description and the "YYYY-MM" Month
+    key of compute.inventory: what inventory_facts needs of SUMMARY PER ITEM."""
+    where, params = _between("Month-Year", start, end)
+    sql = (
+        f'SELECT m."Product Code", d."Item Description", NULLIF(m."Month-Year", \'\') AS "Month-Year", '
+        f'NULLIF(substr(m."Month-Year", 1, 7), \'\') AS Month, m.Qty, m.Amount, m.Cost '
+        f'FROM (SELECT * FROM {rollups.ITEM_MONTHLY}{" WHERE " + where if where else ""}) m '
+        f'LEFT JOIN (SELECT "Product Code", MAX("Item Description") AS "Item Description" FROM {SUMMARY} GROUP BY 1) d '
+        f'USING ("Product Code") ORDER BY m."Month-Year", m."Product Code"'
+    )
+    return datastore.parse_dates(_query(sql, params, data_dir), ("Month-Year",))
+
+
+def recent_item_usage(months: int, data_dir: Optional[str] = None) -> pd.DataFrame:
+    """Qty per item over the latest `months` months of SUMMARY PER ITEM, read from the
+    item_monthly rollup: one row per Product Code and Month-Year."""
+    sql = (
+        f'SELECT "Product Code", "Month-Year", Qty FROM {rollups.ITEM_MONTHLY} '
+        f'WHERE "Month-Year" >= (SELECT MIN(m) FROM (SELECT DISTINCT "Month-Year" AS m FROM {rollups.ITEM_MONTHLY} '
+        f"WHERE \"Month-Year\" <> '' ORDER BY 1 DESC LIMIT ?))"
+    )
+    return _query(sql, (months,), data_dir)
+
+
+######################
+# STOCK HISTORY
+######################
+
+# STOCK LEVELS.csv gains one snapshot per item with every upload, stamped with
+# its Inventory Date. These read it as a time series through the
+# ("Product Code", "Inventory Date") index.
+
+def stock_snapshot(as_of: Optional[str] = None, category: Optional[str] = None, product_code: Optional[str] = None,
+                   data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.inventory.latest_stock: each item's last snapshot on or before `as_of`
+    (ISO text; None for the latest upload), with Calculated_Unit_Cost and Total Stock Value."""
+    where, params = _item_filter(category, product_code)
+    dated, date_params = ('AND l."Inventory Date" <= ? ', (as_of,)) if as_of is not None else ("", ())
+    sql = (
+        f'SELECT s.*, p.unit_cost AS Calculated_Unit_Cost, s.Qty * p.unit_cost AS "Total Stock Value" '
+        f"FROM {STOCK} s LEFT JOIN ({_UNIT_COST.format(where=where)}) p USING (\"Product Code\") "
+        f"WHERE {where} AND s.rowid = ("
+        f'SELECT l.rowid FROM {STOCK} l WHERE l."Product Code" = s."Product Code" {dated}'
+        f'ORDER BY l."Inventory Date" DESC, l.rowid DESC LIMIT 1) '
+        f"ORDER BY s.rowid"
+    )
+    df = _query(sql, params * 2 + date_params, data_dir)
+    return datastore.parse_dates(df, datastore.DATASETS["stock"].date_cols)
+
+
+def stock_history(product_code: str, start: Optional[str] = None, end: Optional[str] = None,
+                  data_dir: Optional[str] = None) -> pd.DataFrame:
+    """One item's snapshots in [start, end), oldest first: Inventory Date, Qty, Min Level."""
+    where, params = _between("Inventory Date", start, end)
+    return datastore.read_table(
+        "stock", _and('"Product Code" = ?', where), (product_code,) + params,
+        columns=["Inventory Date", "Qty", "Min Level"], order_by='"Inventory Date", rowid', data_dir=data_dir,
+    )
+
+
+def snapshot_dates(data_dir: Optional[str] = None) -> list:
+    """Distinct Inventory Dates of the stock uploads, oldest first."""
+    df = _query(
+        f'SELECT DISTINCT "Inventory Date" FROM {STOCK} WHERE "Inventory Date" IS NOT NULL ORDER BY 1',
+        data_dir=data_dir,
+    )
+    return pd.to_datetime(df["Inventory Date"], format=datastore.ISO_FORMAT).tolist()
+
+
+######################
+# PROCUREMENT
+######################
+
+# Supplier lead times come from the supplier_lead_days histogram (rollups.py),
+# summed to the requested grouping in SQLite and summarised by compute.suppliers
+
+_LEAD_GROUPS = {("SUPPLIER",), ("RAWMATERIALS",), ("SUPPLIER", "RAWMATERIALS")}
+
+
+def lead_time_histogram(by=("SUPPLIER",), data_dir: Optional[str] = None) -> pd.DataFrame:
+    """POs per `by` group and Lead_Time: SUPPLIER, RAWMATERIALS or both."""
+    by = tuple(by)
+    if by not in _LEAD_GROUPS:
+        raise ValueError(f"Unknown lead-time grouping: {by}")
+    cols = ", ".join(by)
+    sql = f"SELECT {cols}, Lead_Time, SUM(POs) AS POs FROM {rollups.SUPPLIER_LEAD} GROUP BY {cols}, Lead_Time"
+    return _query(sql, (), data_dir)
+
+
+def lead_time_stats(by=("SUPPLIER",), on_time_days: int = suppliers.ON_TIME_DAYS,
+                    data_dir: Optional[str] = None) -> pd.DataFrame:
+    """compute.suppliers.lead_time_stats per `by` group over every PO log uploaded."""
+    return suppliers.lead_time_stats(lead_time_histogram(by, data_dir), by, on_time_days)
@@ -0,0 +1,262 @@
+"""
+Derived tables kept up to date inside the SQLite store (datastore.py).
+
+    sales_monthly        Month x Type x Clean_Location x Customer ID: Total Amount, Orders
+    customer_order_days  Customer ID x Date: Orders, Prev_Date (the customer's previous order date)
+    item_monthly         Product Code x Month-Year: Qty, Amount, Cost and the unit cost sum/count
+    invoice_payments     one row per receivable: the date collections paid it off and Days_to_Pay
+    supplier_lead_days   SUPPLIER x RAWMATERIALS x Lead_Time (whole days): POs delivered
+
+When Data_Updates.py appends rows, datastore.save_dataset() folds just those
+rows into the rollups of their dataset (upserts keyed on the grain above), so
+ingest cost follows the size of the upload. A reloaded or overwritten table
+rebuilds its rollups from scratch. To rebuild them all by hand, for repair:
+
+    python rollups.py --rebuild
+
+queries.py reads these tables instead of the raw rows whenever a date window
+covers whole months (sales_monthly) or asks for per-customer order history.
+supplier_lead_days is a lead-time histogram: counts add up across uploads, and
+compute.suppliers.lead_time_stats turns any grouping of it into mean, median,
+90th percentile and on-time rate. Customers are keyed by the integer Customer ID
+datastore.py assigns (spellings of one name share it), never by name text;
+sales_monthly takes Type and Clean_Location from the customer_dim row of that ID.
+"""
+import argparse
+from dataclasses import dataclass
+from typing import Optional
+
+import datastore
+
+SALES_MONTHLY = "sales_monthly"
+CUSTOMER_DAYS = "customer_order_days"
+ITEM_MONTHLY = "item_monthly"
+SUPPLIER_LEAD = "supplier_lead_days"
+INVOICE_PAYMENTS = "invoice_payments"
+
+_COLLECTIONS = datastore.DATASETS["collections"].table
+_RECEIVABLES = datastore.DATASETS["receivables"].table
+
+# Same rows queries.sales_rows() keeps
+_CLEAN_SALES = '"Date" IS NOT NULL AND "Total Amount" IS NOT NULL'
+
+
+@dataclass(frozen=True)
+class Rollup:
+    table: str
+    source: str         # DATASETS key the rollup is derived from
+    columns: str        # CREATE TABLE body, primary key = the grain
+    insert: str         # INSERT ... SELECT over {rows}, merging into existing groups
+    after: tuple = ()   # statements run after each insert, restricted to the groups {rows} touched
+    indexes: tuple = ()
+    before: tuple = ()  # statements run before each insert (e.g. clearing the groups to recompute)
+    also: tuple = ()    # other datasets whose new rows touch groups of this rollup
+    rebuilt_by: tuple = ()  # datasets whose changes recompute the whole rollup
+
+
+ROLLUPS = (
+    Rollup(
+        SALES_MONTHLY, "sales",
+        columns=(
+            'Month TEXT, Type TEXT, Clean_Location TEXT, "Customer ID" INTEGER, '
+            '"Total Amount" REAL, Orders INTEGER, '
+            'PRIMARY KEY (Month, Type, Clean_Location, "Customer ID")'
+        ),
+        insert=(
+            f'INSERT INTO {SALES_MONTHLY} '
+            f'SELECT substr("Date", 1, 7) || \'-01\', COALESCE("Type", \'Unknown\'), '
+            f'COALESCE("Clean_Location", \'Unknown\'), "Customer ID", SUM("Total Amount"), COUNT(*) '
+            f'FROM {{rows}} LEFT JOIN {datastore.CUSTOMER_DIM} USING ("Customer ID") WHERE {_CLEAN_SALES} GROUP BY 1, 2, 3, 4 '
+            f'ON CONFLICT (Month, Type, Clean_Location, "Customer ID") DO UPDATE SET "Total Amount" = "Total Amount" + excluded."Total Amount", '
+            f'Orders = Orders + excluded.Orders'
+        ),
+        # Type and location come from the customer dimension, so a masterlist change regroups every month
+        rebuilt_by=("customers",),
+    ),
+    Rollup(
+        CUSTOMER_DAYS, "sales",
+        columns='"Customer ID" INTEGER, "Date" TEXT, Orders INTEGER, Prev_Date TEXT, PRIMARY KEY ("Customer ID", "Date")',
+        insert=(
+            f'INSERT INTO {CUSTOMER_DAYS} '
+            f'SELECT "Customer ID", "Date", COUNT(*), NULL '
+            f'FROM {{rows}} WHERE {_CLEAN_SALES} AND "Customer ID" IS NOT NULL GROUP BY 1, 2 '
+            f'ON CONFLICT ("Customer ID", "Date") DO UPDATE SET Orders = Orders + excluded.Orders'
+        ),
+        # Re-link the days from each touched customer's earliest new day onwards
+        # (only the new days themselves, for uploads in date order)
+        after=(
+            'CREATE TEMP TABLE _touched (id INTEGER PRIMARY KEY, first TEXT)',
+            f'INSERT INTO _touched SELECT "Customer ID", MIN("Date") FROM {{rows}} '
+            f'WHERE {_CLEAN_SALES} AND "Customer ID" IS NOT NULL GROUP BY 1',
+            f'UPDATE {CUSTOMER_DAYS} AS d SET Prev_Date = ('
+            f'SELECT MAX(p."Date") FROM {CUSTOMER_DAYS} p '
+            f'WHERE p."Customer ID" = d."Customer ID" AND p."Date" < d."Date") '
+            f'FROM _touched n WHERE d."Customer ID" = n.id AND d."Date" >= n.first',
+            'DROP TABLE _touched',
+        ),
+        indexes=("Date",),
+    ),
+    Rollup(
+        ITEM_MONTHLY, "summary",
+        columns=(
+            '"Product Code" TEXT, "Month-Year" TEXT, Qty REAL, Amount REAL, Cost REAL, '
+            'Unit_Cost_Sum REAL, Unit_Cost_Rows INTEGER, PRIMARY KEY ("Product Code", "Month-Year")'
+        ),
+        # Unit cost as compute.inventory.prepare_inventory takes it: Cost / Qty, 0 where Qty is 0
+        insert=(
+            f'INSERT INTO {ITEM_MONTHLY} '
+            f'SELECT "Product Code", COALESCE("Month-Year", \'\'), SUM(Qty), SUM(Amount), SUM(Cost), '
+            f'SUM(CASE WHEN Qty = 0 THEN 0 ELSE Cost * 1.0 / Qty END), '
+            f'COUNT(CASE WHEN Qty = 0 THEN 0 ELSE Cost * 1.0 / Qty END) '
+            f'FROM {{rows}} WHERE "Product Code" IS NOT NULL GROUP BY 1, 2 '
+            f'ON CONFLICT ("Product Code", "Month-Year") DO UPDATE SET Qty = Qty + excluded.Qty, Amount = Amount + excluded.Amount, '
+            f'Cost = Cost + excluded.Cost, Unit_Cost_Sum = Unit_Cost_Sum + excluded.Unit_Cost_Sum, '
+            f'Unit_Cost_Rows = Unit_Cost_Rows + excluded.Unit_Cost_Rows'
+        ),
+        indexes=("Month-Year",),
+    ),
+    Rollup(
+        INVOICE_PAYMENTS, "receivables",
+        columns=(
+            '"Customer ID" INTEGER, "Customer Name" TEXT, "SI #", "Date" TEXT, "Amount Due" REAL, "Paid Amount" REAL, "Balance" REAL, '
+            'Paid_Date TEXT, Days_to_Pay REAL'
+        ),
+        # Collections carry no invoice number, so each customer's checks pay off their
+        # invoices oldest first: an invoice's paid amount is settled on the first
+        # collection whose running total reaches the running total paid up to it
+        # (compute.receivables.reconcile_payments). Customers with new invoices or
+        # collections are recomputed whole.
+        before=(
+            f'DELETE FROM {INVOICE_PAYMENTS} WHERE "Customer ID" IN (SELECT "Customer ID" FROM {{rows}})',
+            f'CREATE TEMP TABLE _paid AS SELECT c."Customer ID" AS id, c."Date" AS paid_date, '
+            f'SUM(COALESCE(c."Check Amount", 0)) OVER (PARTITION BY c."Customer ID" ORDER BY c."Date", c.rowid) AS running '
+            f'FROM {_COLLECTIONS} c WHERE c."Date" IS NOT NULL '
+            f'AND c."Customer ID" IN (SELECT "Customer ID" FROM {{rows}})',
+            'CREATE INDEX _paid_running ON _paid (id, running)',
+        ),
+        insert=(
+            f'INSERT INTO {INVOICE_PAYMENTS} '
+            f'SELECT id, name, si, date, due, paid, balance, paid_date, '
+            f'MAX(julianday(paid_date) - julianday(date), 0) '
+            f'FROM (SELECT i.*, CASE WHEN i.paid > 0 THEN ('
+            f'SELECT p.paid_date FROM _paid p WHERE p.id = i.id AND p.running >= i.running - 0.005 '
+            f'ORDER BY p.running LIMIT 1) END AS paid_date '
+            f'FROM (SELECT r."Customer ID" AS id, r."Customer Name" AS name, r."SI #" AS si, r."Date" AS date, r."Amount Due" AS due, '
+            f'r."Paid Amount" AS paid, r."Balance" AS balance, '
+            f'SUM(COALESCE(r."Paid Amount", 0)) OVER (PARTITION BY r."Customer ID" ORDER BY r."Date", r.rowid) AS running '
+            f'FROM {_RECEIVABLES} r WHERE r."Date" IS NOT NULL '
+            f'AND r."Customer ID" IN (SELECT "Customer ID" FROM {{rows}})) i)'
+        ),
+        after=('DROP TABLE _paid',),
+        indexes=("Customer ID", "Customer Name"),
+        also=("collections",),
+    ),
+    Rollup(
+        SUPPLIER_LEAD, "po",
+        columns='SUPPLIER TEXT, RAWMATERIALS TEXT, Lead_Time INTEGER, POs INTEGER, PRIMARY KEY (SUPPLIER, RAWMATERIALS, Lead_Time)',
+        # Delivered POs only, as compute.suppliers.lead_time_histogram counts them
+        insert=(
+            f'INSERT INTO {SUPPLIER_LEAD} '
+            f'SELECT COALESCE(SUPPLIER, \'Unknown\'), COALESCE(RAWMATERIALS, \'Unknown\'), lead, COUNT(*) '
+            f'FROM (SELECT *, CAST(julianday("DELIVERY DATE") - julianday("DATE REQUEST") AS INTEGER) AS lead FROM {{rows}}) '
+            f'WHERE lead > 0 GROUP BY 1, 2, 3 '
+            f'ON CONFLICT (SUPPLIER, RAWMATERIALS, Lead_Time) DO UPDATE SET POs = POs + excluded.POs'
+        ),
+    ),
+)
+
+
+def _source_table(rollup: Rollup) -> str:
+    return datastore.DATASETS[rollup.source].table
+
+
+def _create(conn, rollup: Rollup):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {rollup.table} ({rollup.columns})")
+    for col in rollup.indexes:
+        index_name = datastore.quote(f"idx_{rollup.table}_{col}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {rollup.table} ({datastore.quote(col)})")
+
+
+def _feeds(rollup: Rollup, name: str) -> bool:
+    return name == rollup.source or name in rollup.also
+
+
+def _has_inputs(conn, rollup: Rollup) -> bool:
+    # Until every dataset it reads is loaded the rollup stays empty; loading the
+    # last one rebuilds it
+    return all(datastore.table_exists(conn, datastore.DATASETS[name].table) for name in (rollup.source,) + rollup.also)
+
+
+def _fold(conn, rollup: Rollup, rows: str, params=()):
+    """Merges the source rows selected by `rows` (a table or subquery) into the rollup."""
+    for statement in rollup.before + (rollup.insert,) + rollup.after:
+        conn.execute(statement.format(rows=rows), params if "{rows}" in statement else ())
+
+
+######################
+# MAINTENANCE
+######################
+
+def _rebuild(conn, rollup: Rollup):
+    conn.execute(f"DROP TABLE IF EXISTS {rollup.table}")
+    _create(conn, rollup)
+    if _has_inputs(conn, rollup):
+        _fold(conn, rollup, datastore.quote(_source_table(rollup)))
+
+
+def rebuild(conn, name: Optional[str] = None):
+    """Recomputes the rollups of dataset `name` (all of them if None) from the source
+    tables. Runs inside the caller's transaction."""
+    for rollup in ROLLUPS:
+        if name is None or _feeds(rollup, name) or name in rollup.rebuilt_by:
+            _rebuild(conn, rollup)
+
+
+def apply_delta(conn, name: str, after_rowid: int):
+    """Folds the rows appended to dataset `name` (those past rowid `after_rowid`)
+    into its rollups. Runs inside the caller's transaction, after the insert."""
+    for rollup in ROLLUPS:
+        if name in rollup.rebuilt_by:
+            _rebuild(conn, rollup)
+            continue
+        if not _feeds(rollup, name):
+            continue
+        if not datastore.table_exists(conn, rollup.table):
+            rebuild(conn, name)
+            return
+        if _has_inputs(conn, rollup):
+            rows = f"(SELECT * FROM {datastore.quote(datastore.DATASETS[name].table)} WHERE rowid > ?)"
+            _fold(conn, rollup, rows, (after_rowid,))
+
+
+def missing(conn) -> set:
+    """Source datasets of the rollups not in the store yet."""
+    return {rollup.source for rollup in ROLLUPS if not datastore.table_exists(conn, rollup.table)}
+
+
+def ensure(conn):
+    """Builds any rollup missing from the store (e.g. one created before this module)."""
+    names = missing(conn)
+    if names:
+        with conn:
+            for name in names:
+                rebuild(conn, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the derived tables of the SQLite store.")
+    parser.add_argument("--data-dir", default=datastore.DATA_DIR, help="folder holding the CSVs and jchemie.sqlite")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every rollup from the source tables")
+    args = parser.parse_args(argv)
+
+    with datastore.connection(args.data_dir) as conn:
+        if args.rebuild:
+            with datastore.write_lock(args.data_dir), conn:
+                rebuild(conn)
+        for rollup in ROLLUPS:
+            count = conn.execute(f"SELECT COUNT(*) FROM {rollup.table}").fetchone()[0]
+            print(f"{rollup.table:<22} {count:>10,} rows  (from {_source_table(rollup)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Warm-up of a dashboard process before it serves its first visitor.
+
+    python warmup.py                                         # time the warm-up steps
+    python warmup.py run Data_Updates.py --server.port 8601   # warm up, then `streamlit run` in this process
+
+A fresh Streamlit process makes its first visitor wait while it imports pandas,
+Altair and the compute modules, syncs the store with the CSVs and fills the
+loaders' caches. LAUNCHAPP.py starts its workers through `warmup.py run`, so
+that work is done in each worker before its server accepts connections (and so
+before the launcher reports the app ready): the modules stay imported and the
+st.cache_data entries the Sales Performance page asks for first are already
+there. Loaders defined inside the page scripts fill on first use, from a store
+that is already synced.
+"""
+import sys
+import time
+
+
+def _imports():
+    # The modules the pages and Data Updates import, heaviest first
+    import altair  # noqa: F401
+    import compute  # noqa: F401
+    import date_range  # noqa: F401
+    import ingest  # noqa: F401
+    import project3_utility  # noqa: F401
+    import queries  # noqa: F401
+
+
+def _store():
+    import datastore
+    datastore.sync()
+
+
+def _caches():
+    """Runs the cached loaders for the default view: all time, first metric."""
+    import datastore
+    import date_range
+    import project3_utility as util
+    from compute import aggregation
+
+    version = datastore.version()
+    date_range._sales_bounds(version)
+    window = (None, None)   # date_range.ALL_TIME
+    metric = list(aggregation.METRICS)[0]
+    if not util.has_sales(version, window):
+        return
+    util.compute_monthly_sales(version, window)
+    util.prepare_overview_aggregated_data(version, metric, window)
+    util.count_active_customers(version, window)
+    util.compute_median_transaction_value(version, window)
+    util.reorder_time_stats(version, window)
+    util.compute_churn_bento(version, window)
+    for frequency in ("weekly", "monthly"):
+        util.compute_periodic_sales(version, frequency, window[1])
+        util.compute_customers_bento(version, frequency, window[1])
+        util.prepare_aggregated_data(version, frequency, metric, window)
+        util.prepare_aggregated_data_location(version, frequency, metric, window)
+
+
+STEPS = {"imports": _imports, "store": _store, "caches": _caches}
+
+
+def warm() -> dict:
+    """Runs every step; returns {step: seconds}. A failing step is reported and
+    skipped, as the app still works cold."""
+    import logging
+    # st.cache_data warns about running without a server on every call
+    quiet = [logging.getLogger(f"streamlit.runtime.{name}")
+             for name in ("caching.cache_data_api", "scriptrunner_utils.script_run_context")]
+    for logger in quiet:
+        logger.disabled = True
+
+    timings = {}
+    for name, step in STEPS.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e!r}", file=sys.stderr)
+        timings[name] = time.perf_counter() - started
+    for logger in quiet:
+        logger.disabled = False
+    return timings
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    timings = warm()
+    print("Warm-up: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()), flush=True)
+    if argv[:1] == ["run"]:
+        from streamlit.web import cli
+        sys.argv = ["streamlit", *argv]
+        sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()